@@ -0,0 +1,208 @@
+"""
+Audio processing stages between capture and the Deepgram uplink
+"""
+
+import asyncio
+import json
+import wave
+from collections import deque
+
+# Voice activity detection settings (16 kHz mono linear16)
+VAD_SAMPLE_RATE = 16000
+VAD_FRAME_MS = 20  # Energy is computed per frame of this length
+VAD_PREROLL_MS = 300  # Audio kept while suppressed, sent ahead of a speech onset
+VAD_HANGOVER_MS = 600  # Audio still sent after the last speech frame
+VAD_TURN_END_MARGIN_MS = 200  # Extra silence sent beyond Deepgram's turn detection window
+VAD_MIN_RMS = 200.0  # Absolute floor for the speech threshold (int16 RMS)
+VAD_THRESHOLD_RATIO = 3.0  # Speech must be this many times louder than the noise floor
+VAD_NOISE_ADAPTATION = 0.05  # EWMA weight when the noise floor falls
+VAD_NOISE_RISE = 0.01  # EWMA weight when it rises, so steady background noise is learned slowly
+VAD_NOISE_WINDOW_MS = 5000  # The floor rises towards the quietest frame of this recent window
+
+# Deepgram closes the stream after ~10 s without audio; KeepAlive prevents that
+DEEPGRAM_KEEPALIVE_INTERVAL = 5.0
+DEEPGRAM_KEEPALIVE_MESSAGE = json.dumps({"type": "KeepAlive"})
+
+
+class VoiceActivityDetector:
+    """
+    Energy-based VAD with an adaptive noise floor.
+
+    Frame energies of each chunk are computed in one vectorised NumPy pass.
+    The noise floor follows the quietest frame of the last few seconds with an
+    asymmetric EWMA: it drops quickly in pauses and rises slowly. Speech has
+    pauses within that window, steady background noise does not, so noise
+    above min_rms is eventually no longer taken for speech.
+    Suppressed audio is kept in a pre-roll buffer so word onsets are not
+    clipped, and a hangover keeps trailing syllables after speech ends.
+    """
+
+    def __init__(self, sample_rate: int = VAD_SAMPLE_RATE, frame_ms: int = VAD_FRAME_MS,
+                 preroll_ms: int = VAD_PREROLL_MS, hangover_ms: int = VAD_HANGOVER_MS,
+                 min_rms: float = VAD_MIN_RMS, threshold_ratio: float = VAD_THRESHOLD_RATIO):
+        import numpy as np
+        self._np = np
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.bytes_per_second = sample_rate * 2
+        self.preroll_bytes = self.bytes_per_second * preroll_ms // 1000
+        self.hangover_bytes = self.bytes_per_second * hangover_ms // 1000
+        self.min_rms = min_rms
+        self.threshold_ratio = threshold_ratio
+
+        self.noise_floor = min_rms / threshold_ratio
+        self.noise_window_bytes = self.bytes_per_second * VAD_NOISE_WINDOW_MS // 1000
+        self._quietest = deque()  # (bytes, quietest frame energy) per recent chunk
+        self._quietest_size = 0
+        self._preroll = deque()
+        self._preroll_size = 0
+        self._hangover_left = 0
+        self._remainder = b""
+
+        self.total_bytes = 0
+        self.suppressed_bytes = 0
+
+    def _is_speech(self, chunk: bytes) -> bool:
+        np = self._np
+        data = self._remainder + chunk
+        usable = len(data) // 2 // self.frame_samples * self.frame_samples
+        self._remainder = data[usable * 2:]
+        if usable == 0:
+            return self._hangover_left > 0
+
+        samples = np.frombuffer(data[:usable * 2], dtype=np.int16).astype(np.float32)
+        energies = np.sqrt(np.mean(samples.reshape(-1, self.frame_samples) ** 2, axis=1))
+        threshold = max(self.min_rms, self.noise_floor * self.threshold_ratio)
+        speech = bool((energies > threshold).any())
+
+        self._quietest.append((usable * 2, float(energies.min())))
+        self._quietest_size += usable * 2
+        while self._quietest_size - self._quietest[0][0] >= self.noise_window_bytes:
+            self._quietest_size -= self._quietest.popleft()[0]
+        quietest = min(energy for _, energy in self._quietest)
+        rate = VAD_NOISE_ADAPTATION if quietest < self.noise_floor else VAD_NOISE_RISE
+        self.noise_floor += rate * (quietest - self.noise_floor)
+        return speech
+
+    def process(self, chunk: bytes):
+        """Returns the list of byte chunks to send for this captured chunk"""
+        self.total_bytes += len(chunk)
+
+        if self._is_speech(chunk):
+            self._hangover_left = self.hangover_bytes
+        elif self._hangover_left > 0:
+            self._hangover_left -= len(chunk)
+        else:
+            self._preroll.append(chunk)
+            self._preroll_size += len(chunk)
+            while self._preroll_size - len(self._preroll[0]) >= self.preroll_bytes:
+                self._preroll_size -= len(self._preroll.popleft())
+            self.suppressed_bytes += len(chunk)
+            return []
+
+        # Speech (or hangover): release the pre-roll ahead of this chunk
+        out = list(self._preroll)
+        self.suppressed_bytes -= self._preroll_size
+        self._preroll.clear()
+        self._preroll_size = 0
+        out.append(chunk)
+        return out
+
+    @property
+    def suppressed_fraction(self) -> float:
+        return self.suppressed_bytes / self.total_bytes if self.total_bytes else 0.0
+
+    def stats(self):
+        return {
+            "total_seconds": round(self.total_bytes / self.bytes_per_second, 2),
+            "suppressed_seconds": round(self.suppressed_bytes / self.bytes_per_second, 2),
+            "suppressed_fraction": round(self.suppressed_fraction, 4),
+        }
+
+
+# Uplink encodings: ffmpeg output arguments per Deepgram encoding. linear16 is
+# sent as captured; Opus (Ogg) and FLAC are produced by a streaming ffmpeg process.
+AUDIO_ENCODING = "linear16"
+AUDIO_ENCODER_ARGS = {
+    "linear16": None,
+    "opus": ["-c:a", "libopus", "-b:a", "24k", "-application", "voip",
+             "-frame_duration", "20", "-page_duration", "20000", "-f", "ogg"],
+    "flac": ["-c:a", "flac", "-compression_level", "5", "-frame_size", "1024", "-f", "flac"],
+}
+AUDIO_ENCODER_READ_SIZE = 4096
+
+
+def vad_hangover_ms(turn_silence_ms: int = 0) -> int:
+    """
+    Hangover that lets Deepgram see `turn_silence_ms` of silence after speech
+    (its endpointing / utterance_end_ms), so turn ends still fire with VAD on
+    """
+    return max(VAD_HANGOVER_MS, turn_silence_ms + VAD_TURN_END_MARGIN_MS)
+
+
+def wav_format(path: str):
+    """Returns (sample_rate, channels) from a wav file header"""
+    with wave.open(path, "rb") as wav_file:
+        return wav_file.getframerate(), wav_file.getnchannels()
+
+
+def deepgram_audio_params(encoding, sample_rate: int = VAD_SAMPLE_RATE, channels: int = 1):
+    """
+    Deepgram query parameters that describe the uplink audio. Only raw linear16
+    needs encoding, sample_rate and channels; Deepgram reads Ogg-Opus, FLAC and
+    containerised sources (encoding None, e.g. a wav or mp3 URL) from their headers.
+    """
+    if encoding is None or AUDIO_ENCODER_ARGS[encoding] is not None:
+        return {}
+    params = {"encoding": encoding, "sample_rate": sample_rate}
+    if channels != 1:
+        params["channels"] = channels
+    return params
+
+
+class AudioEncoder:
+    """
+    Streaming encoder from linear16 (16 kHz mono by default) to Opus or FLAC,
+    backed by an ffmpeg subprocess. PCM is written with write() and encoded
+    frames are returned by read() as soon as ffmpeg flushes them.
+    """
+
+    def __init__(self, encoding: str, sample_rate: int = VAD_SAMPLE_RATE, channels: int = 1):
+        if encoding not in AUDIO_ENCODER_ARGS or AUDIO_ENCODER_ARGS[encoding] is None:
+            raise ValueError(f"No encoder needed or available for encoding: {encoding}")
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._process = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    async def start(self):
+        self._process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-fflags", "+nobuffer",
+            "-f", "s16le", "-ar", str(self.sample_rate), "-ac", str(self.channels), "-i", "pipe:0",
+            *AUDIO_ENCODER_ARGS[self.encoding], "-flush_packets", "1", "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        return self
+
+    async def write(self, pcm: bytes):
+        self.bytes_in += len(pcm)
+        self._process.stdin.write(pcm)
+        await self._process.stdin.drain()
+
+    async def read(self) -> bytes:
+        """Returns the next encoded bytes, or b"" once the encoder has finished"""
+        data = await self._process.stdout.read(AUDIO_ENCODER_READ_SIZE)
+        self.bytes_out += len(data)
+        return data
+
+    async def close(self):
+        """Signals end of input; read() drains the remaining frames"""
+        if self._process is not None and not self._process.stdin.is_closing():
+            self._process.stdin.close()
+
+    async def terminate(self):
+        if self._process is not None and self._process.returncode is None:
+            self._process.kill()
+            await self._process.wait()
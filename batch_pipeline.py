@@ -0,0 +1,260 @@
+"""
+Offline batch pipeline: transcribes a directory or manifest of recorded calls
+through Deepgram and writes the ECD report / follow-up summaries to disk.
+
+Recordings are processed concurrently with bounded parallelism. A recording
+whose outputs already exist is skipped, so an interrupted run can be resumed.
+
+Usage:
+    python batch_pipeline.py recordings/ --out reports/ --concurrency 8
+    python batch_pipeline.py manifest.json --out reports/ --summary-types report
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import wave
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from clients import get_env
+from local_transcription_server import (
+    ConversationBuffer,
+    KEEPALIVE_INTERVAL,
+    KEEPALIVE_TIMEOUT,
+    build_deepgram_uri,
+    build_summary_prompts,
+    create_audio_encoder,
+    generate_summary,
+    get_audio_encoding,
+    sender,
+)
+from audio_processing import wav_format
+from deepgram_messages import handle_results_message, is_turn_end
+from llm_usage import usage_tracker
+
+BATCH_CONCURRENCY = 4
+BATCH_SUMMARY_TYPES = ("report", "followup")
+RECORDING_EXTENSIONS = (".wav",)
+
+
+class Recording:
+    def __init__(self, source: str, method: str, recording_id: str, patient_id: Optional[str] = None):
+        self.source = source
+        self.method = method
+        self.id = recording_id
+        self.patient_id = patient_id
+
+
+def _recording_from_source(source: str, recording_id: Optional[str] = None, patient_id: Optional[str] = None):
+    method = "url" if source.startswith(("http://", "https://")) else "wav"
+    if recording_id is None:
+        recording_id = os.path.splitext(os.path.basename(source.rstrip("/")))[0]
+    return Recording(source, method, recording_id, patient_id)
+
+
+def load_recordings(path: str) -> List[Recording]:
+    """
+    Returns the recordings in a directory (all .wav files), a JSON manifest
+    (a list of sources or of {"source", "id", "patient_id"} objects) or a text
+    manifest with one source per line.
+    """
+    if os.path.isdir(path):
+        return [
+            _recording_from_source(os.path.join(path, name))
+            for name in sorted(os.listdir(path))
+            if name.lower().endswith(RECORDING_EXTENSIONS)
+        ]
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    def resolve(source):
+        if source.startswith(("http://", "https://")) or os.path.isabs(source):
+            return source
+        return os.path.join(base_dir, source)
+
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            entries = json.load(f)
+        else:
+            entries = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    recordings = []
+    for entry in entries:
+        if isinstance(entry, str):
+            recordings.append(_recording_from_source(resolve(entry)))
+        else:
+            recordings.append(_recording_from_source(resolve(entry["source"]), entry.get("id"), entry.get("patient_id")))
+    return recordings
+
+
+def _output_path(output_dir: str, recording: Recording, kind: str) -> str:
+    return os.path.join(output_dir, f"{recording.id}.{kind}.txt")
+
+
+def _write_atomic(path: str, content: str):
+    # Write to a temporary file first so a crash never leaves a half-written
+    # report that a resumed run would mistake for a finished one
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def _audio_seconds(recording: Recording) -> float:
+    if recording.method != "wav":
+        return 0.0
+    try:
+        with wave.open(recording.source, "rb") as wav_file:
+            return wav_file.getnframes() / float(wav_file.getframerate())
+    except Exception:
+        return 0.0
+
+
+def recording_audio_format(recording: Recording):
+    """
+    Returns (encoding, sample_rate, channels) of the Deepgram stream for a
+    recording. Wav files are sent as read, with the rate and channels of their
+    header; URL sources are forwarded as-is and Deepgram reads their container.
+    """
+    if recording.method == "wav":
+        sample_rate, channels = wav_format(recording.source)
+        return get_audio_encoding(), sample_rate, channels
+    return None, None, None
+
+
+async def transcribe_recording(recording: Recording) -> ConversationBuffer:
+    """Streams a recording through Deepgram and collects the final utterances"""
+    import websockets
+
+    api_key = get_env("DEEPGRAM_API_KEY", required=True)
+    encoding, sample_rate, channels = recording_audio_format(recording)
+    conversation_buffer = ConversationBuffer(recording.patient_id, max_utterances=None)
+    started_at = time.monotonic()
+
+    async with websockets.connect(
+        build_deepgram_uri(encoding, sample_rate, channels),
+        additional_headers={"Authorization": f"Token {api_key}"},
+        ping_interval=KEEPALIVE_INTERVAL,
+        ping_timeout=KEEPALIVE_TIMEOUT,
+        close_timeout=5,
+        max_size=None,
+    ) as deepgram_ws:
+        async def send_audio():
+            encoder = create_audio_encoder(encoding, sample_rate, channels) if encoding else None
+            await sender(deepgram_ws, recording.method, recording.source, encoder=encoder)
+            # Ask Deepgram to flush the remaining results and close the stream
+            await deepgram_ws.send(json.dumps({"type": "CloseStream"}))
+
+        sender_task = asyncio.create_task(send_audio())
+        try:
+            async for message in deepgram_ws:
+                response_json = json.loads(message)
+                # Utterances are stamped with their position in the recording
+                handle_results_message(response_json, conversation_buffer, started_at + response_json.get('start', 0))
+                if is_turn_end(response_json):
+                    conversation_buffer.commit_turn()
+        finally:
+            if not sender_task.done():
+                sender_task.cancel()
+            try:
+                await sender_task
+            except asyncio.CancelledError:
+                pass
+
+    return conversation_buffer
+
+
+async def process_recording(recording: Recording, output_dir: str, summary_types) -> Dict[str, Any]:
+    """Transcribes one recording and writes its transcript and summaries"""
+    start = time.perf_counter()
+    conversation_buffer = await transcribe_recording(recording)
+    transcript = conversation_buffer.get_full_transcript()
+    _write_atomic(_output_path(output_dir, recording, "transcript"), transcript)
+
+    # Report and follow-up prompts are independent, so request them concurrently
+    prompts = [build_summary_prompts(transcript, summary_type) for summary_type in summary_types]
+    summaries = await asyncio.gather(*(
+        generate_summary(system, user, f"summary_{summary_type}", recording.id)
+        for summary_type, (system, user) in zip(summary_types, prompts)
+    ))
+    for summary_type, summary in zip(summary_types, summaries):
+        if not summary:
+            raise Exception(f"Failed to generate {summary_type} summary")
+        _write_atomic(_output_path(output_dir, recording, summary_type), summary)
+
+    return {
+        "id": recording.id,
+        "status": "done",
+        "seconds": time.perf_counter() - start,
+        "audio_seconds": _audio_seconds(recording),
+        "utterances": len(conversation_buffer.utterances),
+    }
+
+
+async def run_batch(recordings: List[Recording], output_dir: str, concurrency: int = BATCH_CONCURRENCY,
+                    summary_types=BATCH_SUMMARY_TYPES, resume: bool = True) -> Dict[str, Any]:
+    """
+    Processes the recordings with at most `concurrency` in flight and returns
+    a throughput report, which is also written to <output_dir>/throughput.json.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    semaphore = asyncio.Semaphore(concurrency)
+    output_kinds = ["transcript", *summary_types]
+
+    async def run_one(recording: Recording):
+        if resume and all(os.path.exists(_output_path(output_dir, recording, kind)) for kind in output_kinds):
+            return {"id": recording.id, "status": "skipped"}
+        async with semaphore:
+            print(f"[Batch] Processing {recording.id} at {datetime.now().strftime('%H:%M:%S.%f')}")
+            try:
+                result = await process_recording(recording, output_dir, summary_types)
+                print(f"[Batch] Finished {recording.id} in {result['seconds']:.1f}s at {datetime.now().strftime('%H:%M:%S.%f')}")
+                return result
+            except Exception as e:
+                print(f"[Batch] Error processing {recording.id}: {e} at {datetime.now().strftime('%H:%M:%S.%f')}")
+                return {"id": recording.id, "status": "failed", "error": str(e)}
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(run_one(recording) for recording in recordings))
+    wall_seconds = time.perf_counter() - start
+
+    done = [r for r in results if r["status"] == "done"]
+    audio_seconds = sum(r["audio_seconds"] for r in done)
+    report = {
+        "recordings": len(recordings),
+        "done": len(done),
+        "skipped": sum(1 for r in results if r["status"] == "skipped"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "concurrency": concurrency,
+        "wall_seconds": round(wall_seconds, 3),
+        "audio_seconds": round(audio_seconds, 3),
+        "recordings_per_minute": round(len(done) / wall_seconds * 60, 2) if wall_seconds else 0.0,
+        "realtime_factor": round(audio_seconds / wall_seconds, 2) if wall_seconds else 0.0,
+        "llm_usage": usage_tracker.snapshot(),
+        "results": results,
+    }
+    _write_atomic(os.path.join(output_dir, "throughput.json"), json.dumps(report, indent=2))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe and summarise recorded calls in batch")
+    parser.add_argument("input", help="Directory with .wav recordings, or a .json/.txt manifest")
+    parser.add_argument("--out", default="reports", help="Output directory for transcripts and summaries")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--summary-types", nargs="+", default=list(BATCH_SUMMARY_TYPES), choices=BATCH_SUMMARY_TYPES)
+    parser.add_argument("--no-resume", action="store_true", help="Reprocess recordings that already have outputs")
+    args = parser.parse_args()
+
+    recordings = load_recordings(args.input)
+    report = asyncio.run(run_batch(recordings, args.out, args.concurrency, tuple(args.summary_types), not args.no_resume))
+    print(f"[Batch] {report['done']} done, {report['skipped']} skipped, {report['failed']} failed "
+          f"in {report['wall_seconds']:.1f}s ({report['recordings_per_minute']} recordings/min, "
+          f"{report['realtime_factor']}x realtime)")
+
+
+if __name__ == "__main__":
+    main()
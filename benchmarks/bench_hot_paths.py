@@ -0,0 +1,221 @@
+"""
+Microbenchmarks for the conversation, protocol, dossier and Deepgram message
+hot paths.
+
+Every case reports operations per second and the peak memory allocated by a
+single call. Speeds are stored relative to a fixed pure-Python calibration
+loop timed in the same run, so benchmarks/baselines.json carries over between
+machines of similar architecture; the run fails when a case is slower than its
+baseline by more than the threshold. With --runs every case is measured several
+times and the median is kept; record the baselines with more runs. Regenerate
+the baselines when moving to a very different host (other CPU family or Python
+version).
+
+Usage:
+    python benchmarks/bench_hot_paths.py                  # compare with baselines
+    python benchmarks/bench_hot_paths.py --save-baseline --runs 5  # record new baselines
+    python benchmarks/bench_hot_paths.py --filter buffer --threshold 0.3
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fixtures  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_THRESHOLD = 0.5  # Allowed slowdown; medians of 3 runs on a shared host still vary by up to 35%
+DEFAULT_RUNS = 3  # Measurements per case; the median is compared
+UTTERANCE_SIZES = (10, 1000, 100000)
+PROTOCOL_SIZES = (3, 100, 1000)
+
+CASES = {}
+
+
+def case(name):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def _buffer_cases():
+    from conversation_buffer import ConversationBuffer
+
+    for size in UTTERANCE_SIZES:
+        def add_utterance(size=size):
+            buffer = ConversationBuffer(max_utterances=size)
+            for speaker, text in fixtures.utterances(size):
+                buffer.add_utterance(speaker, text)
+            lines = itertools.cycle(fixtures.utterances(64))
+            # Alternate speakers so every call appends instead of merging
+            return lambda: buffer.add_utterance(*next(lines))
+
+        def recent(size=size):
+            return fixtures.filled_buffer(size).get_recent_conversation
+
+        def format_for_ai(size=size):
+            return fixtures.filled_buffer(size).format_for_ai
+
+        def full_transcript(size=size):
+            return fixtures.filled_buffer(size).get_full_transcript
+
+        case(f"buffer.add_utterance[{size}]")(add_utterance)
+        case(f"buffer.get_recent_conversation[{size}]")(recent)
+        case(f"buffer.format_for_ai[{size}]")(format_for_ai)
+        case(f"buffer.get_full_transcript[{size}]")(full_transcript)
+
+
+def _protocol_cases():
+    from protocols import get_relevant_protocols
+
+    conversation_text = fixtures.filled_buffer(50).format_for_ai()
+    for size in PROTOCOL_SIZES:
+        def relevant(size=size):
+            protocols = fixtures.protocols(size)
+            return lambda: get_relevant_protocols(conversation_text, protocols, mode="keywords")
+
+        def relevant_vector(size=size):
+            protocols = fixtures.protocols(size)
+            return lambda: get_relevant_protocols(conversation_text, protocols, mode="vector")
+
+        def score_utterance(size=size):
+            from protocol_retrieval import ProtocolVectorIndex
+            index = ProtocolVectorIndex(fixtures.protocols(size))
+            return lambda: index.score(["Mijn vader krijgt ineens geen lucht meer"])
+
+        case(f"protocols.get_relevant_protocols[{size}]")(relevant)
+        case(f"protocols.get_relevant_protocols[vector,{size}]")(relevant_vector)
+        case(f"protocol_retrieval.score[{size}]")(score_utterance)
+
+
+def _dossier_cases():
+    from patient_dossier import DEFAULT_PATIENT_ID, PATIENT_DOSSIER, get_patient_context, render_patient_context
+
+    case("dossier.get_patient_context[cached]")(lambda: lambda: get_patient_context(DEFAULT_PATIENT_ID))
+    case("dossier.render_patient_context")(lambda: lambda: render_patient_context(PATIENT_DOSSIER))
+
+    def verify_reference():
+        from ecd_references import get_reference_index
+        index = get_reference_index(DEFAULT_PATIENT_ID)
+        return lambda: index.verify({"ecdReference": "salbutamol inhaler gebruik bij benauwdheid"})
+
+    case("dossier.verify_reference")(verify_reference)
+
+
+def _message_cases():
+    from conversation_buffer import ConversationBuffer
+    from deepgram_messages import handle_results_message
+
+    def handle():
+        buffer = ConversationBuffer()
+        messages = itertools.cycle(fixtures.deepgram_results(999))
+        return lambda: handle_results_message(next(messages), buffer)
+
+    def handle_and_encode():
+        # Includes serialising the frontend message, as the receive loop does
+        buffer = ConversationBuffer()
+        messages = itertools.cycle(fixtures.deepgram_results(999))
+        return lambda: json.dumps(handle_results_message(next(messages), buffer))
+
+    case("deepgram.handle_results_message")(handle)
+    case("deepgram.handle_results_message+json")(handle_and_encode)
+
+
+def register_cases():
+    _buffer_cases()
+    _protocol_cases()
+    _dossier_cases()
+    _message_cases()
+
+
+def calibration_op():
+    """Dict, string and integer work comparable to the cases, independent of the code under test"""
+    values = {}
+    for i in range(1000):
+        values[str(i)] = i * 2
+    return sum(values.values())
+
+
+def measure(op, repeat, min_time):
+    op()  # Warm up caches
+    timer = timeit.Timer(op)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(number, int(number * min_time / max(elapsed, 1e-9)))
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    op()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return 1.0 / best, max(0, peak - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the backend hot paths")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per timing run")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="Measure every case this often and keep the median")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    register_cases()
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baselines = json.load(f)
+
+    results = {}
+    regressions = []
+    print(f"{'case':48s} {'ops/s':>14s} {'alloc/op':>12s} {'relative':>10s} {'vs baseline':>12s}")
+    for name, setup in CASES.items():
+        if args.filter not in name:
+            continue
+        op = setup()
+        samples = []
+        for _ in range(args.runs):
+            # Calibrate right before every case, so load changes on the host
+            # during the run affect both measurements alike
+            calibration, _ = measure(calibration_op, args.repeat, args.min_time)
+            ops_per_sec, allocated = measure(op, args.repeat, args.min_time)
+            samples.append((ops_per_sec / calibration, ops_per_sec))
+        relative, ops_per_sec = sorted(samples)[len(samples) // 2]
+        results[name] = {"ops_per_sec": ops_per_sec, "relative": relative, "alloc_bytes": allocated}
+
+        comparison = "-"
+        baseline = baselines.get(name)
+        if baseline and "relative" in baseline and not args.save_baseline:
+            ratio = relative / baseline["relative"]
+            comparison = f"{ratio:.2f}x"
+            if ratio < 1.0 - args.threshold:
+                comparison += " SLOW"
+                regressions.append(name)
+        print(f"{name:48s} {ops_per_sec:14,.1f} {allocated / 1024:9.1f} KiB {relative:10.4g} {comparison:>12s}")
+
+    if args.save_baseline:
+        baselines.update({name: {"ops_per_sec": round(r["ops_per_sec"], 1), "relative": float(f"{r['relative']:.4g}"),
+                                 "alloc_bytes": r["alloc_bytes"]}
+                          for name, r in results.items()})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved {len(results)} baselines to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Memory-per-session benchmark for the conversation buffer.
+
+Reports the bytes allocated per utterance record (excluding the text itself)
+and per idle session, next to the previous dict + datetime representation.
+
+Usage: python benchmarks/bench_memory.py [--sessions 1000] [--utterances 10000]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation_buffer import ConversationBuffer  # noqa: E402
+from patient_dossier import DEFAULT_PATIENT_ID  # noqa: E402
+
+SAMPLE_TEXTS = [
+    "Goedemiddag, u spreekt met de triagist, waarmee kan ik u helpen?",
+    "Ik ben sinds vanochtend erg benauwd en mijn inhalator helpt niet goed.",
+    "Heeft u vandaag uw Salbutamol al gebruikt?",
+    "Ja, twee keer, maar het wordt niet minder.",
+]
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, keep
+
+
+def bytes_per_utterance(count):
+    texts = [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] for i in range(count)]
+    buffer = ConversationBuffer(max_utterances=None)
+
+    def build():
+        now = time.monotonic()
+        for i, text in enumerate(texts):
+            buffer.add_utterance(i % 2, text, now)
+        return buffer
+
+    size, _ = measure(build)
+    return size / count
+
+
+def legacy_bytes_per_utterance(count):
+    texts = [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] for i in range(count)]
+
+    def build():
+        records = []
+        for i, text in enumerate(texts):
+            records.append({'speaker': i % 2, 'text': text, 'timestamp': datetime.now()})
+        return records
+
+    size, _ = measure(build)
+    return size / count
+
+
+def bytes_per_idle_session(count):
+    ConversationBuffer(DEFAULT_PATIENT_ID).patient_context  # Warm the shared dossier context cache
+
+    def build():
+        sessions = []
+        for _ in range(count):
+            buffer = ConversationBuffer(DEFAULT_PATIENT_ID)
+            buffer.patient_context
+            sessions.append(buffer)
+        return sessions
+
+    size, _ = measure(build)
+    return size / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report conversation buffer memory usage")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--utterances", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"bytes per utterance (slots):        {bytes_per_utterance(args.utterances):8.1f}")
+    print(f"bytes per utterance (legacy dict):  {legacy_bytes_per_utterance(args.utterances):8.1f}")
+    print(f"bytes per idle session:             {bytes_per_idle_session(args.sessions):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Startup-time benchmark for the backend modules.
+
+Imports each module in a fresh interpreter, reports the median import time
+and fails when it exceeds the budget or when a lazily loaded dependency is
+pulled in at import time.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--max-ms 1500]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must import without side effects, with their import budget in ms
+MODULES = {
+    "protocols": 200,
+    "patient_dossier": 300,
+    "local_transcription_server": 1500,
+}
+
+# Dependencies that must only be loaded on first use
+LAZY_DEPENDENCIES = ["pyaudio", "aiohttp", "websockets", "openai", "dotenv"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{"ms": elapsed, "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, runs):
+    env = dict(os.environ)
+    # No API keys should be needed just to import
+    env.pop("OPENAI_API_KEY", None)
+    env.pop("DEEPGRAM_API_KEY", None)
+    timings = []
+    loaded = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, lazy=LAZY_DEPENDENCIES)],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(data["ms"])
+        loaded = data["loaded"]
+    return statistics.median(timings), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Guard backend import time against regressions")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None, help="Override the per-module budget")
+    args = parser.parse_args()
+
+    failed = False
+    for module, budget in MODULES.items():
+        budget = args.max_ms or budget
+        median_ms, loaded = measure(module, args.runs)
+        status = "ok"
+        if median_ms > budget:
+            status = f"SLOW (budget {budget:.0f} ms)"
+            failed = True
+        if loaded:
+            status = f"EAGER IMPORTS: {', '.join(loaded)}"
+            failed = True
+        print(f"{module:30s} {median_ms:8.1f} ms  {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
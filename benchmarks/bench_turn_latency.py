@@ -0,0 +1,205 @@
+"""
+Turn latency benchmark: compares when suggestion requests start relative to
+the end of each speaker turn, for interval polling versus turn boundaries
+(Deepgram speech_final / UtteranceEnd).
+
+A call timeline is a list of (arrival seconds, Deepgram message). Recorded
+calls (.wav) are streamed to Deepgram with the server's endpointing options
+and their timelines can be kept with --save-timelines; saved timelines (.jsonl)
+are replayed without Deepgram. Without paths a synthetic call is used. Each
+timeline goes through handle_results_message() and is_turn_end() and drives
+the server's run_suggestion_loop() in virtual time, with a fixed LLM latency,
+so both policies see the same messages.
+
+Usage: python benchmarks/bench_turn_latency.py [opnames/ | timelines/] [--llm-latency 0.8] [--save-timelines DIR]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation_buffer import ConversationBuffer  # noqa: E402
+from deepgram_messages import handle_results_message, is_turn_end  # noqa: E402
+from metrics import percentile  # noqa: E402
+from suggestion_cadence import SuggestionCadence, run_suggestion_loop  # noqa: E402
+
+SYNTHETIC_RESULTS = 300
+
+
+def load_timeline(path):
+    with open(path, encoding="utf-8") as timeline_file:
+        return [(record["t"], record["message"]) for record in map(json.loads, timeline_file)]
+
+
+def save_timeline(path, timeline):
+    with open(path, "w", encoding="utf-8") as timeline_file:
+        for arrival, message in timeline:
+            timeline_file.write(json.dumps({"t": round(arrival, 3), "message": message}) + "\n")
+
+
+async def record_timeline(path):
+    """Streams a recording to Deepgram at real-time pace and returns its timeline"""
+    import websockets
+    from bench_uplink import replay
+    from clients import get_env
+    from local_transcription_server import build_deepgram_uri
+
+    api_key = get_env("DEEPGRAM_API_KEY", required=True)
+    timeline = []
+    async with websockets.connect(
+        build_deepgram_uri("linear16"),
+        additional_headers={"Authorization": f"Token {api_key}"},
+        max_size=None,
+    ) as deepgram_ws:
+        start = time.monotonic()
+
+        async def send_audio():
+            await replay(path, deepgram_ws, None, realtime=True)
+            await deepgram_ws.send(json.dumps({"type": "CloseStream"}))
+
+        sender_task = asyncio.create_task(send_audio())
+        async for message in deepgram_ws:
+            timeline.append((time.monotonic() - start, json.loads(message)))
+        await sender_task
+    return timeline
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """Event loop whose clock jumps to the next timer whenever nothing is ready"""
+
+    def __init__(self):
+        super().__init__()
+        # Starts at the real clock, so the buffer's time window (which reads
+        # time.monotonic) still sees the replayed utterances as recent
+        self._now = time.monotonic()
+
+    def time(self):
+        return self._now
+
+    def _run_once(self):
+        if not self._ready:
+            pending = [handle.when() for handle in self._scheduled if not handle.cancelled()]
+            if pending:
+                self._now = max(self._now, min(pending))
+        super()._run_once()
+
+
+def simulate(timeline, use_turns, llm_latency):
+    """
+    Replays a timeline through run_suggestion_loop() in virtual time, with or
+    without turn boundaries, and returns the request start times, the turn
+    end times and the requests started mid-turn
+    """
+    loop = VirtualClockLoop()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return loop.run_until_complete(_replay(timeline, use_turns, llm_latency))
+    finally:
+        loop.close()
+
+
+async def _replay(timeline, use_turns, llm_latency):
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    buffer = ConversationBuffer(max_utterances=None)
+    buffer.cadence = cadence = SuggestionCadence()
+    stop_event, turn_event = asyncio.Event(), asyncio.Event()
+    requests, turn_ends = [], []
+    mid_turn = 0
+
+    async def request(conversation_text):
+        nonlocal mid_turn
+        requests.append((loop.time() - start, buffer.revision))
+        mid_turn += buffer.revision > buffer.turn_revision
+        await asyncio.sleep(llm_latency)
+        cadence.record_call(llm_latency)
+
+    worker = asyncio.create_task(run_suggestion_loop(buffer, request, stop_event, turn_event if use_turns else None))
+    for arrival, message in timeline:
+        await asyncio.sleep(max(0.0, start + arrival - loop.time()))
+        transcript_message = handle_results_message(message, buffer, loop.time())
+        if transcript_message is not None and transcript_message["is_final"]:
+            cadence.record_words(len(transcript_message["transcript"].split()), loop.time())
+        if is_turn_end(message) and buffer.commit_turn():
+            turn_ends.append((loop.time() - start, buffer.revision))
+            turn_event.set()
+
+    # Let the last turn be answered before stopping the worker
+    await asyncio.sleep(cadence.interval + llm_latency)
+    stop_event.set()
+    turn_event.set()
+    await worker
+    return requests, turn_ends, mid_turn
+
+
+def turn_latencies(requests, turn_ends, llm_latency):
+    """Seconds from each turn end until a suggestion covering that turn arrives"""
+    latencies = []
+    request_index = 0
+    for turn_time, revision in turn_ends:
+        while request_index < len(requests) and requests[request_index][1] < revision:
+            request_index += 1
+        if request_index < len(requests):
+            latencies.append(requests[request_index][0] + llm_latency - turn_time)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare turn-to-suggestion latency of interval polling and turn boundaries")
+    parser.add_argument("paths", nargs="*", help="Recordings (.wav) or saved timelines (.jsonl), or directories with them")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Seconds per suggestion request")
+    parser.add_argument("--save-timelines", help="Directory to store the timelines of streamed recordings")
+    args = parser.parse_args()
+
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path)))
+        else:
+            files.append(path)
+
+    timelines = []
+    for path in files:
+        if path.lower().endswith(".jsonl"):
+            timelines.append(load_timeline(path))
+        elif path.lower().endswith(".wav"):
+            timeline = asyncio.run(record_timeline(path))
+            timelines.append(timeline)
+            if args.save_timelines:
+                os.makedirs(args.save_timelines, exist_ok=True)
+                name = os.path.splitext(os.path.basename(path))[0] + ".jsonl"
+                save_timeline(os.path.join(args.save_timelines, name), timeline)
+    if args.paths and not timelines:
+        sys.exit("No .wav recordings or .jsonl timelines found")
+    if not timelines:
+        from fixtures import replayed_call
+        timelines = [replayed_call(SYNTHETIC_RESULTS)]
+
+    minutes = sum(timeline[-1][0] for timeline in timelines if timeline) / 60
+    print(f"{len(timelines)} call(s), {minutes:.1f} min, LLM latency {args.llm_latency:.2f}s")
+    print(f"{'policy':10s} {'requests':>9s} {'per min':>8s} {'mid-turn':>9s} {'p50 turn':>9s} {'p95 turn':>9s} {'max turn':>9s}")
+    for name, use_turns in (("interval", False), ("turns", True)):
+        request_count, mid_turn, latencies = 0, 0, []
+        for timeline in timelines:
+            requests, turn_ends, timeline_mid_turn = simulate(timeline, use_turns, args.llm_latency)
+            request_count += len(requests)
+            mid_turn += timeline_mid_turn
+            latencies.extend(turn_latencies(requests, turn_ends, args.llm_latency))
+        per_minute = request_count / minutes if minutes else 0.0
+        mid_turn_share = mid_turn / request_count if request_count else 0.0
+        p50 = f"{statistics.median(latencies):.2f}s" if latencies else "-"
+        p95 = f"{percentile(latencies, 0.95):.2f}s" if latencies else "-"
+        worst = f"{max(latencies):.2f}s" if latencies else "-"
+        print(f"{name:10s} {request_count:9d} {per_minute:8.1f} {mid_turn_share:9.0%} {p50:>9s} {p95:>9s} {worst:>9s}")
+
+
+if __name__ == "__main__":
+    main()
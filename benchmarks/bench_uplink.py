@@ -0,0 +1,171 @@
+"""
+Uplink benchmark: compares bytes sent and transcript latency per encoding.
+
+Replays recorded calls (16 kHz mono linear16 .wav) at real-time pace through
+each uplink encoding. Without --deepgram only the encoder output is measured;
+with --deepgram every replay is streamed to Deepgram and the transcript
+latency (arrival time minus the end of the transcribed audio) is recorded.
+
+Usage: python benchmarks/bench_uplink.py recordings/ [--encodings linear16 opus flac] [--deepgram]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_processing import AUDIO_ENCODER_ARGS  # noqa: E402
+from metrics import percentile  # noqa: E402
+
+CHUNK_FRAMES = 1024
+
+
+class CountingSocket:
+    """Stands in for the Deepgram socket when only bytes are measured"""
+
+    def __init__(self):
+        self.bytes_sent = 0
+
+    async def send(self, data):
+        if isinstance(data, bytes):
+            self.bytes_sent += len(data)
+
+
+async def replay(path, websocket, encoder, realtime, start=None):
+    """
+    Sends a wav file through the encoder at (optionally) real-time pace,
+    counted from `start` (monotonic seconds, default now)
+    """
+    with wave.open(path, "rb") as wav_file:
+        chunk_seconds = CHUNK_FRAMES / wav_file.getframerate()
+        start = time.monotonic() if start is None else start
+        sent_chunks = 0
+
+        if encoder is not None:
+            await encoder.start()
+
+            async def pump():
+                while True:
+                    encoded = await encoder.read()
+                    if not encoded:
+                        break
+                    await websocket.send(encoded)
+
+            pump_task = asyncio.create_task(pump())
+
+        while True:
+            data = wav_file.readframes(CHUNK_FRAMES)
+            if not data:
+                break
+            if encoder is not None:
+                await encoder.write(data)
+            else:
+                await websocket.send(data)
+            sent_chunks += 1
+            if realtime:
+                delay = start + sent_chunks * chunk_seconds - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+        if encoder is not None:
+            await encoder.close()
+            await pump_task
+        return wav_file.getnframes() / wav_file.getframerate()
+
+
+async def measure_offline(path, encoding):
+    from local_transcription_server import create_audio_encoder
+    socket = CountingSocket()
+    audio_seconds = await replay(path, socket, create_audio_encoder(encoding), realtime=False)
+    return {"bytes": socket.bytes_sent, "audio_seconds": audio_seconds, "latencies": []}
+
+
+async def measure_deepgram(path, encoding):
+    import websockets
+    from clients import get_env
+    from local_transcription_server import build_deepgram_uri, create_audio_encoder
+
+    api_key = get_env("DEEPGRAM_API_KEY", required=True)
+    latencies = []
+    async with websockets.connect(
+        build_deepgram_uri(encoding),
+        additional_headers={"Authorization": f"Token {api_key}"},
+        max_size=None,
+    ) as deepgram_ws:
+        bytes_sent = 0
+        original_send = deepgram_ws.send
+
+        async def counting_send(data):
+            nonlocal bytes_sent
+            if isinstance(data, bytes):
+                bytes_sent += len(data)
+            await original_send(data)
+
+        deepgram_ws.send = counting_send
+        # Set before streaming, so results that arrive mid-stream are measured
+        # against the same clock the replay paces the audio by
+        stream_start = time.monotonic()
+
+        async def send_audio():
+            audio_seconds = await replay(path, deepgram_ws, create_audio_encoder(encoding), realtime=True, start=stream_start)
+            await original_send(json.dumps({"type": "CloseStream"}))
+            return audio_seconds
+
+        sender_task = asyncio.create_task(send_audio())
+        async for message in deepgram_ws:
+            response_json = json.loads(message)
+            if response_json.get("type") == "Results" and response_json.get("is_final"):
+                audio_end = response_json.get("start", 0) + response_json.get("duration", 0)
+                latencies.append(time.monotonic() - stream_start - audio_end)
+        audio_seconds = await sender_task
+
+    return {"bytes": bytes_sent, "audio_seconds": audio_seconds, "latencies": latencies}
+
+
+async def run(paths, encodings, use_deepgram):
+    results = {}
+    for encoding in encodings:
+        totals = {"bytes": 0, "audio_seconds": 0.0, "latencies": []}
+        for path in paths:
+            measure = measure_deepgram if use_deepgram else measure_offline
+            result = await measure(path, encoding)
+            totals["bytes"] += result["bytes"]
+            totals["audio_seconds"] += result["audio_seconds"]
+            totals["latencies"].extend(result["latencies"])
+        results[encoding] = totals
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare uplink encodings on replayed calls")
+    parser.add_argument("recordings", help="Directory with 16 kHz mono .wav recordings")
+    parser.add_argument("--encodings", nargs="+", default=list(AUDIO_ENCODER_ARGS), choices=list(AUDIO_ENCODER_ARGS))
+    parser.add_argument("--deepgram", action="store_true", help="Stream to Deepgram and measure transcript latency")
+    args = parser.parse_args()
+
+    paths = [os.path.join(args.recordings, name) for name in sorted(os.listdir(args.recordings))
+             if name.lower().endswith(".wav")]
+    if not paths:
+        sys.exit(f"No .wav recordings found in {args.recordings}")
+
+    results = asyncio.run(run(paths, args.encodings, args.deepgram))
+
+    print(f"{'encoding':10s} {'bytes':>12s} {'kbit/s':>8s} {'ratio':>6s} {'p50 lat':>8s} {'p95 lat':>8s}")
+    baseline = results.get("linear16", {}).get("bytes") or None
+    for encoding, totals in results.items():
+        kbps = totals["bytes"] * 8 / 1000 / totals["audio_seconds"] if totals["audio_seconds"] else 0.0
+        ratio = totals["bytes"] / baseline if baseline else 0.0
+        latencies = totals["latencies"]
+        p50 = f"{statistics.median(latencies):.3f}s" if latencies else "-"
+        p95 = f"{percentile(latencies, 0.95):.3f}s" if latencies else "-"
+        print(f"{encoding:10s} {totals['bytes']:12d} {kbps:8.1f} {ratio:6.2f} {p50:>8s} {p95:>8s}")
+
+
+if __name__ == "__main__":
+    main()
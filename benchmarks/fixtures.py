@@ -0,0 +1,134 @@
+"""
+Synthetic Dutch conversation, Deepgram message and protocol fixtures for the
+benchmarks. All generators are deterministic for a given seed.
+"""
+
+import copy
+import random
+import time
+
+from protocols import PROTOCOLS, Protocol
+
+TRIAGIST_LINES = [
+    "Goedemiddag, u spreekt met de triagist, waarmee kan ik u helpen?",
+    "Sinds wanneer heeft u deze klachten?",
+    "Heeft u vandaag uw Salbutamol inhalator al gebruikt?",
+    "Kunt u beschrijven hoe de pijn aanvoelt?",
+    "Is er iemand bij u in de buurt die kan helpen?",
+    "Heeft u koorts gemeten vandaag?",
+    "Ik ga een afspraak maken met de huisarts voor u.",
+    "Neemt u uw Metformine nog zoals voorgeschreven?",
+]
+
+PATIENT_LINES = [
+    "Ik ben sinds vanochtend erg benauwd.",
+    "Mijn inhalator helpt niet goed meer.",
+    "Ik voel me de laatste tijd een beetje eenzaam.",
+    "Mijn dochter komt morgen pas langs.",
+    "Ik heb wat pijn op de borst als ik trap loop.",
+    "Nee, ik heb geen koorts gehad.",
+    "Ik weet niet of ik nog genoeg medicijnen heb.",
+    "Het gaat eigenlijk al een paar dagen zo.",
+]
+
+
+def utterances(count, seed=0):
+    """Returns `count` (speaker, text) pairs alternating between two speakers"""
+    rng = random.Random(seed)
+    result = []
+    for i in range(count):
+        lines = TRIAGIST_LINES if i % 2 == 0 else PATIENT_LINES
+        result.append((i % 2, rng.choice(lines)))
+    return result
+
+
+def filled_buffer(count, seed=0):
+    """Returns a ConversationBuffer holding `count` recent utterances"""
+    from conversation_buffer import ConversationBuffer
+    buffer = ConversationBuffer(max_utterances=None)
+    now = time.monotonic()
+    for speaker, text in utterances(count, seed):
+        buffer.add_utterance(speaker, text, now)
+    return buffer
+
+
+def deepgram_results(count, words_per_result=12, speaker_change_every=7, seed=0):
+    """
+    Returns `count` Deepgram Results messages; every third message is final and
+    the speaker switches every `speaker_change_every` words, also mid-result.
+    """
+    rng = random.Random(seed)
+    vocabulary = " ".join(TRIAGIST_LINES + PATIENT_LINES).lower().replace(",", "").replace("?", "").replace(".", "").split()
+    messages = []
+    word_index = 0
+    start = 0.0
+    for i in range(count):
+        words = []
+        for _ in range(words_per_result):
+            word = rng.choice(vocabulary)
+            words.append({
+                "word": word,
+                "punctuated_word": word,
+                "start": start,
+                "end": start + 0.3,
+                "confidence": 0.95,
+                "speaker": (word_index // speaker_change_every) % 2,
+            })
+            word_index += 1
+            start += 0.3
+        messages.append({
+            "type": "Results",
+            "is_final": i % 3 == 2,
+            "speech_final": i % 6 == 5,
+            "start": words[0]["start"],
+            "duration": words[-1]["end"] - words[0]["start"],
+            "channel": {"alternatives": [{
+                "transcript": " ".join(w["punctuated_word"] for w in words),
+                "confidence": 0.95,
+                "words": words,
+            }]},
+        })
+    return messages
+
+
+def replayed_call(count, transcription_latency=0.3, endpointing=0.3, utterance_end=1.0, seed=0):
+    """
+    Returns the (arrival seconds, message) timeline of a call built from
+    deepgram_results(count): results arrive `transcription_latency` after their
+    audio, speech_final results `endpointing` later, each followed by an
+    UtteranceEnd after `utterance_end`, and turns are separated by pauses.
+    """
+    rng = random.Random(seed)
+    timeline = []
+    pause = 0.0
+    for message in deepgram_results(count, seed=seed):
+        audio_end = message["start"] + message["duration"] + pause
+        arrival = audio_end + transcription_latency
+        if message["speech_final"]:
+            arrival += endpointing
+        timeline.append((arrival, message))
+        if message["speech_final"]:
+            timeline.append((audio_end + utterance_end, {"type": "UtteranceEnd", "channel": [0, 1], "last_word_end": audio_end}))
+            pause += rng.uniform(0.5, 2.0)
+    timeline.sort(key=lambda item: item[0])
+    return timeline
+
+
+def protocols(count, seed=0):
+    """Returns `count` protocols cloned from PROTOCOLS with distinct keywords"""
+    rng = random.Random(seed)
+    result = list(PROTOCOLS[:count])
+    i = 0
+    while len(result) < count:
+        template = PROTOCOLS[i % len(PROTOCOLS)]
+        keywords = [f"{keyword} {rng.randrange(10 ** 6)}" for keyword in template.keywords]
+        result.append(Protocol(
+            id=f"{template.id}_copy_{i}",
+            type=template.type,
+            title=f"{template.title} {i}",
+            description=template.description,
+            steps=copy.deepcopy(template.steps),
+            keywords=keywords,
+        ))
+        i += 1
+    return result
@@ -0,0 +1,188 @@
+"""
+Concurrent-session load test for the /ws/transcribe endpoint.
+
+Starts local mock Deepgram and chat-completions servers, runs the FastAPI app
+in a uvicorn worker pointed at them, and opens N concurrent websocket clients
+for each step of the ramp. Per step it reports transcript fan-out latency
+(mock Deepgram send -> client receive), suggestion latency (first uncovered
+final transcript -> LLM suggestions message), worker event-loop lag and memory.
+
+Usage:
+    python benchmarks/load_test.py --ramp 1 10 50 100 --duration 30 \
+        --deepgram-latency fixed:150 --openai-latency lognormal:800,0.4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import percentile  # noqa: E402
+from mock_services import MockDeepgram, MockOpenAI, free_port  # noqa: E402
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StepStats:
+    def __init__(self):
+        self.transcript_latencies = []
+        self.suggestion_latencies = []
+        self.loop_lag_p99 = []
+        self.rss = []
+        self.errors = 0
+
+
+def write_silence(path, seconds=1.0, sample_rate=16000):
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+
+
+async def wait_for_server(base_url, timeout=30.0):
+    import aiohttp
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{base_url}/metrics") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError("Server under test did not start")
+
+
+async def run_client(url, mock_deepgram, duration, stats):
+    import websockets
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    uncovered_final_at = None
+    try:
+        async with websockets.connect(url, max_size=None) as websocket:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    message = await asyncio.wait_for(websocket.recv(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                now = time.perf_counter()
+                data = json.loads(message)
+                if data.get("type") == "transcript":
+                    token = data["transcript"].rsplit(" ", 1)[-1]
+                    sent_at = mock_deepgram.sent_at.pop(token, None)
+                    if sent_at is not None:
+                        stats.transcript_latencies.append(now - sent_at)
+                    if data.get("is_final") and uncovered_final_at is None:
+                        uncovered_final_at = now
+                elif data.get("type") == "suggestions" and data.get("source") != "rules" and uncovered_final_at is not None:
+                    # Rule pushes share the message type but never wait on the LLM
+                    stats.suggestion_latencies.append(now - uncovered_final_at)
+                    uncovered_final_at = None
+    except Exception as e:
+        stats.errors += 1
+        print(f"[LoadTest] Client error: {e}")
+
+
+async def sample_metrics(base_url, stats, stop):
+    import aiohttp
+    async with aiohttp.ClientSession() as session:
+        while not stop.is_set():
+            try:
+                async with session.get(f"{base_url}/metrics") as response:
+                    data = await response.json()
+                    stats.loop_lag_p99.append(data["event_loop_lag"]["p99_ms"])
+                    stats.rss.append(data["rss_bytes"])
+            except aiohttp.ClientError:
+                pass
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=0.5)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def run_step(ws_url, base_url, mock_deepgram, clients, duration):
+    stats = StepStats()
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_metrics(base_url, stats, stop))
+    await asyncio.gather(*(run_client(ws_url, mock_deepgram, duration, stats) for _ in range(clients)))
+    stop.set()
+    await sampler
+    return stats
+
+
+def _ms(values, fraction):
+    return f"{percentile(values, fraction) * 1000:8.1f}" if values else "       -"
+
+
+async def main_async(args):
+    mock_deepgram = await MockDeepgram(args.deepgram_latency, args.result_interval).start()
+    mock_openai = await MockOpenAI(args.openai_latency).start()
+
+    workdir = tempfile.mkdtemp(prefix="callassist-load-")
+    silence_path = os.path.join(workdir, "silence.wav")
+    write_silence(silence_path)
+
+    port = free_port()
+    env = dict(os.environ,
+               DEEPGRAM_URL=mock_deepgram.url,
+               DEEPGRAM_API_KEY="mock",
+               OPENAI_API_KEY="mock",
+               OPENAI_BASE_URL=mock_openai.base_url,
+               AUDIO_INPUT="wav",
+               AUDIO_INPUT_SOURCE=silence_path,
+               JOURNAL_DIR=os.path.join(workdir, "journals"))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "local_transcription_server:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env,
+        stdout=subprocess.DEVNULL if not args.server_output else None,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    ws_url = f"ws://127.0.0.1:{port}/ws/transcribe"
+
+    try:
+        await wait_for_server(base_url)
+        print(f"{'clients':>7s} {'tx p50':>8s} {'tx p95':>8s} {'tx p99':>8s} {'sug p50':>8s} {'sug p95':>8s} "
+              f"{'sug p99':>8s} {'lag p99':>8s} {'rss MB':>8s} {'errors':>6s}")
+        for clients in args.ramp:
+            stats = await run_step(ws_url, base_url, mock_deepgram, clients, args.duration)
+            lag = f"{max(stats.loop_lag_p99, default=0.0):8.1f}"
+            rss = f"{max(stats.rss, default=0) / 2 ** 20:8.1f}"
+            print(f"{clients:7d} {_ms(stats.transcript_latencies, 0.5)} {_ms(stats.transcript_latencies, 0.95)} "
+                  f"{_ms(stats.transcript_latencies, 0.99)} {_ms(stats.suggestion_latencies, 0.5)} "
+                  f"{_ms(stats.suggestion_latencies, 0.95)} {_ms(stats.suggestion_latencies, 0.99)} "
+                  f"{lag} {rss} {stats.errors:6d}")
+            await asyncio.sleep(args.cooldown)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        await mock_deepgram.stop()
+        await mock_openai.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /ws/transcribe with mock Deepgram and OpenAI")
+    parser.add_argument("--ramp", type=int, nargs="+", default=[1, 5, 10, 25, 50])
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per ramp step")
+    parser.add_argument("--cooldown", type=float, default=2.0, help="Seconds between ramp steps")
+    parser.add_argument("--result-interval", type=float, default=0.5, help="Seconds between mock Deepgram results")
+    parser.add_argument("--deepgram-latency", default="fixed:150")
+    parser.add_argument("--openai-latency", default="lognormal:800,0.4")
+    parser.add_argument("--server-output", action="store_true", help="Show the server's log output")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
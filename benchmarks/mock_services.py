@@ -0,0 +1,184 @@
+"""
+Local stand-ins for Deepgram streaming and OpenAI chat completions, with
+configurable latency distributions, used by the load-test harness.
+
+Latency specs:
+    fixed:MS            always MS milliseconds
+    uniform:LO,HI       uniformly between LO and HI milliseconds
+    lognormal:MEDIAN,S  log-normal with the given median (ms) and sigma
+"""
+
+import asyncio
+import itertools
+import json
+import math
+import random
+import socket
+import time
+
+
+def free_port(host: str = "127.0.0.1") -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def parse_latency(spec: str, seed: int = 0):
+    """Returns a function producing latencies in seconds for a latency spec"""
+    rng = random.Random(seed)
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: rng.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda: rng.lognormvariate(mu, values[1]) / 1000
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+MOCK_WORDS = ("ik ben sinds vanochtend erg benauwd en mijn inhalator helpt niet goed "
+              "heeft u vandaag uw medicatie al gebruikt").split()
+
+MOCK_SUGGESTIONS = [{
+    "type": "warning",
+    "text": "Vraag naar gebruik van de Salbutamol inhalator",
+    "priority": "high",
+    "ecdReference": "Salbutamol inhalator, gebruik bij benauwdheid",
+    "ecdReferenceDate": "2018-03-10",
+    "ecdReferenceSource": "Patiëntinformatie ECD P123456",
+}]
+
+
+class MockDeepgram:
+    """
+    Websocket server that drains incoming audio and emits a cycle of interim
+    and final Results messages per connection; every final ends the speaker's
+    turn and is followed by an UtteranceEnd message. Each transcript carries a
+    unique token; the time it was sent is recorded in `sent_at` so clients can
+    measure fan-out latency through the server.
+    """
+
+    def __init__(self, latency: str = "fixed:150", result_interval: float = 0.5, words_per_result: int = 8):
+        self.latency = parse_latency(latency)
+        self.result_interval = result_interval
+        self.words_per_result = words_per_result
+        self.sent_at = {}
+        self.connections = 0
+        self._ids = itertools.count()
+        self._server = None
+        self.port = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        import websockets
+        self._server = await websockets.serve(self._handle, host, port, max_size=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    @property
+    def url(self):
+        return f"ws://127.0.0.1:{self.port}/v1/listen"
+
+    async def _handle(self, websocket, *args):
+        self.connections += 1
+        connection_id = next(self._ids)
+
+        async def drain():
+            async for _ in websocket:
+                pass
+
+        drain_task = asyncio.create_task(drain())
+        try:
+            for sequence in itertools.count():
+                await asyncio.sleep(self.result_interval)
+                is_final = sequence % 3 == 2
+                token = f"t{connection_id}x{sequence}"
+                words = [{"word": w, "punctuated_word": w, "speaker": (sequence // 3) % 2}
+                         for w in random.sample(MOCK_WORDS, self.words_per_result - 1)]
+                words.append({"word": token, "punctuated_word": token, "speaker": words[-1]["speaker"]})
+                message = json.dumps({
+                    "type": "Results",
+                    "is_final": is_final,
+                    "speech_final": is_final,
+                    "start": sequence * self.result_interval,
+                    "duration": self.result_interval,
+                    "channel": {"alternatives": [{"transcript": " ".join(w["word"] for w in words), "words": words}]},
+                })
+                asyncio.create_task(self._send_later(websocket, token, message))
+                if is_final:
+                    utterance_end = json.dumps({
+                        "type": "UtteranceEnd",
+                        "channel": [0, 1],
+                        "last_word_end": (sequence + 1) * self.result_interval,
+                    })
+                    asyncio.create_task(self._send_later(websocket, None, utterance_end))
+        except Exception:
+            pass
+        finally:
+            drain_task.cancel()
+
+    async def _send_later(self, websocket, token, message):
+        await asyncio.sleep(self.latency())
+        try:
+            if token is not None:
+                self.sent_at[token] = time.perf_counter()
+            await websocket.send(message)
+        except Exception:
+            self.sent_at.pop(token, None)
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+
+class MockOpenAI:
+    """HTTP server implementing POST /v1/chat/completions with canned answers"""
+
+    def __init__(self, latency: str = "lognormal:800,0.4"):
+        self.latency = parse_latency(latency, seed=1)
+        self.requests = 0
+        self._runner = None
+        self.port = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._completions)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        self.port = port or free_port(host)
+        await web.TCPSite(self._runner, host, self.port).start()
+        return self
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    async def _completions(self, request):
+        from aiohttp import web
+        self.requests += 1
+        body = await request.json()
+        await asyncio.sleep(self.latency())
+        prompt = body["messages"][-1]["content"]
+        if "JSON array" in prompt:
+            content = json.dumps(MOCK_SUGGESTIONS, ensure_ascii=False)
+        else:
+            content = "SAMENVATTING:\nMock samenvatting voor de load test."
+        prompt_tokens = sum(len(m["content"]) for m in body["messages"]) // 4
+        completion_tokens = len(content) // 4
+        return web.json_response({
+            "id": f"chatcmpl-mock-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+    async def stop(self):
+        await self._runner.cleanup()
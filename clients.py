@@ -0,0 +1,39 @@
+"""
+Shared, lazily created API clients and environment loading
+"""
+
+import os
+import threading
+
+_env_loaded = False
+_openai_client = None
+_lock = threading.Lock()
+
+
+def load_environment():
+    """Loads the .env file once per process"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def get_env(name: str, required: bool = False):
+    """Returns an environment variable, loading the .env file on first use"""
+    load_environment()
+    value = os.getenv(name)
+    if required and not value:
+        raise ValueError(f"{name} environment variable not set")
+    return value
+
+
+def get_openai_client():
+    """Returns the shared OpenAI client, created on first use"""
+    global _openai_client
+    if _openai_client is None:
+        with _lock:
+            if _openai_client is None:
+                from openai import OpenAI
+                _openai_client = OpenAI(api_key=get_env("OPENAI_API_KEY", required=True))
+    return _openai_client
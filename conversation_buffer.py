@@ -0,0 +1,154 @@
+"""
+Per-session conversation buffer with compact utterance records
+"""
+
+import sys
+import time
+from collections import deque
+from datetime import datetime
+
+from patient_dossier import get_patient_context
+
+# Conversation buffer settings
+CONVERSATION_BUFFER_SIZE = 50  # Increased from 20 to 100 utterances to ensure we have enough data for summary
+CONVERSATION_BUFFER_TIME = 300  # Increased from 60 to 300 seconds (5 minutes) to capture full conversation
+CONVERSATION_MERGE_GAP = 10.0  # Seconds after which a same-speaker run starts a new utterance
+CONVERSATION_MERGE_MAX_CHARS = 1000  # Merged utterances are not grown beyond this length
+
+ECD_SUMMARY_PLACEHOLDER = "Samenvatting wordt geladen..."
+
+# Offset between the monotonic clock and wall-clock time, used to render timestamps
+_WALL_CLOCK_OFFSET = time.time() - time.monotonic()
+
+# Interned "Speaker N" labels, shared by all sessions
+_speaker_labels = {None: "Unknown"}
+
+
+def speaker_label(speaker):
+    label = _speaker_labels.get(speaker)
+    if label is None:
+        label = _speaker_labels[speaker] = sys.intern(f"Speaker {speaker}")
+    return label
+
+
+def monotonic_from_wall(wall_time: float) -> float:
+    """Converts a time.time() value (e.g. from the journal) to the monotonic clock"""
+    return wall_time - _WALL_CLOCK_OFFSET
+
+
+class Utterance:
+    """
+    One speaker turn. The speaker is the Deepgram speaker index (small ints
+    are shared objects) and the timestamp is a time.monotonic() float.
+    """
+
+    __slots__ = ('speaker', 'text', 'timestamp')
+
+    def __init__(self, speaker, text, timestamp):
+        self.speaker = speaker
+        self.text = text
+        self.timestamp = timestamp
+
+    def wall_time(self) -> datetime:
+        return datetime.fromtimestamp(self.timestamp + _WALL_CLOCK_OFFSET)
+
+
+class ConversationBuffer:
+    __slots__ = ('utterances', 'patient_id', '_patient_context', 'ecd_summary',
+                 'suggestions', 'revision', 'journal', 'session_id', 'state', 'rules',
+                 'protocol_progress', 'cadence', 'turn_revision')
+
+    def __init__(self, patient_id=None, max_utterances=CONVERSATION_BUFFER_SIZE):
+        self.utterances = deque(maxlen=max_utterances)
+        self.patient_id = patient_id
+        # Loaded lazily; this is a reference to the string shared through the
+        # dossier context cache, not a per-session copy
+        self._patient_context = None
+        self.ecd_summary = ECD_SUMMARY_PLACEHOLDER  # Initial placeholder
+        self.suggestions = []  # Store suggestions
+        self.revision = 0  # Incremented on every change, also when a run is merged
+        self.journal = None  # Optional TranscriptJournal for crash recovery
+        self.session_id = None
+        self.state = None  # Optional SessionStateBackend shared across workers
+        self.rules = None  # Optional SessionRuleEngine for instant dossier warnings
+        self.protocol_progress = None  # Optional ProtocolProgressTracker
+        self.cadence = None  # Optional SuggestionCadence driving the suggestion worker
+        self.turn_revision = 0  # Revision at the last committed turn boundary
+
+    @property
+    def patient_context(self):
+        if self._patient_context is None:
+            self._patient_context = get_patient_context(self.patient_id)
+        return self._patient_context
+
+    def add_utterance(self, speaker, text, timestamp=None):
+        # Adjacent runs of the same speaker within one turn are merged into one
+        # utterance, so a turn split over several Deepgram results is stored as
+        # one record. A committed turn, a pause or the size cap starts a new one,
+        # which keeps long monologues inside the time window and max_utterances.
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        merge = self.turn_revision < self.revision
+        self.revision += 1
+        if merge and self.utterances:
+            last = self.utterances[-1]
+            if (last.speaker == speaker and timestamp - last.timestamp <= CONVERSATION_MERGE_GAP
+                    and len(last.text) + len(text) < CONVERSATION_MERGE_MAX_CHARS):
+                last.text = f"{last.text} {text}"
+                last.timestamp = timestamp
+                return
+        self.utterances.append(Utterance(speaker, text, timestamp))
+
+    def commit_turn(self):
+        """Marks the end of a speaker turn; False when nothing was added since the last one"""
+        if self.revision == self.turn_revision:
+            return False
+        self.turn_revision = self.revision
+        self.log_event('turn', revision=self.revision)
+        return True
+
+    def log_event(self, kind, **data):
+        """Records an event in the session journal and state backend, if attached"""
+        data['kind'] = kind
+        data['t'] = time.time()
+        if self.journal is not None:
+            self.journal.append_record(data)
+        if self.state is not None:
+            self.state.record_event(self.session_id, kind, data)
+
+    def restore_from_journal(self, records):
+        """Rebuilds the buffer from journal records after a crash or reconnect"""
+        for record in records:
+            kind = record.get('kind')
+            if kind == 'utterance':
+                self.add_utterance(record.get('speaker'), record['text'], monotonic_from_wall(record['t']))
+            elif kind == 'turn':
+                self.turn_revision = self.revision
+            elif kind == 'suggestions':
+                self.suggestions = record.get('suggestions', [])
+
+    def get_recent_conversation(self):
+        # Get utterances from the last CONVERSATION_BUFFER_TIME seconds. The
+        # buffer is in time order, so scan back from the newest utterance.
+        cutoff_time = time.monotonic() - CONVERSATION_BUFFER_TIME
+        count = 0
+        for u in reversed(self.utterances):
+            if u.timestamp <= cutoff_time:
+                break
+            count += 1
+        if count == len(self.utterances):
+            return list(self.utterances)
+        return list(self.utterances)[len(self.utterances) - count:]
+
+    def format_for_ai(self):
+        recent = self.get_recent_conversation()
+        if not recent:
+            return ""
+
+        return "\n".join(f"{speaker_label(u.speaker)}: {u.text}" for u in recent)
+
+    def get_full_transcript(self):
+        """Get the complete transcript formatted for the summary"""
+        return "\n".join(
+            f"[{u.wall_time().strftime('%H:%M:%S')}] {speaker_label(u.speaker)}: {u.text}"
+            for u in self.utterances
+        )
@@ -0,0 +1,76 @@
+"""
+Handling of Deepgram streaming messages, kept free of I/O so it can run on
+every interim message and be benchmarked in isolation
+"""
+
+import time
+
+
+def split_speaker_runs(words):
+    """
+    Splits Deepgram words into (speaker, text) runs of consecutive words by
+    the same speaker, in a single pass over the words.
+    """
+    runs = []
+    tokens = None
+    current_speaker = None
+    for word in words:
+        speaker = word.get('speaker')
+        token = word.get('punctuated_word') or word.get('word', '')
+        if tokens is not None and speaker == current_speaker:
+            tokens.append(token)
+        else:
+            tokens = [token]
+            current_speaker = speaker
+            runs.append((speaker, tokens))
+    return [(speaker, " ".join(tokens)) for speaker, tokens in runs]
+
+
+def is_turn_end(response_json):
+    """
+    True for the messages that end a speaker turn: an UtteranceEnd (gap in the
+    word timings, utterance_end_ms) or a final result with speech_final set
+    (silence detected by endpointing).
+    """
+    message_type = response_json.get('type')
+    if message_type == 'UtteranceEnd':
+        return True
+    return message_type == 'Results' and bool(response_json.get('speech_final')) and bool(response_json.get('is_final'))
+
+
+def handle_results_message(response_json, conversation_buffer, timestamp=None):
+    """
+    Processes a decoded Deepgram message. Final results are committed to the
+    conversation buffer per speaker run, at `timestamp` (monotonic seconds,
+    default now). Returns the transcript message for the frontend, or None
+    when the message carries no transcript.
+    """
+    # Only process Results type responses with non-empty transcripts
+    if response_json.get('type') != 'Results':
+        return None
+    alternatives = response_json.get('channel', {}).get('alternatives')
+    if not alternatives:
+        return None
+    alternative = alternatives[0]
+    transcript = alternative.get('transcript', '')
+    if not transcript or not transcript.strip():
+        return None
+    is_final = response_json.get('is_final', False)
+
+    # Split the result into per-speaker runs from the word-level diarization
+    runs = split_speaker_runs(alternative.get('words') or ()) or [(None, transcript)]
+
+    # Only final results are committed; interim results are superseded by them
+    if is_final:
+        now = time.monotonic() if timestamp is None else timestamp
+        for run_speaker, run_text in runs:
+            conversation_buffer.add_utterance(run_speaker, run_text, now)
+            conversation_buffer.log_event('utterance', speaker=run_speaker, text=run_text)
+
+    return {
+        "type": "transcript",
+        "transcript": transcript,
+        "is_final": is_final,
+        "speaker": runs[0][0],
+        "segments": [{"speaker": run_speaker, "text": run_text} for run_speaker, run_text in runs]
+    }
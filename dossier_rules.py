@@ -0,0 +1,151 @@
+"""
+Local rule engine that turns dossier facts into instant pre-suggestions.
+
+Rules are compiled once per session from the patient's dossier: allergies,
+current medication and symptoms linked to active diagnoses. Each final
+utterance is matched against one precompiled regular expression, so matching
+warnings reach the triagist within milliseconds while the LLM suggestions are
+still in flight. Every suggestion cites an exact line of the rendered dossier,
+snapped through the same reference index as the LLM citations, so both
+sources dedupe on ecdReference.
+"""
+
+import re
+from typing import Any, Dict, List
+
+from ecd_references import get_reference_index
+
+# Symptom terms per active diagnosis (matched on the lowercased diagnosis name).
+# Terms match whole words only, so inflections are listed explicitly.
+SYMPTOM_TERMS = {
+    "copd": ["benauwd", "benauwdheid", "kortademig", "kortademigheid", "adem", "ademhaling",
+             "geen lucht", "hoest", "hoesten", "piepen", "piept"],
+    "diabetes": ["suiker", "bloedsuiker", "hypo", "hypoglykemie", "glucose", "zweten", "zweet",
+                 "trillerig", "veel dorst"],
+    "hypertensie": ["bloeddruk", "hoofdpijn", "duizelig", "duizeligheid"],
+}
+
+
+class DossierRule:
+    __slots__ = ('id', 'terms', 'suggestion')
+
+    def __init__(self, rule_id: str, terms: List[str], suggestion: Dict[str, Any]):
+        self.id = rule_id
+        self.terms = terms
+        self.suggestion = suggestion
+
+
+def _medication_terms(name: str) -> List[str]:
+    # "Salbutamol inhalator" should also fire on "salbutamol" or "inhalator"
+    words = name.lower().split()
+    return [name.lower()] + [word for word in words if len(word) > 3]
+
+
+def compile_rules(dossier: Dict[str, Any]) -> List[DossierRule]:
+    """Builds the rules for one dossier; references match get_patient_context() lines"""
+    source = f"Patiëntinformatie ECD {dossier['patient_id']}"
+    rules = []
+
+    for allergy in dossier.get('allergieen', []):
+        rules.append(DossierRule(
+            f"allergy:{allergy['stof']}",
+            [allergy['stof'].lower()],
+            {
+                "type": "warning",
+                "text": f"Let op: allergie voor {allergy['stof']} ({allergy['reactie']})",
+                "priority": "high" if allergy.get('ernst') == "Hoog" else "medium",
+                "ecdReference": f"{allergy['stof']}: {allergy['reactie']} ({allergy['ernst']})",
+                "ecdReferenceDate": "",
+                "ecdReferenceSource": source,
+            },
+        ))
+
+    for medication in dossier.get('medicatie', []):
+        rules.append(DossierRule(
+            f"medication:{medication['naam']}",
+            _medication_terms(medication['naam']),
+            {
+                "type": "info",
+                "text": f"Patiënt gebruikt {medication['naam']} {medication['dosering']} {medication['frequentie']}",
+                "priority": "medium",
+                "ecdReference": f"{medication['naam']} {medication['dosering']} {medication['frequentie']} ({medication['reden']})",
+                "ecdReferenceDate": "",
+                "ecdReferenceSource": source,
+            },
+        ))
+
+    for condition in dossier.get('medische_geschiedenis', []):
+        if condition.get('status') != 'Actief':
+            continue
+        diagnosis = condition['diagnose'].lower()
+        terms = [term for key, key_terms in SYMPTOM_TERMS.items() if key in diagnosis for term in key_terms]
+        if not terms:
+            continue
+        rules.append(DossierRule(
+            f"condition:{condition['diagnose']}",
+            terms,
+            {
+                "type": "warning",
+                "text": f"Klacht past bij bekende {condition['diagnose']}; behandeling: {condition['behandeling']}",
+                "priority": "high",
+                "ecdReference": f"{condition['diagnose']} (sinds {condition['datum']}): {condition['behandeling']}",
+                "ecdReferenceDate": condition['datum'],
+                "ecdReferenceSource": source,
+            },
+        ))
+
+    return rules
+
+
+class SessionRuleEngine:
+    """
+    Per-session matcher over the compiled rules. Each rule fires at most once
+    per session; process() only looks at the newly committed text.
+    """
+
+    def __init__(self, rules: List[DossierRule]):
+        self._rules_by_term = {}
+        for rule in rules:
+            for term in rule.terms:
+                self._rules_by_term.setdefault(term, []).append(rule)
+        # Longest terms first so "geen lucht" wins over shorter overlapping terms
+        terms = sorted(self._rules_by_term, key=len, reverse=True)
+        self._pattern = re.compile(
+            r"\b(?:" + "|".join(re.escape(term) for term in terms) + r")\b",
+            re.IGNORECASE
+        ) if terms else None
+        self._fired = set()
+        self.suggestions = []
+
+    @classmethod
+    def for_dossier(cls, dossier):
+        if not dossier:
+            return cls([])
+        rules = compile_rules(dossier)
+        index = get_reference_index(dossier['patient_id'])
+        for rule in rules:
+            index.verify(rule.suggestion)
+        return cls(rules)
+
+    def process(self, text: str) -> List[Dict[str, Any]]:
+        """Returns the suggestions of rules that fire for the first time on this text"""
+        if self._pattern is None:
+            return []
+        new_suggestions = []
+        for match in self._pattern.finditer(text):
+            for rule in self._rules_by_term[match.group(0).lower()]:
+                if rule.id not in self._fired:
+                    self._fired.add(rule.id)
+                    suggestion = dict(rule.suggestion, source="rules")
+                    new_suggestions.append(suggestion)
+        self.suggestions.extend(new_suggestions)
+        return new_suggestions
+
+
+def merge_with_rule_suggestions(llm_suggestions, rule_suggestions):
+    """
+    Combines LLM suggestions with the rule-based ones. A rule suggestion is
+    dropped once the LLM cites the same dossier line, so the LLM refines it.
+    """
+    cited = {s.get('ecdReference') for s in llm_suggestions if isinstance(s, dict)}
+    return list(llm_suggestions) + [s for s in rule_suggestions if s['ecdReference'] not in cited]
@@ -0,0 +1,154 @@
+"""
+Verification of the `ecdReference` citations in LLM suggestions.
+
+The suggestion prompt asks for an exact sentence from the patient dossier.
+Instead of re-prompting when the model paraphrases, every reference is snapped
+locally to the closest sentence of the rendered patient context, using a
+character trigram index built once per dossier version. References that do not
+resemble any dossier sentence are flagged with `ecdReferenceVerified: False`.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from patient_dossier import PATIENT_CONTEXT_CACHE_SIZE, get_patient_context
+
+ECD_REFERENCE_MIN_SCORE = 0.5  # Minimum trigram Dice similarity to snap a reference
+ECD_REFERENCE_SOURCE = "Patiëntinformatie ECD {patient_id}"
+
+_DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+_SPACES = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    return _SPACES.sub(" ", text.strip().strip('"').lower())
+
+
+def _trigrams(text: str):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ReferenceEntry:
+    __slots__ = ('sentence', 'date', 'trigrams')
+
+    def __init__(self, sentence: str, date: str, trigrams):
+        self.sentence = sentence
+        self.date = date
+        self.trigrams = trigrams
+
+
+class ReferenceIndex:
+    """
+    Trigram index over the sentences of one rendered patient context. Every
+    line is a sentence, bulleted or not (the header and "Geboortedatum: ..."),
+    except section headers ending in a colon, which hold no dossier facts. The
+    part after "label: " is indexed as well, because the prompt example cites
+    only that part, but a match on it still snaps to the full line.
+    """
+
+    def __init__(self, context: str, patient_id: str):
+        self.source = ECD_REFERENCE_SOURCE.format(patient_id=patient_id)
+        self.entries: List[ReferenceEntry] = []
+        self._exact: Dict[str, ReferenceEntry] = {}
+        self._postings: Dict[str, List[int]] = {}
+
+        for line in context.splitlines():
+            line = line.strip()
+            if not line or line.endswith(":"):
+                continue
+            sentence = line[2:] if line.startswith("- ") else line
+            match = _DATE_PATTERN.search(sentence)
+            date = match.group(0) if match else ""
+            self._add(sentence, sentence, date)
+            label, separator, tail = sentence.partition(": ")
+            if separator and len(tail) > len(label):
+                self._add(tail, sentence, date)
+
+    def _add(self, text: str, sentence: str, date: str):
+        key = _normalize(text)
+        if key in self._exact:
+            return
+        entry = ReferenceEntry(sentence, date, _trigrams(key))
+        self._exact[key] = entry
+        position = len(self.entries)
+        self.entries.append(entry)
+        for gram in entry.trigrams:
+            self._postings.setdefault(gram, []).append(position)
+
+    def lookup(self, reference: str):
+        """Returns (entry, score) for the closest dossier sentence, or (None, 0.0)"""
+        key = _normalize(reference)
+        entry = self._exact.get(key)
+        if entry is not None:
+            return entry, 1.0
+
+        grams = _trigrams(key)
+        overlap = {}
+        for gram in grams:
+            for position in self._postings.get(gram, ()):
+                overlap[position] = overlap.get(position, 0) + 1
+        best, best_score = None, 0.0
+        for position, shared in overlap.items():
+            candidate = self.entries[position]
+            score = 2.0 * shared / (len(grams) + len(candidate.trigrams))
+            if score > best_score:
+                best, best_score = candidate, score
+        return best, best_score
+
+    def verify(self, suggestion: Dict[str, Any], min_score: float = ECD_REFERENCE_MIN_SCORE) -> Dict[str, Any]:
+        """Snaps the suggestion's ecdReference in place and fills date and source"""
+        reference = suggestion.get('ecdReference')
+        if not isinstance(reference, str) or not reference:
+            return suggestion
+        entry, score = self.lookup(reference)
+        if entry is None or score < min_score:
+            suggestion['ecdReferenceVerified'] = False
+            return suggestion
+        suggestion['ecdReference'] = entry.sentence
+        if entry.date:
+            suggestion['ecdReferenceDate'] = entry.date
+        suggestion['ecdReferenceSource'] = self.source
+        suggestion['ecdReferenceVerified'] = True
+        return suggestion
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_reference_index(patient_id: Optional[str] = None) -> ReferenceIndex:
+    """
+    Returns the index for the current dossier version. The rendered context
+    string is cached per version, so its identity tells whether to rebuild.
+    Without a patient the index is empty and every reference stays unverified.
+    """
+    if patient_id is None:
+        return ReferenceIndex("", patient_id)
+    context = get_patient_context(patient_id)
+    with _indexes_lock:
+        entry = _indexes.get(patient_id)
+        if entry is not None and entry[0] is context:
+            _indexes.move_to_end(patient_id)
+            return entry[1]
+
+    index = ReferenceIndex(context, patient_id)
+    with _indexes_lock:
+        _indexes[patient_id] = (context, index)
+        _indexes.move_to_end(patient_id)
+        while len(_indexes) > PATIENT_CONTEXT_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+def verify_references(suggestions, patient_id: Optional[str] = None):
+    """Verifies the ecdReference of every suggestion dict against the dossier"""
+    if not isinstance(suggestions, list):
+        return suggestions
+    index = get_reference_index(patient_id)
+    for suggestion in suggestions:
+        if isinstance(suggestion, dict):
+            index.verify(suggestion)
+    return suggestions
@@ -0,0 +1,123 @@
+"""
+In-memory accounting of LLM completions: tokens, cached tokens, latency and
+errors, tagged by session, prompt type and model.
+
+All chat completions go through create_chat_completion(), which times the
+call and records the `usage` field of the response. Recording is a few dict
+updates under a lock, so it is cheap enough for every call.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+from clients import get_openai_client
+from metrics import percentile
+
+LLM_USAGE_LATENCY_SAMPLES = 256  # Latency samples kept per prompt type and model
+LLM_USAGE_MAX_SESSIONS = 1000  # Most recent sessions kept for per-session totals
+
+
+def _new_totals():
+    return {
+        "calls": 0,
+        "errors": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cached_tokens": 0,
+        "latency_s": 0.0,
+    }
+
+
+def _add(totals, latency, prompt_tokens, completion_tokens, cached_tokens, error):
+    totals["calls"] += 1
+    totals["errors"] += error
+    totals["prompt_tokens"] += prompt_tokens
+    totals["completion_tokens"] += completion_tokens
+    totals["cached_tokens"] += cached_tokens
+    totals["latency_s"] += latency
+
+
+class UsageTracker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_endpoint = {}  # (prompt_type, model) -> totals
+        self._latencies = {}  # (prompt_type, model) -> recent latencies
+        self._sessions = OrderedDict()  # session_id -> {prompt_type: totals}
+
+    def record(self, prompt_type, model, latency, usage=None, session_id=None, error=False):
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+        completion_tokens = getattr(usage, "completion_tokens", None) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
+        key = (prompt_type, model)
+
+        with self._lock:
+            totals = self._by_endpoint.get(key)
+            if totals is None:
+                totals = self._by_endpoint[key] = _new_totals()
+                self._latencies[key] = deque(maxlen=LLM_USAGE_LATENCY_SAMPLES)
+            _add(totals, latency, prompt_tokens, completion_tokens, cached_tokens, error)
+            self._latencies[key].append(latency)
+
+            if session_id is not None:
+                session = self._sessions.get(session_id)
+                if session is None:
+                    session = self._sessions[session_id] = {}
+                    while len(self._sessions) > LLM_USAGE_MAX_SESSIONS:
+                        self._sessions.popitem(last=False)
+                else:
+                    self._sessions.move_to_end(session_id)
+                totals = session.get(prompt_type)
+                if totals is None:
+                    totals = session[prompt_type] = _new_totals()
+                _add(totals, latency, prompt_tokens, completion_tokens, cached_tokens, error)
+
+    def snapshot(self):
+        """Totals and latency percentiles per prompt type and model"""
+        with self._lock:
+            endpoints = [(key, dict(totals), list(self._latencies[key])) for key, totals in self._by_endpoint.items()]
+            sessions = len(self._sessions)
+        result = []
+        for (prompt_type, model), totals, latencies in endpoints:
+            totals.update(
+                prompt_type=prompt_type,
+                model=model,
+                latency_s=round(totals["latency_s"], 3),
+                latency_p50_s=round(percentile(latencies, 0.50), 3),
+                latency_p99_s=round(percentile(latencies, 0.99), 3),
+                avg_prompt_tokens=round(totals["prompt_tokens"] / max(1, totals["calls"] - totals["errors"]), 1),
+            )
+            result.append(totals)
+        return {"endpoints": result, "sessions": sessions}
+
+    def session_usage(self, session_id):
+        """Per prompt type totals of one session, plus the overall total"""
+        with self._lock:
+            session = {prompt_type: dict(totals) for prompt_type, totals in self._sessions.get(session_id, {}).items()}
+        total = _new_totals()
+        for totals in session.values():
+            for field in total:
+                total[field] += totals[field]
+            totals["latency_s"] = round(totals["latency_s"], 3)
+        total["latency_s"] = round(total["latency_s"], 3)
+        return {"by_prompt_type": session, "total": total}
+
+
+usage_tracker = UsageTracker()
+
+
+def create_chat_completion(prompt_type, session_id=None, **kwargs):
+    """
+    Calls chat.completions.create on the shared client and records its usage,
+    latency and errors. Blocking, like the underlying client call.
+    """
+    model = kwargs.get("model")
+    start = time.perf_counter()
+    try:
+        response = get_openai_client().chat.completions.create(**kwargs)
+    except Exception:
+        usage_tracker.record(prompt_type, model, time.perf_counter() - start, session_id=session_id, error=True)
+        raise
+    usage_tracker.record(prompt_type, model, time.perf_counter() - start, getattr(response, "usage", None), session_id)
+    return response
@@ -1,29 +1,89 @@
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, Header, HTTPException, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
 import json
-import websockets
 import argparse
+import secrets
 import wave
-import pyaudio
-import aiohttp
 import sys
-import os
-from dotenv import load_dotenv
-from datetime import datetime, timedelta
-from openai import AsyncOpenAI
-from collections import deque
-from openai import OpenAI
-from patient_dossier import get_patient_context, generate_ecd_summary
+from datetime import datetime
+from clients import get_env
+from conversation_buffer import ConversationBuffer
+from deepgram_messages import handle_results_message, is_turn_end
+from dossier_rules import SessionRuleEngine, merge_with_rule_suggestions
+from ecd_references import verify_references
+from llm_usage import create_chat_completion, usage_tracker
+from metrics import LoopLagMonitor, rss_bytes
+from protocol_progress import ProtocolProgressTracker
+from patient_dossier import ECD_SUMMARY_ERROR, NO_DOSSIER_ERROR, generate_ecd_summary, get_dossier_store, resolve_patient_id
+from session_resume import ClientChannel, ResumableSession, get_resumable_session, register_session, remove_session
+from session_state import close_session_state, get_session_state
+from suggestion_cadence import SuggestionCadence, cadence_snapshot, run_suggestion_loop
 import threading
-from protocols import get_relevant_protocols, ProtocolType
+import time
+import uuid
+from contextlib import asynccontextmanager
+from urllib.parse import urlencode
+from audio_processing import (
+    AUDIO_ENCODER_ARGS,
+    AUDIO_ENCODING,
+    AudioEncoder,
+    DEEPGRAM_KEEPALIVE_INTERVAL,
+    DEEPGRAM_KEEPALIVE_MESSAGE,
+    VoiceActivityDetector,
+    deepgram_audio_params,
+    vad_hangover_ms,
+)
+from transcript_journal import TranscriptJournal, read_journal
+from protocols import get_protocol_registry, get_protocols, get_relevant_protocols, ProtocolType
+
+# Heavyweight and optional dependencies (websockets, pyaudio, aiohttp, openai, dotenv)
+# are imported on first use to keep worker cold start and test imports fast.
+
+loop_lag_monitor = LoopLagMonitor()
+active_sessions = 0
+
+
+@asynccontextmanager
+async def lifespan(app):
+    print("INFO: Running local_transcription_server v2 with diarization, utterance logging and live suggestions")
+    loop_lag_monitor.start()
+    get_protocol_registry().start()
+    get_endpointing_options()  # Validates the Deepgram turn detection settings once
+    yield
+    await close_session_state()
+
+
+app = FastAPI(lifespan=lifespan)
 
-# Load environment variables
-load_dotenv()
 
-print("INFO: Running local_transcription_server v2 with diarization, utterance logging and live suggestions")
+@app.get("/metrics")
+async def get_metrics():
+    return {
+        "active_sessions": active_sessions,
+        "event_loop_lag": loop_lag_monitor.snapshot(),
+        "suggestion_cadence": cadence_snapshot(),
+        "rss_bytes": rss_bytes(),
+    }
 
-app = FastAPI()
+
+def require_admin_token(authorization):
+    """Rejects admin requests without `Authorization: Bearer <ADMIN_TOKEN>`; without ADMIN_TOKEN the admin endpoints are off"""
+    admin_token = get_env("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not found")
+    if authorization is None:
+        raise HTTPException(status_code=401, detail="Missing admin token")
+    if not secrets.compare_digest(authorization.encode(), f"Bearer {admin_token}".encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/admin/llm-usage")
+async def get_llm_usage(session_id: str = None, authorization: str = Header(None)):
+    """LLM tokens, cached tokens, latency and errors per prompt type and model, or for one session"""
+    require_admin_token(authorization)
+    if session_id:
+        return usage_tracker.session_usage(session_id)
+    return usage_tracker.snapshot()
 
 # Add CORS middleware
 app.add_middleware(
@@ -34,100 +94,108 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize OpenAI client
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OPENAI_API_KEY environment variable not set")
-
-# Initialize the client exactly like example.py
-client = OpenAI(api_key=api_key)
-
-# Conversation buffer settings
-CONVERSATION_BUFFER_SIZE = 50  # Increased from 20 to 100 utterances to ensure we have enough data for summary
-CONVERSATION_BUFFER_TIME = 300  # Increased from 60 to 300 seconds (5 minutes) to capture full conversation
-SUGGESTION_INTERVAL = 5  # Seconds between suggestion updates
+# Deepgram streaming endpoint with optimized settings for lower latency
+DEEPGRAM_LISTEN_URL = "wss://api.deepgram.com/v1/listen"
+DEEPGRAM_SAMPLE_RATE = 16000
+DEEPGRAM_OPTIONS = {
+    "channels": 1,
+    "model": "general",
+    "language": "nl",
+    "diarize": "true",
+    "utterances": "true",
+    "interim_results": "true",
+}
+# Turn detection: speech_final after this much silence, and UtteranceEnd
+# messages after a gap in the word timings (Deepgram's minimum is 1000 ms)
+DEEPGRAM_ENDPOINTING_MS = 300
+DEEPGRAM_UTTERANCE_END_MS = 1000
+
+
+def get_audio_encoding():
+    """Returns the configured uplink encoding (linear16, opus or flac)"""
+    encoding = get_env("AUDIO_ENCODING") or AUDIO_ENCODING
+    if encoding not in AUDIO_ENCODER_ARGS:
+        raise ValueError(f"Unsupported AUDIO_ENCODING: {encoding}")
+    return encoding
+
+
+_endpointing_options = None
+
+
+def parse_endpointing_setting(name, default):
+    """Milliseconds from an environment variable, None for "false", the default with a warning when invalid"""
+    value = get_env(name)
+    if not value:
+        return default
+    if value.strip().lower() == "false":
+        return None
+    try:
+        milliseconds = int(value)
+        if milliseconds <= 0:
+            raise ValueError("must be positive")
+    except ValueError:
+        print(f"[Backend] Invalid {name}={value!r}, using {default} ms at {datetime.now().strftime('%H:%M:%S.%f')}")
+        return default
+    return milliseconds
+
+
+def get_endpointing_options():
+    """
+    Returns the Deepgram turn detection options. DEEPGRAM_ENDPOINTING and
+    DEEPGRAM_UTTERANCE_END_MS override the defaults; "false" disables either.
+    Read once, so an invalid value is reported at startup.
+    """
+    global _endpointing_options
+    if _endpointing_options is None:
+        options = {}
+        endpointing = parse_endpointing_setting("DEEPGRAM_ENDPOINTING", DEEPGRAM_ENDPOINTING_MS)
+        if endpointing is not None:
+            options["endpointing"] = endpointing
+        utterance_end = parse_endpointing_setting("DEEPGRAM_UTTERANCE_END_MS", DEEPGRAM_UTTERANCE_END_MS)
+        if utterance_end is not None:
+            options["utterance_end_ms"] = utterance_end
+        _endpointing_options = options
+    return _endpointing_options
+
+
+def build_deepgram_uri(encoding=AUDIO_ENCODING, sample_rate=DEEPGRAM_SAMPLE_RATE, channels=1, **options):
+    """
+    Builds the Deepgram streaming URI for the given uplink encoding. Only raw
+    linear16 is described by encoding, sample_rate and channels; Deepgram reads
+    them from the Ogg-Opus and FLAC headers, and from a containerised source
+    forwarded as-is (encoding None).
+    """
+    params = deepgram_audio_params(encoding, sample_rate, channels)
+    params.update(DEEPGRAM_OPTIONS, **get_endpointing_options(), **options)
+    return f"{get_env('DEEPGRAM_URL') or DEEPGRAM_LISTEN_URL}?{urlencode(params)}"
+
+
+def create_audio_encoder(encoding, sample_rate=DEEPGRAM_SAMPLE_RATE, channels=1):
+    """Returns an encoder for compressed encodings, or None for raw linear16"""
+    return AudioEncoder(encoding, sample_rate, channels) if AUDIO_ENCODER_ARGS.get(encoding) else None
 
 # Add keepalive settings
 KEEPALIVE_INTERVAL = 10  # Reduced from 10 to 5 seconds
 KEEPALIVE_TIMEOUT = 5   # Reduced from 5 to 3 seconds
 
-class ConversationBuffer:
-    def __init__(self):
-        self.utterances = deque(maxlen=CONVERSATION_BUFFER_SIZE)
-        self.last_suggestion_time = datetime.now()
-        self.patient_context = get_patient_context()  # Store patient context once
-        self.ecd_summary = "Samenvatting wordt geladen..."  # Initial placeholder
-        self.suggestions = []  # Store suggestions
-    
-    def add_utterance(self, speaker, text, timestamp):
-        self.utterances.append({
-            'speaker': speaker,
-            'text': text,
-            'timestamp': timestamp
-        })
-    
-    def get_recent_conversation(self):
-        # Get utterances from the last CONVERSATION_BUFFER_TIME seconds
-        cutoff_time = datetime.now() - timedelta(seconds=CONVERSATION_BUFFER_TIME)
-        recent = [u for u in self.utterances if u['timestamp'] > cutoff_time]
-        return recent
-    
-    def format_for_ai(self):
-        recent = self.get_recent_conversation()
-        if not recent:
-            return ""
-        
-        formatted = []
-        for u in recent:
-            speaker = f"Speaker {u['speaker']}" if u['speaker'] is not None else "Unknown"
-            formatted.append(f"{speaker}: {u['text']}")
-        
-        return "\n".join(formatted)
-
-    def get_full_transcript(self):
-        """Get the complete transcript formatted for the summary"""
-        formatted = []
-        for u in self.utterances:
-            speaker = f"Speaker {u['speaker']}" if u['speaker'] is not None else "Unknown"
-            timestamp = u['timestamp'].strftime('%H:%M:%S')
-            formatted.append(f"[{timestamp}] {speaker}: {u['text']}")
-        return "\n".join(formatted)
-
-def ecd_summary_worker(client_ws, stop_event):
-    """Worker thread for generating ECD summary"""
-    try:
-        print(f"[Backend] Starting ECD summary generation in background at {datetime.now().strftime('%H:%M:%S.%f')}")
-        # Create a new event loop for this thread
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        # Run the summary generation in the new event loop
-        summary_content = loop.run_until_complete(generate_ecd_summary(client_ws))
-        print(f"[Backend] ECD summary generation completed at {datetime.now().strftime('%H:%M:%S.%f')}. Length: {len(summary_content)}")
-    except Exception as e:
-        print(f"[Backend] Error generating ECD summary: {e} at {datetime.now().strftime('%H:%M:%S.%f')}")
-        try:
-            loop = asyncio.get_event_loop()
-            loop.run_until_complete(client_ws.send_text(json.dumps({
-                "type": "ecd_summary_error",
-                "error": str(e)
-            })))
-        except:
-            pass
-    finally:
-        loop.close()
-
 async def get_ai_suggestions(conversation_text, patient_context, client_ws, conversation_buffer):
     if not conversation_text:
         return []
     
+    request_start = None
     try:
         print(f"[Backend] Requesting AI suggestions for conversation (first 100 chars): {conversation_text[:100]}... at {datetime.now().strftime('%H:%M:%S.%f')}")
         
-        # Check for relevant protocols
-        relevant_protocols = get_relevant_protocols(conversation_text)
+        # Check for relevant protocols on one snapshot, also if they are reloaded meanwhile
+        relevant_protocols = get_relevant_protocols(conversation_text, get_protocols())
         
-        response = client.chat.completions.create(
+        # Run the blocking completion in a worker thread, so transcripts and
+        # rule-based warnings keep flowing while the LLM call is in flight
+        loop = asyncio.get_running_loop()
+        request_start = time.monotonic()
+        response = await loop.run_in_executor(None, lambda: create_chat_completion(
+            "suggestions",
+            conversation_buffer.session_id,
             model="gpt-4.1-nano",
             messages=[{
                 "role": "system",
@@ -155,11 +223,16 @@ Antwoord ALLEEN met een JSON array in dit exacte formaat:
 Analyseer dit gesprek en geef suggesties:
 {conversation_text}"""
             }]
-        )
+        ))
+        if conversation_buffer.cadence is not None:
+            conversation_buffer.cadence.record_call(time.monotonic() - request_start)
         
         if response.choices[0].message.content:
             try:
                 suggestions = json.loads(response.choices[0].message.content)
+
+                # Snap each ecdReference to an exact dossier sentence, or flag it
+                suggestions = verify_references(suggestions, conversation_buffer.patient_id)
                 
                 # Add protocol suggestions if any are relevant
                 for protocol in relevant_protocols:
@@ -173,9 +246,15 @@ Analyseer dit gesprek en geef suggesties:
                         "steps": protocol.steps  # The steps already contain their own example_questions
                     }
                     suggestions.append(protocol_suggestion)
+                    await send_protocol_events(conversation_buffer, client_ws, protocol_id=protocol.id)
                 
+                # Keep rule-based warnings the LLM did not refine
+                if conversation_buffer.rules is not None:
+                    suggestions = merge_with_rule_suggestions(suggestions, conversation_buffer.rules.suggestions)
+
                 # Store suggestions in conversation buffer
                 conversation_buffer.suggestions = suggestions
+                conversation_buffer.log_event('suggestions', suggestions=suggestions)
                 
                 print(f"[Backend] Received suggestions: {suggestions} at {datetime.now().strftime('%H:%M:%S.%f')}")
                 # Send complete suggestions to frontend
@@ -192,17 +271,69 @@ Analyseer dit gesprek en geef suggesties:
             
     except Exception as e:
         print(f"[Backend] Error getting AI suggestions: {str(e)} at {datetime.now().strftime('%H:%M:%S.%f')}")
+        if conversation_buffer.cadence is not None and request_start is not None:
+            conversation_buffer.cadence.record_call(time.monotonic() - request_start, ok=False)
         return []
 
-async def sender(websocket, method, input_source):
+async def sender(websocket, method, input_source, vad=None, encoder=None):
+    # Optional voice activity detection and compression; both only apply to
+    # raw linear16 sources, URL sources are forwarded as-is
+    if method == 'url':
+        vad = None
+        encoder = None
+    last_send = time.monotonic()
+    pump_task = None
+
+    if encoder is not None:
+        await encoder.start()
+
+        async def pump_encoded():
+            # Forward encoded frames to Deepgram as soon as the encoder emits them
+            while True:
+                encoded = await encoder.read()
+                if not encoded:
+                    break
+                await websocket.send(encoded)
+
+        pump_task = asyncio.create_task(pump_encoded())
+
+    async def send(data):
+        nonlocal last_send
+        chunks = vad.process(data) if vad is not None else (data,)
+        now = time.monotonic()
+        if chunks:
+            for chunk in chunks:
+                if encoder is not None:
+                    await encoder.write(chunk)
+                else:
+                    await websocket.send(chunk)
+            last_send = now
+        elif now - last_send >= DEEPGRAM_KEEPALIVE_INTERVAL:
+            # Keep the Deepgram stream open while silence is suppressed
+            await websocket.send(DEEPGRAM_KEEPALIVE_MESSAGE)
+            last_send = now
+
+    try:
+        await _capture(method, input_source, send)
+        if pump_task is not None:
+            # Drain the frames still buffered in the encoder
+            await encoder.close()
+            await pump_task
+    finally:
+        if pump_task is not None:
+            pump_task.cancel()
+            await encoder.terminate()
+
+async def _capture(method, input_source, send):
     if method == 'wav':
         with wave.open(input_source, 'rb') as wav_file:
             while True:
                 data = wav_file.readframes(1024)
                 if not data:
                     break
-                await websocket.send(data)
+                await send(data)
     elif method == 'mic':
+        import pyaudio
         print(f"[Backend] Initializing PyAudio at {datetime.now().strftime('%H:%M:%S.%f')}")
         p = pyaudio.PyAudio()
         print(f"[Backend] PyAudio initialized. Opening stream... at {datetime.now().strftime('%H:%M:%S.%f')}")
@@ -217,7 +348,7 @@ async def sender(websocket, method, input_source):
             while True:
                 data = stream.read(1024)
                 # print(f"Read {len(data)} bytes from mic") # Optional: detailed data logging
-                await websocket.send(data)
+                await send(data)
         except KeyboardInterrupt:
             print(f"[Backend] Microphone stream stopped by user at {datetime.now().strftime('%H:%M:%S.%f')}.")
             stream.stop_stream()
@@ -226,13 +357,14 @@ async def sender(websocket, method, input_source):
         except Exception as e:
             print(f"[Backend] Error in microphone sender: {e} at {datetime.now().strftime('%H:%M:%S.%f')}")
     elif method == 'url':
+        import aiohttp
         async with aiohttp.ClientSession() as session:
             async with session.get(input_source) as response:
                 while True:
                     chunk = await response.content.read(1024)
                     if not chunk:
                         break
-                    await websocket.send(chunk)
+                    await send(chunk)
 
 async def send_keepalive(websocket):
     """Send periodic keepalive messages to keep the connection alive"""
@@ -244,56 +376,48 @@ async def send_keepalive(websocket):
             print(f"[Backend] Error sending keepalive: {e} at {datetime.now().strftime('%H:%M:%S.%f')}")
             break
 
-async def suggestion_worker(conversation_buffer, client_ws, stop_event):
-    """Background worker that periodically generates and sends suggestions"""
-    last_suggestion_time = datetime.now()
-    last_conversation_length = 0
-    
-    while not stop_event.is_set():
-        try:
-            current_time = datetime.now()
-            current_conversation = conversation_buffer.get_recent_conversation()
-            current_length = len(current_conversation)
-            
-            # Generate new suggestions if:
-            # 1. We have new content (current_length > last_conversation_length)
-            # 2. We haven't requested suggestions too recently (at least 5 seconds ago)
-            if current_length > last_conversation_length and (current_time - last_suggestion_time).total_seconds() >= SUGGESTION_INTERVAL:
-                print(f"[Backend] New content detected for suggestions: {current_length} utterances (previous: {last_conversation_length}) at {datetime.now().strftime('%H:%M:%S.%f')}")
-                
-                # Get recent conversation and generate suggestions
-                conversation_text = conversation_buffer.format_for_ai()
-                if conversation_text:
-                    print(f"[Backend] Getting AI suggestions for conversation at {datetime.now().strftime('%H:%M:%S.%f')}")
-                    # Pass conversation_buffer to get_ai_suggestions
-                    suggestions = await get_ai_suggestions(conversation_text, conversation_buffer.patient_context, client_ws, conversation_buffer)
-                    
-                    # Update last suggestion time and conversation length
-                    last_suggestion_time = current_time
-                    last_conversation_length = current_length
-            
-            # Sleep for a short time to prevent busy waiting
-            await asyncio.sleep(1)
-            
-        except Exception as e:
-            print(f"[Backend] Error in suggestion worker: {e} at {datetime.now().strftime('%H:%M:%S.%f')}")
-            await asyncio.sleep(1)  # Sleep before retrying
-
-async def generate_conversation_summary(conversation_buffer: ConversationBuffer, client_ws: WebSocket, summary_type: str = 'report'):
-    try:
-        print(f"[Backend] Starting to generate {summary_type} summary at {datetime.now().strftime('%H:%M:%S.%f')}")
-        
-        # Notify client that summary generation has started
-        await client_ws.send_text(json.dumps({
-            "type": "conversation_summary_start"
-        }))
-
-        # Get the full transcript
-        transcript = conversation_buffer.get_full_transcript()
-        
-        # Prepare the prompt based on summary type
-        if summary_type == 'followup':
-            system_prompt = """Je bent een ervaren zorgverlener die een professioneel overdrachtsbericht opstelt voor de opvolging (bijv. thuiszorg).
+async def suggestion_worker(conversation_buffer, client_ws, stop_event, turn_event=None):
+    """
+    Background worker that generates and sends suggestions at speaker turn
+    boundaries (turn_event), falling back to the adaptive interval
+    """
+    async def request_suggestions(conversation_text):
+        print(f"[Backend] Getting AI suggestions for conversation at {datetime.now().strftime('%H:%M:%S.%f')}")
+        await get_ai_suggestions(conversation_text, conversation_buffer.patient_context, client_ws, conversation_buffer)
+
+    await run_suggestion_loop(conversation_buffer, request_suggestions, stop_event, turn_event)
+
+async def send_rule_suggestions(text, conversation_buffer, client_ws):
+    """Sends dossier rule warnings for a final utterance ahead of the LLM suggestions"""
+    if conversation_buffer.rules is None or not conversation_buffer.rules.process(text):
+        return
+    llm_suggestions = [s for s in conversation_buffer.suggestions if s.get('source') != 'rules']
+    conversation_buffer.suggestions = merge_with_rule_suggestions(llm_suggestions, conversation_buffer.rules.suggestions)
+    await client_ws.send_text(json.dumps({
+        "type": "suggestions",
+        "source": "rules",
+        "suggestions": conversation_buffer.suggestions
+    }))
+    print(f"[Backend] Sent rule-based suggestions at {datetime.now().strftime('%H:%M:%S.%f')}")
+
+async def send_protocol_events(conversation_buffer, client_ws, text=None, protocol_id=None):
+    """Sends protocol_progress events for a committed utterance or an activated protocol"""
+    tracker = conversation_buffer.protocol_progress
+    if tracker is None:
+        return
+    if protocol_id is not None:
+        event = tracker.activate(protocol_id)
+        events = [event] if event is not None else []
+    else:
+        events = tracker.process(text)
+    for event in events:
+        await client_ws.send_text(json.dumps(event))
+        print(f"[Backend] Sent protocol progress for {event['protocol_id']} (next step: {event['next_step']}) at {datetime.now().strftime('%H:%M:%S.%f')}")
+
+def build_summary_prompts(transcript: str, summary_type: str = 'report'):
+    """Returns the (system, user) prompts for a 'report' or 'followup' summary"""
+    if summary_type == 'followup':
+        system_prompt = """Je bent een ervaren zorgverlener die een professioneel overdrachtsbericht opstelt voor de opvolging (bijv. thuiszorg).
             Het bericht moet:
             - Professioneel en zakelijk zijn
             - Alle relevante medische en zorginformatie bevatten
@@ -302,8 +426,8 @@ async def generate_conversation_summary(conversation_buffer: ConversationBuffer,
             - Direct bruikbaar zijn voor de zorgverleners die de opvolging doen
             
             Gebruik professionele medische terminologie waar gepast, maar zorg dat het bericht duidelijk en volledig is."""
-            
-            user_prompt = f"""Maak een overdrachtsbericht voor de opvolging op basis van dit gesprek:
+        
+        user_prompt = f"""Maak een overdrachtsbericht voor de opvolging op basis van dit gesprek:
 
             {transcript}
 
@@ -328,12 +452,12 @@ async def generate_conversation_summary(conversation_buffer: ConversationBuffer,
 
             Met vriendelijke groet,
             [Naam zorgverlener]"""
-        else:  # Default to report format
-            system_prompt = """Je bent een ervaren medisch verslaggever die een professioneel ECD-verslag opstelt volgens de SOAP-methode.
+    else:  # Default to report format
+        system_prompt = """Je bent een ervaren medisch verslaggever die een professioneel ECD-verslag opstelt volgens de SOAP-methode.
             Focus op objectiviteit, feitelijke nauwkeurigheid en gebruik medische terminologie waar gepast.
             Zorg dat het verslag direct bruikbaar is voor zowel ECD-rapportage als overdracht naar wijkverpleging."""
-            
-            user_prompt = f"""Maak een professioneel ECD-verslag op basis van dit gesprek:
+        
+        user_prompt = f"""Maak een professioneel ECD-verslag op basis van dit gesprek:
 
             {transcript}
 
@@ -357,14 +481,34 @@ async def generate_conversation_summary(conversation_buffer: ConversationBuffer,
             PLAN
             [Behandelplan en vervolgstappen. Gebruik informatie benoemd in het gesprek]"""
 
+    return system_prompt, user_prompt
+
+async def generate_conversation_summary(conversation_buffer: ConversationBuffer, client_ws: WebSocket, summary_type: str = 'report'):
+    try:
+        print(f"[Backend] Starting to generate {summary_type} summary at {datetime.now().strftime('%H:%M:%S.%f')}")
+        
+        # Notify client that summary generation has started
+        await client_ws.send_text(json.dumps({
+            "type": "conversation_summary_start"
+        }))
+
+        # Get the full transcript
+        transcript = conversation_buffer.get_full_transcript()
+        
+        system_prompt, user_prompt = build_summary_prompts(transcript, summary_type)
+
         # Generate the summary using the appropriate prompt
-        response = await generate_summary(system_prompt, user_prompt)
+        response = await generate_summary(system_prompt, user_prompt, f"summary_{summary_type}", conversation_buffer.session_id)
         
         if response:
+            conversation_buffer.log_event('summary', summary_type=summary_type, summary=response)
+
             # Send the summary to the client
+            # The summary ends the call, so it carries the session's LLM usage
             await client_ws.send_text(json.dumps({
                 "type": "conversation_summary_complete",
-                "summary": response
+                "summary": response,
+                "llm_usage": usage_tracker.session_usage(conversation_buffer.session_id)
             }))
             print(f"[Backend] {summary_type.capitalize()} summary generated and sent at {datetime.now().strftime('%H:%M:%S.%f')}")
         else:
@@ -377,25 +521,83 @@ async def generate_conversation_summary(conversation_buffer: ConversationBuffer,
             "error": str(e)
         }))
 
-async def connect_to_deepgram(client_ws: WebSocket):
-    # Deepgram WebSocket URL with optimized settings for lower latency
-    uri = f"wss://api.deepgram.com/v1/listen?encoding=linear16&sample_rate=16000&channels=1&model=general&language=nl&diarize=true&utterances=true&interim_results=true"
+class _ThreadSender:
+    """Sends through the client channel on the main loop from another thread's loop"""
+
+    def __init__(self, channel, loop):
+        self.channel = channel
+        self.loop = loop
+
+    async def send_text(self, text):
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self.channel.send_text(text), self.loop))
+
+async def connect_to_deepgram(client_ws, patient_id=None, session_id=None, resumable=None):
+    """
+    Runs one transcription session. client_ws is normally a ClientChannel, so
+    the session survives a dropped browser socket while `resumable` is live.
+    """
+    import websockets
+
+    encoding = get_audio_encoding()
+    uri = build_deepgram_uri(encoding)
+    # Without Deepgram turn detection every final result counts as a turn
+    turn_per_final = not get_endpointing_options()
+    turn_event = asyncio.Event()
+    turn_texts = []
     
     # Get Deepgram API key from environment variable
-    api_key = os.getenv("DEEPGRAM_API_KEY")
-    if not api_key:
-        raise ValueError("DEEPGRAM_API_KEY environment variable not set")
+    api_key = get_env("DEEPGRAM_API_KEY", required=True)
 
     # Create stop event for suggestion worker here
     stop_event = asyncio.Event()
 
-    # Initialize conversation buffer
-    conversation_buffer = ConversationBuffer()
+    # Initialize conversation buffer. On reconnect it is rebuilt from the shared
+    # session state (any worker or node), falling back to the local journal.
+    session_state = await get_session_state()
+    conversation_buffer = ConversationBuffer(patient_id)
+    if session_id:
+        records = await session_state.load_session(session_id)
+        source = "session state"
+        if not records:
+            records = read_journal(session_id)
+            source = "journal"
+        if records:
+            conversation_buffer.restore_from_journal(records)
+            print(f"[Backend] Restored session {session_id} from {source} ({len(records)} records) at {datetime.now().strftime('%H:%M:%S.%f')}")
+    else:
+        session_id = uuid.uuid4().hex
+    conversation_buffer.session_id = session_id
+    conversation_buffer.state = session_state
+    conversation_buffer.journal = TranscriptJournal(session_id).start()
+
+    # Compile the dossier rules once per session for instant pre-suggestions;
+    # patient_id is already resolved, None means the caller has no dossier
+    conversation_buffer.rules = SessionRuleEngine.for_dossier(get_dossier_store().get(patient_id) if patient_id else None)
+    conversation_buffer.protocol_progress = ProtocolProgressTracker()
+    conversation_buffer.cadence = SuggestionCadence()
+    session_message = {
+        "type": "session",
+        "session_id": session_id
+    }
+    if resumable is not None:
+        resumable.session_id = session_id
+        resumable.buffer = conversation_buffer
+        session_message["resume_token"] = resumable.token
+    await client_ws.send_text(json.dumps(session_message))
+
+    # Optional local voice activity detection to suppress silence before upload;
+    # the hangover covers Deepgram's turn detection window, otherwise the
+    # silence that ends a turn never reaches it
+    vad = None
+    if get_env("VAD_ENABLED") in ("1", "true", "True"):
+        turn_silence_ms = max(get_endpointing_options().values(), default=0)
+        vad = VoiceActivityDetector(hangover_ms=vad_hangover_ms(turn_silence_ms))
 
     # Initialize tasks and buffer as None
     sender_task = None
     keepalive_task = None
     suggestion_task = None
+    summary_task = None
     deepgram_ws = None
     ecd_thread = None
 
@@ -432,7 +634,9 @@ async def connect_to_deepgram(client_ws: WebSocket):
             raise
         
         # Start audio sender immediately
-        sender_task = asyncio.create_task(sender(deepgram_ws, 'mic', None))
+        # Capture from the local microphone unless another input is configured (e.g. for load tests)
+        audio_input = get_env("AUDIO_INPUT") or 'mic'
+        sender_task = asyncio.create_task(sender(deepgram_ws, audio_input, get_env("AUDIO_INPUT_SOURCE"), vad, create_audio_encoder(encoding)))
         print(f"[Backend] Started audio sender task at {datetime.now().strftime('%H:%M:%S.%f')}")
         
         # Start keepalive
@@ -440,12 +644,16 @@ async def connect_to_deepgram(client_ws: WebSocket):
         print(f"[Backend] Started keepalive task at {datetime.now().strftime('%H:%M:%S.%f')}")
         
         # Start suggestion worker
-        suggestion_task = asyncio.create_task(suggestion_worker(conversation_buffer, client_ws, stop_event))
+        suggestion_task = asyncio.create_task(suggestion_worker(conversation_buffer, client_ws, stop_event, turn_event))
         print(f"[Backend] Started suggestion worker task at {datetime.now().strftime('%H:%M:%S.%f')}")
 
         # Introduce a small delay before starting ECD summary thread
         await asyncio.sleep(0.1) # Add a small delay to allow Deepgram to start sending data
-        print(f"[Backend] Starting ECD summary thread at {datetime.now().strftime('%H:%M:%S.%f')}")
+
+        # Reuse a cached ECD summary for this dossier version when another session produced one
+        dossier_version = get_dossier_store().get_version(patient_id) if patient_id else None
+        cached_ecd_summary = await session_state.get_ecd_summary(patient_id, dossier_version) if patient_id else None
+        main_loop = asyncio.get_running_loop()
 
         # Create a separate event loop for the ECD summary thread
         def run_ecd_summary():
@@ -453,12 +661,15 @@ async def connect_to_deepgram(client_ws: WebSocket):
             asyncio.set_event_loop(loop)
             try:
                 print(f"[Backend] Starting ECD summary generation in background thread at {datetime.now().strftime('%H:%M:%S.%f')}")
-                loop.run_until_complete(generate_ecd_summary(client_ws))
+                summary = loop.run_until_complete(generate_ecd_summary(_ThreadSender(client_ws, main_loop), patient_id, session_id))
+                if summary != ECD_SUMMARY_ERROR:
+                    conversation_buffer.ecd_summary = summary
+                    main_loop.call_soon_threadsafe(session_state.set_ecd_summary, patient_id, dossier_version, summary)
                 print(f"[Backend] ECD summary generation completed in background thread at {datetime.now().strftime('%H:%M:%S.%f')}")
             except Exception as e:
                 print(f"[Backend] Error in ECD summary thread: {e} at {datetime.now().strftime('%H:%M:%S.%f')}")
                 try:
-                    loop.run_until_complete(client_ws.send_text(json.dumps({
+                    loop.run_until_complete(_ThreadSender(client_ws, main_loop).send_text(json.dumps({
                         "type": "ecd_summary_error",
                         "error": str(e)
                     })))
@@ -467,17 +678,34 @@ async def connect_to_deepgram(client_ws: WebSocket):
             finally:
                 loop.close()
 
-        # Start ECD summary generation in a separate thread
-        ecd_thread = threading.Thread(target=run_ecd_summary)
-        ecd_thread.daemon = True
-        ecd_thread.start()
-        print(f"[Backend] ECD summary thread started (non-blocking) at {datetime.now().strftime('%H:%M:%S.%f')}")
+        if patient_id is None:
+            # No dossier to summarise; tell the client instead of showing another patient's
+            await client_ws.send_text(json.dumps({
+                "type": "ecd_summary_error",
+                "error": NO_DOSSIER_ERROR
+            }))
+            print(f"[Backend] No patient dossier for this session, skipping ECD summary at {datetime.now().strftime('%H:%M:%S.%f')}")
+        elif cached_ecd_summary is not None:
+            conversation_buffer.ecd_summary = cached_ecd_summary
+            await client_ws.send_text(json.dumps({
+                "type": "ecd_summary_complete",
+                "summary": cached_ecd_summary
+            }))
+            print(f"[Backend] Sent cached ECD summary at {datetime.now().strftime('%H:%M:%S.%f')}")
+        else:
+            # Start ECD summary generation in a separate thread
+            print(f"[Backend] Starting ECD summary thread at {datetime.now().strftime('%H:%M:%S.%f')}")
+            ecd_thread = threading.Thread(target=run_ecd_summary)
+            ecd_thread.daemon = True
+            ecd_thread.start()
+            print(f"[Backend] ECD summary thread started (non-blocking) at {datetime.now().strftime('%H:%M:%S.%f')}")
 
         # Start processing transcriptions immediately
         print(f"[Backend] Starting transcription processing loop at {datetime.now().strftime('%H:%M:%S.%f')}")
         try:
             # Create a task for handling client messages
             async def handle_client_messages():
+                nonlocal summary_task
                 while True:
                     try:
                         message = await client_ws.receive_text()
@@ -485,7 +713,12 @@ async def connect_to_deepgram(client_ws: WebSocket):
                         if message_data.get('type') == 'stop_recording':
                             summary_type = message_data.get('summary_type', 'report')
                             print(f"[Backend] Generating summary of type: {summary_type}")
-                            await generate_conversation_summary(conversation_buffer, client_ws, summary_type)
+                            # The summary runs in its own task so closing the
+                            # session does not abort it halfway
+                            summary_task = asyncio.create_task(generate_conversation_summary(conversation_buffer, client_ws, summary_type))
+                            if resumable is not None:
+                                resumable.summary_task = summary_task
+                            await asyncio.shield(summary_task)
                     except Exception as e:
                         print(f"[Backend] Error handling client message: {e}")
                         break
@@ -499,39 +732,26 @@ async def connect_to_deepgram(client_ws: WebSocket):
                     response = await asyncio.wait_for(deepgram_ws.recv(), timeout=KEEPALIVE_TIMEOUT)
                     response_json = json.loads(response)
                     
-                    # Only process Results type responses with non-empty transcripts
-                    if (response_json.get('type') == 'Results' and 
-                        'channel' in response_json and 
-                        'alternatives' in response_json['channel'] and 
-                        response_json['channel']['alternatives'] and
-                        response_json['channel']['alternatives'][0].get('transcript')):
-                        
-                        alternative = response_json['channel']['alternatives'][0]
-                        transcript = alternative.get('transcript', '')
-                        is_final = response_json.get('is_final', False)
-                        
-                        # Only process non-empty transcripts
-                        if transcript and transcript.strip():
-                            # Get speaker info if available
-                            speaker = None
-                            if 'words' in alternative and alternative['words']:
-                                speaker = alternative['words'][0].get('speaker')
-                            
-                            # Add to conversation buffer
-                            conversation_buffer.add_utterance(speaker, transcript, datetime.now())
-                            
-                            # Send transcription to frontend immediately
-                            try:
-                                await client_ws.send_text(json.dumps({
-                                    "type": "transcript",
-                                    "transcript": transcript,
-                                    "is_final": is_final,
-                                    "speaker": speaker
-                                }))
-                                print(f"[Backend] Sent transcript to frontend: \"{transcript}\" (Speaker: {speaker}) at {datetime.now().strftime('%H:%M:%S.%f')}")
-                            except Exception as e:
-                                print(f"[Backend] Error sending transcript to frontend: {e} at {datetime.now().strftime('%H:%M:%S.%f')}")
-                                raise
+                    transcript_message = handle_results_message(response_json, conversation_buffer)
+                    if transcript_message is not None:
+                        # Send transcription to frontend immediately; finals are
+                        # kept for the catch-up while the client is disconnected
+                        await client_ws.send_text(json.dumps(transcript_message), replay=transcript_message['is_final'])
+                        print(f"[Backend] Sent transcript to frontend: \"{transcript_message['transcript']}\" (Speaker: {transcript_message['speaker']}) at {datetime.now().strftime('%H:%M:%S.%f')}")
+
+                        if transcript_message['is_final']:
+                            conversation_buffer.cadence.record_words(len(transcript_message['transcript'].split()))
+                            await send_rule_suggestions(transcript_message['transcript'], conversation_buffer, client_ws)
+                            turn_texts.append(transcript_message['transcript'])
+
+                    # At the end of a speaker turn run the protocol tracker over the
+                    # whole turn and wake the suggestion worker
+                    if (turn_per_final and transcript_message is not None and transcript_message['is_final']) or is_turn_end(response_json):
+                        if conversation_buffer.commit_turn():
+                            print(f"[Backend] Turn ended ({response_json.get('type')}) at revision {conversation_buffer.revision} at {datetime.now().strftime('%H:%M:%S.%f')}")
+                            await send_protocol_events(conversation_buffer, client_ws, text=" ".join(turn_texts))
+                            turn_event.set()
+                        turn_texts.clear()
 
                 except asyncio.TimeoutError:
                     print(f"[Backend] Timeout waiting for Deepgram response, sending keepalive at {datetime.now().strftime('%H:%M:%S.%f')}")
@@ -564,6 +784,14 @@ async def connect_to_deepgram(client_ws: WebSocket):
                 except Exception as e:
                     print(f"[Backend] Error cleaning up client message task: {e} at {datetime.now().strftime('%H:%M:%S.%f')}")
 
+            # Let a running end-of-call summary reach the client and the journal
+            if summary_task is not None and not summary_task.done():
+                print(f"[Backend] Waiting for the conversation summary before closing at {datetime.now().strftime('%H:%M:%S.%f')}")
+                try:
+                    await summary_task
+                except Exception as e:
+                    print(f"[Backend] Error finishing conversation summary: {e} at {datetime.now().strftime('%H:%M:%S.%f')}")
+
             print(f"[Backend] Cleaning up tasks and closing connection at {datetime.now().strftime('%H:%M:%S.%f')}")
             # Signal suggestion worker to stop
             stop_event.set()
@@ -584,6 +812,14 @@ async def connect_to_deepgram(client_ws: WebSocket):
                 stop_event.set()
                 ecd_thread.join(timeout=5)  # Wait up to 5 seconds for thread to finish
 
+            if vad is not None:
+                vad_stats = vad.stats()
+                print(f"[Backend] VAD suppressed {vad_stats['suppressed_fraction']:.1%} of {vad_stats['total_seconds']}s audio at {datetime.now().strftime('%H:%M:%S.%f')}")
+                conversation_buffer.log_event('vad_stats', **vad_stats)
+
+            # Flush and close the session journal
+            await conversation_buffer.journal.close()
+
             # Close Deepgram connection if it exists
             if deepgram_ws is not None:
                 try:
@@ -611,6 +847,9 @@ async def connect_to_deepgram(client_ws: WebSocket):
             stop_event.set()
             ecd_thread.join(timeout=5)
         
+        # Flush and close the session journal
+        await conversation_buffer.journal.close()
+
         # Close Deepgram connection if it exists
         if deepgram_ws is not None:
             try:
@@ -620,12 +859,49 @@ async def connect_to_deepgram(client_ws: WebSocket):
                 print(f"[Backend] Error closing Deepgram connection: {e} at {datetime.now().strftime('%H:%M:%S.%f')}")
         raise
 
+async def run_session(session: ResumableSession, patient_id, session_id):
+    """Runs a session until Deepgram closes or the grace period after a disconnect expires"""
+    global active_sessions
+    active_sessions += 1
+    try:
+        await connect_to_deepgram(session.channel, patient_id, session_id, session)
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        print(f"[Backend] WebSocket error: {e} at {datetime.now().strftime('%H:%M:%S.%f')}")
+        await session.channel.send_text(json.dumps({
+            "error": str(e)
+        }))
+    finally:
+        active_sessions -= 1
+        remove_session(session)
+
 @app.websocket("/ws/transcribe")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     print(f"[Backend] WebSocket connection accepted at {datetime.now().strftime('%H:%M:%S.%f')}")
     try:
-        await connect_to_deepgram(websocket)
+        # A live session's resume token reattaches to it without any setup
+        session = get_resumable_session(websocket.query_params.get("resume_token"))
+        if session is not None:
+            released = session.resume(websocket)
+            await websocket.send_text(json.dumps(session.catch_up()))
+        else:
+            # Callers are identified by patient ID or by their phone number
+            patient_id = resolve_patient_id(
+                websocket.query_params.get("patient_id"),
+                websocket.query_params.get("phone")
+            )
+            session = ResumableSession(ClientChannel())
+            released = session.channel.attach(websocket)
+            register_session(session)
+            # A known session_id resumes a session from the shared state or its journal
+            session.task = asyncio.create_task(run_session(session, patient_id, websocket.query_params.get("session_id")))
+
+        # Return when this socket is dropped or replaced, or the session ends
+        released_task = asyncio.create_task(released.wait())
+        await asyncio.wait([released_task, session.task], return_when=asyncio.FIRST_COMPLETED)
+        released_task.cancel()
     except Exception as e:
         print(f"[Backend] WebSocket error: {e} at {datetime.now().strftime('%H:%M:%S.%f')}")
         try:
@@ -642,9 +918,14 @@ async def websocket_endpoint(websocket: WebSocket):
             pass
         print(f"[Backend] WebSocket connection closed at {datetime.now().strftime('%H:%M:%S.%f')}")
 
-async def generate_summary(system_prompt: str, user_prompt: str) -> str:
+async def generate_summary(system_prompt: str, user_prompt: str, prompt_type: str = "summary", session_id=None) -> str:
     try:
-        response = client.chat.completions.create(
+        # Run the blocking completion in a worker thread so concurrent sessions
+        # (and the batch pipeline) are not serialised on the event loop
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(None, lambda: create_chat_completion(
+            prompt_type,
+            session_id,
             model="gpt-4.1-nano",
             messages=[{
                 "role": "system",
@@ -655,7 +936,7 @@ async def generate_summary(system_prompt: str, user_prompt: str) -> str:
             }],
             stream=False,
             temperature=0.7
-        )
+        ))
         
         return response.choices[0].message.content
     except Exception as e:
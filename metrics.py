@@ -0,0 +1,56 @@
+"""
+Lightweight in-process runtime metrics for the transcription server
+"""
+
+import asyncio
+import os
+from collections import deque
+
+LOOP_LAG_INTERVAL = 0.1  # Seconds between event-loop lag probes
+LOOP_LAG_SAMPLES = 600  # Probes kept (one minute at the default interval)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sequence; 0.0 when empty"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up from a fixed sleep"""
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self.samples = deque(maxlen=LOOP_LAG_SAMPLES)
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def snapshot(self):
+        samples = list(self.samples)
+        return {
+            "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+            "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+            "max_ms": round(max(samples, default=0.0) * 1000, 2),
+        }
+
+
+def rss_bytes():
+    """Resident set size of this process (Linux), or 0 when unavailable"""
+    try:
+        with open(f"/proc/{os.getpid()}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
@@ -3,20 +3,15 @@ Patient dossier voor Karel Groenendijk
 Dit is een fictief dossier voor testdoeleinden
 """
 
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
 import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
 
-# Load environment variables
-load_dotenv()
-
-# Initialize OpenAI client
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OPENAI_API_KEY environment variable not set")
-
-client = OpenAI(api_key=api_key)
+from clients import get_env
+from llm_usage import create_chat_completion
 
 PATIENT_DOSSIER = {
     "patient_id": "P123456",
@@ -115,7 +110,230 @@ PATIENT_DOSSIER = {
     }
 }
 
-async def generate_ecd_summary(websocket=None):
+DEFAULT_PATIENT_ID = PATIENT_DOSSIER["patient_id"]
+
+ECD_SUMMARY_ERROR = "Fout bij genereren samenvatting"
+NO_DOSSIER_ERROR = "Geen patiëntdossier gevonden voor deze beller"
+
+# Context voor een beller zonder dossier, zodat de AI geen gegevens van een andere patiënt gebruikt
+NO_DOSSIER_CONTEXT = """
+GEEN PATIËNTDOSSIER: de beller is niet gekoppeld aan een dossier.
+Er zijn geen bekende aandoeningen, medicatie of allergieën beschikbaar.
+"""
+
+# Aantal gerenderde patiëntcontexten dat in het geheugen bewaard wordt
+PATIENT_CONTEXT_CACHE_SIZE = 1024
+
+
+class DossierStore(ABC):
+    """
+    Interface voor het opvragen van patiëntdossiers op patiënt-ID of telefoonnummer.
+    Iedere wijziging van een dossier verhoogt de versie, zodat gecachte
+    contexten ongeldig worden.
+    """
+
+    @abstractmethod
+    def get(self, patient_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def get_version(self, patient_id: str) -> Optional[int]:
+        ...
+
+    @abstractmethod
+    def find_by_phone(self, phone: str) -> Optional[str]:
+        """Retourneert het patiënt-ID dat bij een telefoonnummer hoort"""
+
+    @abstractmethod
+    def put(self, dossier: Dict[str, Any]) -> int:
+        """Slaat een dossier op en retourneert de nieuwe versie"""
+
+
+class InMemoryDossierStore(DossierStore):
+    def __init__(self, dossiers=None):
+        self._dossiers = {}
+        self._versions = {}
+        self._phones = {}
+        self._lock = threading.Lock()
+        for dossier in dossiers or []:
+            self.put(dossier)
+
+    def get(self, patient_id):
+        return self._dossiers.get(patient_id)
+
+    def get_version(self, patient_id):
+        return self._versions.get(patient_id)
+
+    def find_by_phone(self, phone):
+        return self._phones.get(phone)
+
+    def put(self, dossier):
+        patient_id = dossier["patient_id"]
+        with self._lock:
+            previous = self._dossiers.get(patient_id)
+            if previous is not None and previous.get("telefoon"):
+                self._phones.pop(previous["telefoon"], None)
+            self._dossiers[patient_id] = dossier
+            if dossier.get("telefoon"):
+                self._phones[dossier["telefoon"]] = patient_id
+            version = self._versions.get(patient_id, 0) + 1
+            self._versions[patient_id] = version
+        return version
+
+
+class SQLiteDossierStore(DossierStore):
+    """
+    SQLite backend met indexen op patiënt-ID en telefoonnummer, zodat het
+    opzoeken bij sessiestart niet trager wordt bij duizenden patiënten.
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS dossiers ("
+                "patient_id TEXT PRIMARY KEY, "
+                "telefoon TEXT, "
+                "version INTEGER NOT NULL DEFAULT 1, "
+                "data TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_dossiers_telefoon ON dossiers (telefoon)")
+
+    def get(self, patient_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM dossiers WHERE patient_id = ?", (patient_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_version(self, patient_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM dossiers WHERE patient_id = ?", (patient_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def find_by_phone(self, phone):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT patient_id FROM dossiers WHERE telefoon = ?", (phone,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, dossier):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO dossiers (patient_id, telefoon, version, data) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(patient_id) DO UPDATE SET "
+                "telefoon = excluded.telefoon, version = dossiers.version + 1, data = excluded.data",
+                (dossier["patient_id"], dossier.get("telefoon"), json.dumps(dossier, ensure_ascii=False))
+            )
+            row = self._conn.execute(
+                "SELECT version FROM dossiers WHERE patient_id = ?", (dossier["patient_id"],)
+            ).fetchone()
+        return row[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_dossier_store = None
+_dossier_store_lock = threading.Lock()
+
+
+def is_demo_mode() -> bool:
+    """
+    Demomodus: zonder DOSSIER_DB_PATH, of met DOSSIER_DEMO=true. Alleen dan
+    wordt het fictieve testdossier gebruikt.
+    """
+    demo = (get_env("DOSSIER_DEMO") or "").strip().lower() in ("1", "true", "yes")
+    return demo or not get_env("DOSSIER_DB_PATH")
+
+
+def get_dossier_store() -> DossierStore:
+    """
+    Retourneert de actieve dossier store. Als DOSSIER_DB_PATH gezet is wordt
+    de SQLite backend gebruikt, anders het fictieve testdossier in het geheugen.
+    Het testdossier wordt alleen in demomodus in de database gezet.
+    """
+    global _dossier_store
+    if _dossier_store is None:
+        with _dossier_store_lock:
+            if _dossier_store is None:
+                db_path = get_env("DOSSIER_DB_PATH")
+                if db_path:
+                    store = SQLiteDossierStore(db_path)
+                    if is_demo_mode() and store.get(DEFAULT_PATIENT_ID) is None:
+                        store.put(PATIENT_DOSSIER)
+                    _dossier_store = store
+                else:
+                    _dossier_store = InMemoryDossierStore([PATIENT_DOSSIER])
+    return _dossier_store
+
+
+def set_dossier_store(store: DossierStore):
+    """Vervangt de actieve dossier store en leegt de contextcache"""
+    global _dossier_store
+    with _dossier_store_lock:
+        _dossier_store = store
+    _context_cache.clear()
+
+
+def resolve_patient_id(patient_id: Optional[str] = None, phone: Optional[str] = None) -> Optional[str]:
+    """
+    Bepaalt het patiënt-ID op basis van ID of telefoonnummer van de beller.
+    Een onbekend ID of nummer levert None op (geen dossier), nooit het dossier
+    van een andere patiënt. Alleen zonder ID en nummer wordt in demomodus het
+    testdossier gebruikt.
+    """
+    if patient_id:
+        if get_dossier_store().get_version(patient_id) is not None:
+            return patient_id
+        print(f"[Backend] Unknown patient ID {patient_id}, continuing without dossier")
+    if phone:
+        found = get_dossier_store().find_by_phone(phone)
+        if found:
+            return found
+        print(f"[Backend] Unknown phone number {phone}, continuing without dossier")
+    if not patient_id and not phone and is_demo_mode():
+        return DEFAULT_PATIENT_ID
+    return None
+
+
+class _PatientContextCache:
+    """LRU cache van gerenderde contexten, ongeldig gemaakt door de dossierversie"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, patient_id, version):
+        with self._lock:
+            entry = self._entries.get(patient_id)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(patient_id)
+            return entry[1]
+
+    def put(self, patient_id, version, context):
+        with self._lock:
+            self._entries[patient_id] = (version, context)
+            self._entries.move_to_end(patient_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_context_cache = _PatientContextCache(PATIENT_CONTEXT_CACHE_SIZE)
+
+
+async def generate_ecd_summary(websocket=None, patient_id=None, session_id=None):
     """
     Genereert een ECD samenvatting van het patiëntendossier met behulp van OpenAI
     Zal de volledige samenvatting sturen, zonder streaming.
@@ -127,7 +345,9 @@ async def generate_ecd_summary(websocket=None):
                 "type": "ecd_summary_start"
             }))
 
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            "ecd_summary",
+            session_id,
             model="gpt-4.1-nano",
             messages=[{
                 "role": "system",
@@ -151,7 +371,7 @@ BELANGRIJKE AANDACHTSPUNTEN:
 - [Lijst van belangrijke aandachtspunten]
 
 Patiëntendossier:
-{get_patient_context()}"""
+{get_patient_context(patient_id)}"""
             }],
             stream=False, # Set stream to False
             temperature=0.7
@@ -183,14 +403,31 @@ Patiëntendossier:
                 }))
             except:
                 pass
-        return "Fout bij genereren samenvatting"
+        return ECD_SUMMARY_ERROR
 
-def get_patient_context():
+def get_patient_context(patient_id=None):
     """
     Retourneert een geformatteerde string met de relevante patiëntinformatie
-    voor de triagist
+    voor de triagist. De gerenderde string wordt gecachet per dossierversie.
+    Zonder patiënt-ID wordt NO_DOSSIER_CONTEXT geretourneerd.
+    """
+    if patient_id is None:
+        return NO_DOSSIER_CONTEXT
+    store = get_dossier_store()
+    version = store.get_version(patient_id)
+    if version is None:
+        raise KeyError(f"Onbekende patiënt: {patient_id}")
+
+    context = _context_cache.get(patient_id, version)
+    if context is None:
+        context = render_patient_context(store.get(patient_id))
+        _context_cache.put(patient_id, version, context)
+    return context
+
+def render_patient_context(dossier):
+    """
+    Rendert een dossier naar de context string die in de prompts gebruikt wordt
     """
-    dossier = PATIENT_DOSSIER
     
     context = f"""
 PATIËNT DOSSIER: {dossier['naam']} (ID: {dossier['patient_id']})
@@ -0,0 +1,171 @@
+"""
+Transcript-driven progress tracking through the protocol steps.
+
+A phrase index over every protocol's keywords and the words of each step's
+title and example questions is built once per protocol list. Each committed
+utterance is tokenised and looked up in that index: keywords activate a
+protocol, and step words mark steps as covered. A step is covered by enough
+distinct words unique to it, or by an utterance that contains all content
+words of one of its example questions. Each active protocol keeps a
+small state machine (completed steps, next step) and every change is returned
+as a `protocol_progress` event for the client, without any LLM call.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from protocols import Protocol, get_protocols, get_published_index
+
+PROTOCOL_STEP_MIN_HITS = 2  # Distinct step words an utterance needs to cover a step
+PROTOCOL_QUESTION_MIN_WORDS = 2  # Content words an example question needs to cover its step on its own
+PROTOCOL_MIN_WORD_LENGTH = 4
+
+# Frequent Dutch words that say nothing about a specific step
+STOPWORDS = frozenset("""
+aan als dat deze die dit door een heeft hebt hoe indien is kan kunnen met moet
+moeten naar niet nog of ook over u uw van voor waar wanneer wat welke wie wil
+wilt zijn zou er het de en in op te bij al om dan
+""".split())
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> List[str]:
+    return [w for w in _WORD.findall(text.lower()) if len(w) >= PROTOCOL_MIN_WORD_LENGTH and w not in STOPWORDS]
+
+
+class PhraseIndex:
+    """
+    Word -> (protocol, step) postings and one regex over all protocol keywords.
+    Words shared by several steps of the same protocol are left out, so a hit
+    points at one step. Example questions are indexed by each of their words
+    as (protocol, step, question words), for whole-question matches.
+    """
+
+    def __init__(self, protocols: List[Protocol]):
+        self.protocols = {protocol.id: protocol for protocol in protocols}
+        self.steps: Dict[str, Dict[str, List[int]]] = {}
+        self.questions: Dict[str, List[tuple]] = {}
+
+        for protocol in protocols:
+            steps_by_word = {}
+            for step_index, step in enumerate(protocol.steps):
+                text = " ".join([step.get('title', '')] + step.get('example_questions', []))
+                for word in set(_words(text)):
+                    steps_by_word.setdefault(word, []).append(step_index)
+                for question in step.get('example_questions', []):
+                    question_words = frozenset(_words(question))
+                    if len(question_words) >= PROTOCOL_QUESTION_MIN_WORDS:
+                        entry = (protocol.id, step_index, question_words)
+                        for word in question_words:
+                            self.questions.setdefault(word, []).append(entry)
+            for word, step_indexes in steps_by_word.items():
+                if len(step_indexes) == 1:
+                    self.steps.setdefault(word, {})[protocol.id] = step_indexes
+
+        self.keywords = {}
+        for protocol in protocols:
+            for keyword in protocol.keywords:
+                self.keywords.setdefault(keyword.lower(), []).append(protocol.id)
+        terms = sorted(self.keywords, key=len, reverse=True)
+        self.keyword_pattern = re.compile(
+            "|".join(re.escape(term) for term in terms), re.IGNORECASE
+        ) if terms else None
+
+
+_index_cache = {}
+_INDEX_CACHE_SIZE = 4  # Protocol lists kept indexed; old lists are replaced on reload
+
+
+def get_phrase_index(protocols: Optional[List[Protocol]] = None) -> PhraseIndex:
+    """Returns the phrase index for a protocol list, built once per list"""
+    protocols = get_protocols() if protocols is None else protocols
+    index = get_published_index(protocols, "phrase")
+    if index is not None:
+        return index
+    entry = _index_cache.get(id(protocols))
+    if entry is None or entry[0] is not protocols:
+        entry = _index_cache[id(protocols)] = (protocols, PhraseIndex(protocols))
+        while len(_index_cache) > _INDEX_CACHE_SIZE:
+            del _index_cache[next(iter(_index_cache))]
+    return entry[1]
+
+
+class ProtocolState:
+    __slots__ = ('protocol', 'completed')
+
+    def __init__(self, protocol: Protocol):
+        self.protocol = protocol
+        self.completed = set()
+
+    @property
+    def next_step(self) -> Optional[int]:
+        for step_index in range(len(self.protocol.steps)):
+            if step_index not in self.completed:
+                return step_index
+        return None
+
+    def event(self, completed_step: Optional[int] = None) -> Dict[str, Any]:
+        steps = self.protocol.steps
+        next_step = self.next_step
+        return {
+            "type": "protocol_progress",
+            "protocol_id": self.protocol.id,
+            "completed_step": completed_step,
+            "completed_steps": sorted(self.completed),
+            "next_step": next_step,
+            "next_step_title": steps[next_step]['title'] if next_step is not None else None,
+            "next_questions": steps[next_step].get('example_questions', []) if next_step is not None else [],
+            "finished": next_step is None,
+        }
+
+
+class ProtocolProgressTracker:
+    """Per-session progress through the protocols activated in the conversation"""
+
+    def __init__(self, protocols: Optional[List[Protocol]] = None):
+        self.index = get_phrase_index(protocols)
+        self.active: Dict[str, ProtocolState] = {}
+
+    def activate(self, protocol_id: str) -> Optional[Dict[str, Any]]:
+        if protocol_id in self.active or protocol_id not in self.index.protocols:
+            return None
+        state = self.active[protocol_id] = ProtocolState(self.index.protocols[protocol_id])
+        return state.event()
+
+    def process(self, text: str) -> List[Dict[str, Any]]:
+        """Returns the protocol_progress events caused by one committed utterance"""
+        events = []
+        if self.index.keyword_pattern is not None:
+            for match in self.index.keyword_pattern.finditer(text):
+                for protocol_id in self.index.keywords[match.group(0).lower()]:
+                    event = self.activate(protocol_id)
+                    if event is not None:
+                        events.append(event)
+
+        if not self.active:
+            return events
+
+        words = set(_words(text))
+        hits = {}
+        for word in words:
+            for protocol_id, step_indexes in self.index.steps.get(word, {}).items():
+                if protocol_id in self.active:
+                    for step_index in step_indexes:
+                        key = (protocol_id, step_index)
+                        hits[key] = hits.get(key, 0) + 1
+
+        # Example questions asked in full; a question contained in a longer
+        # matched one (e.g. "bewusteloos" in "volledig bewusteloos") is skipped
+        asked = {entry for word in words for entry in self.index.questions.get(word, ())
+                 if entry[0] in self.active and entry[2] <= words}
+        for protocol_id, step_index, question_words in asked:
+            if not any(other[0] == protocol_id and question_words < other[2] for other in asked):
+                hits[(protocol_id, step_index)] = PROTOCOL_STEP_MIN_HITS
+
+        for (protocol_id, step_index), count in sorted(hits.items()):
+            state = self.active[protocol_id]
+            if count >= PROTOCOL_STEP_MIN_HITS and step_index not in state.completed:
+                state.completed.add(step_index)
+                events.append(state.event(step_index))
+        return events
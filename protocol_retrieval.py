@@ -0,0 +1,193 @@
+"""
+Local vector retrieval of protocols, for paraphrases that miss the keywords.
+
+Every protocol's title, description, keywords, step titles, step descriptions
+and example questions are vectorised once into a character n-gram TF-IDF
+matrix, one row per step. Steps compare better with single utterances than
+one long document per protocol. The matrix is stored
+column-wise in NumPy arrays (per n-gram, the segments containing it and their
+weights), so scoring a batch of utterances is one sparse-dense product done
+with a gather and a bincount; a protocol scores the maximum of its segments.
+"""
+
+import math
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from protocol_progress import STOPWORDS as PROGRESS_STOPWORDS
+from protocols import Protocol, get_published_index
+
+PROTOCOL_NGRAM_SIZES = (3, 4, 5)
+PROTOCOL_VECTOR_THRESHOLD = 0.16  # Minimum cosine similarity between an utterance and a protocol step
+PROTOCOL_VECTOR_CACHE_SIZE = 4096  # Scored utterances kept per index
+
+# The progress tracker's stopwords plus polite phrases that otherwise pull
+# small talk towards steps worded the same way
+STOPWORDS = PROGRESS_STOPWORDS | frozenset("graag helpen helpt".split())
+
+_WORD = re.compile(r"\w+")
+_SPEAKER_PREFIX = re.compile(r"^(?:Speaker \d+|Unknown): ")
+
+
+def char_ngrams(text: str) -> Dict[str, int]:
+    """Counts the character n-grams of every content word, padded with spaces"""
+    counts = {}
+    for word in _WORD.findall(text.lower()):
+        if len(word) < 3 or word in STOPWORDS:
+            continue
+        padded = f" {word} "
+        for size in PROTOCOL_NGRAM_SIZES:
+            for i in range(len(padded) - size + 1):
+                gram = padded[i:i + size]
+                counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+def protocol_segments(protocol: Protocol) -> List[str]:
+    """One segment for the protocol itself and one per step with its questions"""
+    segments = [f"{protocol.title}\n{protocol.description}"]
+    for step in protocol.steps:
+        segments.append("\n".join([step.get('title', ''), step.get('description', '')]
+                                  + step.get('example_questions', [])))
+    return segments
+
+
+class ProtocolVectorIndex:
+    """TF-IDF index over the segments of a protocol list; rows are L2-normalised"""
+
+    def __init__(self, protocols: List[Protocol]):
+        self.protocols = list(protocols)
+        # Identical steps shared by several protocols are stored once
+        segment_rows = {}
+        documents = []
+        protocol_segments_flat = []
+        self._segment_starts = np.zeros(len(self.protocols), dtype=np.int64)
+        for i, protocol in enumerate(self.protocols):
+            self._segment_starts[i] = len(protocol_segments_flat)
+            for segment in protocol_segments(protocol):
+                row = segment_rows.get(segment)
+                if row is None:
+                    row = segment_rows[segment] = len(documents)
+                    documents.append(char_ngrams(segment))
+                protocol_segments_flat.append(row)
+        self._protocol_segments = np.array(protocol_segments_flat, dtype=np.int64)
+
+        document_frequency = {}
+        for counts in documents:
+            for gram in counts:
+                document_frequency[gram] = document_frequency.get(gram, 0) + 1
+        self.vocabulary = {gram: i for i, gram in enumerate(document_frequency)}
+        total = len(documents)
+        self.idf = np.array(
+            [math.log((1 + total) / (1 + document_frequency[gram])) + 1.0 for gram in self.vocabulary],
+            dtype=np.float32
+        )
+
+        # Build the matrix as (n-gram, segment, weight) triples, normalise per
+        # segment, then sort by n-gram into column slices
+        features, rows, weights = [], [], []
+        for row, counts in enumerate(documents):
+            ids = np.fromiter((self.vocabulary[gram] for gram in counts), dtype=np.int64, count=len(counts))
+            values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+            values = (1.0 + np.log(values)) * self.idf[ids]
+            norm = np.linalg.norm(values)
+            if norm:
+                values /= norm
+            features.append(ids)
+            rows.append(np.full(len(ids), row, dtype=np.int64))
+            weights.append(values)
+
+        features = np.concatenate(features) if features else np.empty(0, dtype=np.int64)
+        order = np.argsort(features, kind='stable')
+        self._rows = np.concatenate(rows)[order] if rows else np.empty(0, dtype=np.int64)
+        self._weights = np.concatenate(weights)[order] if weights else np.empty(0, dtype=np.float32)
+        self._indptr = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(features, minlength=len(self.vocabulary)), out=self._indptr[1:])
+        self._segment_count = len(documents)
+        # The recent conversation is searched again every cycle, so only new
+        # utterances are scored
+        self._score_cache: Dict[str, np.ndarray] = {}
+
+    def _query(self, text: str):
+        counts = char_ngrams(text)
+        ids = [self.vocabulary[gram] for gram in counts if gram in self.vocabulary]
+        if not ids:
+            return None, None
+        ids = np.array(ids, dtype=np.int64)
+        values = np.fromiter((counts[gram] for gram in counts if gram in self.vocabulary),
+                             dtype=np.float32, count=len(ids))
+        values = (1.0 + np.log(values)) * self.idf[ids]
+        # Normalise over all n-grams of the utterance, including unknown ones
+        unknown = sum(1 for gram in counts if gram not in self.vocabulary)
+        norm = math.sqrt(float(values @ values) + unknown)
+        return ids, values / norm
+
+    def score(self, texts: List[str]) -> np.ndarray:
+        """Returns a (len(texts), len(protocols)) matrix of best segment cosine similarities"""
+        n = self._segment_count
+        if not texts or not n:
+            return np.zeros((len(texts), len(self.protocols)), dtype=np.float32)
+
+        slices, query_weights, batch_rows = [], [], []
+        for batch_row, text in enumerate(texts):
+            ids, values = self._query(text)
+            if ids is None:
+                continue
+            starts, ends = self._indptr[ids], self._indptr[ids + 1]
+            lengths = ends - starts
+            positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            slices.append(positions)
+            query_weights.append(np.repeat(values, lengths))
+            batch_rows.append(np.full(len(positions), batch_row, dtype=np.int64))
+
+        if not slices:
+            return np.zeros((len(texts), len(self.protocols)), dtype=np.float32)
+        positions = np.concatenate(slices)
+        cells = np.concatenate(batch_rows) * n + self._rows[positions]
+        products = np.concatenate(query_weights) * self._weights[positions]
+        segment_scores = np.bincount(cells, weights=products, minlength=len(texts) * n).reshape(len(texts), n)
+        return np.maximum.reduceat(segment_scores[:, self._protocol_segments], self._segment_starts, axis=1)
+
+    def search(self, texts: List[str], threshold: float = PROTOCOL_VECTOR_THRESHOLD) -> List[Protocol]:
+        """Returns the protocols that score above the threshold for any of the texts"""
+        if not texts or not self.protocols:
+            return []
+        missing = [text for text in dict.fromkeys(texts) if text not in self._score_cache]
+        if missing:
+            for text, row in zip(missing, self.score(missing)):
+                self._score_cache[text] = row
+            while len(self._score_cache) > PROTOCOL_VECTOR_CACHE_SIZE:
+                del self._score_cache[next(iter(self._score_cache))]
+        best = np.max([self._score_cache[text] for text in texts], axis=0)
+        return [protocol for protocol, value in zip(self.protocols, best) if value >= threshold]
+
+
+_index_cache = {}
+_INDEX_CACHE_SIZE = 4  # Protocol lists kept indexed; old lists are replaced on reload
+
+
+def get_vector_index(protocols: List[Protocol]) -> ProtocolVectorIndex:
+    """Returns the vector index for a protocol list, built once per list"""
+    index = get_published_index(protocols, "vector")
+    if index is not None:
+        return index
+    entry = _index_cache.get(id(protocols))
+    if entry is None or entry[0] is not protocols:
+        entry = _index_cache[id(protocols)] = (protocols, ProtocolVectorIndex(protocols))
+        while len(_index_cache) > _INDEX_CACHE_SIZE:
+            del _index_cache[next(iter(_index_cache))]
+    return entry[1]
+
+
+def split_utterances(conversation_text: str) -> List[str]:
+    """Splits format_for_ai() output into utterance texts without speaker labels"""
+    return [_SPEAKER_PREFIX.sub("", line) for line in conversation_text.splitlines() if line.strip()]
+
+
+def search_protocols(conversation_text: str, protocols: List[Protocol],
+                     threshold: Optional[float] = None) -> List[Protocol]:
+    index = get_vector_index(protocols)
+    return index.search(split_utterances(conversation_text),
+                        PROTOCOL_VECTOR_THRESHOLD if threshold is None else threshold)
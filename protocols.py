@@ -1,7 +1,14 @@
 """
 Protocol definitions for the AI assistant
+
+The built-in PROTOCOLS below are used unless PROTOCOL_DIR points to a
+directory of JSON/YAML protocol files. That directory is watched and reloaded
+without a restart (see ProtocolRegistry).
 """
 
+import asyncio
+import json
+import os
 from typing import List, Dict, Any
 from enum import Enum
 
@@ -226,16 +233,34 @@ PROTOCOLS = [
     )
 ]
 
-def get_relevant_protocols(conversation_text: str) -> List[Protocol]:
+# Protocol retrieval mode: "keywords" (substring match) or "vector" (keywords
+# plus the local n-gram TF-IDF search in protocol_retrieval.py)
+PROTOCOL_RETRIEVAL = "keywords"
+
+def get_relevant_protocols(conversation_text: str, protocols: List[Protocol] = None, mode: str = None) -> List[Protocol]:
     """
     Analyzes the conversation text and returns a list of relevant protocols
     """
+    protocols = get_protocols() if protocols is None else protocols
+    if mode is None:
+        from clients import get_env
+        mode = get_env("PROTOCOL_RETRIEVAL") or PROTOCOL_RETRIEVAL
+
     relevant_protocols = []
+    conversation_lower = conversation_text.lower()
     
-    for protocol in PROTOCOLS:
+    for protocol in protocols:
         # Check if any of the protocol's keywords are in the conversation
-        if any(keyword.lower() in conversation_text.lower() for keyword in protocol.keywords):
+        if any(keyword.lower() in conversation_lower for keyword in protocol.keywords):
             relevant_protocols.append(protocol)
+
+    if mode == "vector":
+        from protocol_retrieval import search_protocols
+        found = set(id(protocol) for protocol in search_protocols(conversation_text, protocols))
+        found.update(id(protocol) for protocol in relevant_protocols)
+        relevant_protocols = [protocol for protocol in protocols if id(protocol) in found]
+    elif mode != "keywords":
+        raise ValueError(f"Unsupported PROTOCOL_RETRIEVAL: {mode}")
     
     return relevant_protocols
 
@@ -243,7 +268,200 @@ def get_protocol_by_id(protocol_id: str) -> Protocol:
     """
     Returns a protocol by its ID
     """
+    return get_protocol_registry().snapshot[1].get(protocol_id)
+
+# File-backed protocol definitions
+PROTOCOL_RELOAD_INTERVAL = 2.0  # Seconds between checks of the protocol directory
+PROTOCOL_FILE_EXTENSIONS = (".json", ".yaml", ".yml")
+
+def protocol_from_dict(data: Dict[str, Any], source: str = "<dict>") -> Protocol:
+    """
+    Validates one protocol definition and returns it as a Protocol
+    """
+    if not isinstance(data, dict):
+        raise ValueError(f"{source}: protocol must be a mapping")
+    for field in ("id", "type", "title", "description", "steps", "keywords"):
+        if field not in data:
+            raise ValueError(f"{source}: protocol is missing '{field}'")
+    try:
+        protocol_type = ProtocolType(data["type"])
+    except ValueError:
+        raise ValueError(f"{source}: unknown protocol type '{data['type']}'")
+    if not isinstance(data["keywords"], list) or not all(isinstance(k, str) for k in data["keywords"]):
+        raise ValueError(f"{source}: 'keywords' must be a list of strings")
+    if not isinstance(data["steps"], list) or not data["steps"]:
+        raise ValueError(f"{source}: 'steps' must be a non-empty list")
+    for i, step in enumerate(data["steps"]):
+        if not isinstance(step, dict) or not isinstance(step.get("title"), str):
+            raise ValueError(f"{source}: step {i} must be a mapping with a 'title'")
+        if not isinstance(step.get("example_questions", []), list):
+            raise ValueError(f"{source}: step {i} 'example_questions' must be a list")
+
+    return Protocol(
+        id=str(data["id"]),
+        type=protocol_type,
+        title=data["title"],
+        description=data["description"],
+        steps=data["steps"],
+        keywords=data["keywords"]
+    )
+
+def protocol_to_dict(protocol: Protocol) -> Dict[str, Any]:
+    return {
+        "id": protocol.id,
+        "type": protocol.type.value,
+        "title": protocol.title,
+        "description": protocol.description,
+        "steps": protocol.steps,
+        "keywords": protocol.keywords,
+    }
+
+def _protocol_files(directory: str) -> List[str]:
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.endswith(PROTOCOL_FILE_EXTENSIONS) and not name.startswith(".")
+    )
+
+def protocol_files_signature(directory: str):
+    """Names, mtimes and sizes of the protocol files; changes when any file does"""
+    signature = []
+    for path in _protocol_files(directory):
+        stat = os.stat(path)
+        signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+def load_protocols(directory: str) -> List[Protocol]:
+    """
+    Loads every protocol file in a directory. A file holds one protocol or a
+    list of protocols. Raises ValueError when any definition is invalid.
+    """
+    protocols = []
+    for path in _protocol_files(directory):
+        with open(path, encoding="utf-8") as f:
+            if path.endswith(".json"):
+                data = json.load(f)
+            else:
+                import yaml
+                data = yaml.safe_load(f)
+        for i, item in enumerate(data if isinstance(data, list) else [data]):
+            protocols.append(protocol_from_dict(item, f"{os.path.basename(path)}[{i}]"))
+
+    if not protocols:
+        raise ValueError(f"No protocols found in {directory}")
+    ids = [protocol.id for protocol in protocols]
+    duplicates = sorted(set(i for i in ids if ids.count(i) > 1))
+    if duplicates:
+        raise ValueError(f"Duplicate protocol ids in {directory}: {', '.join(duplicates)}")
+    return protocols
+
+class ProtocolRegistry:
+    """
+    Holds the active protocol list. A reload builds a new list and its matcher
+    indexes in a worker thread, then replaces `snapshot` (protocols, protocols
+    by id, indexes by kind) in a single assignment, so callers that took a
+    snapshot keep a consistent view and the index caches are only touched on
+    the event loop.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = directory
+        self.snapshot = (PROTOCOLS, {protocol.id: protocol for protocol in PROTOCOLS}, {})
+        self._signature = None
+        self._last_error = None
+        self._task = None
+        if directory:
+            self._swap(self._build())
+
+    def _build(self):
+        """Loads and indexes the directory if it changed; returns None otherwise"""
+        signature = protocol_files_signature(self.directory)
+        if signature == self._signature:
+            return None
+        protocols = load_protocols(self.directory)
+
+        # Build new matchers for the snapshot, so the first request after a
+        # reload does not pay for them and no shared cache is written here
+        from clients import get_env
+        from protocol_progress import PhraseIndex
+        indexes = {"phrase": PhraseIndex(protocols)}
+        if get_env("PROTOCOL_RETRIEVAL") == "vector":
+            from protocol_retrieval import ProtocolVectorIndex
+            indexes["vector"] = ProtocolVectorIndex(protocols)
+        return signature, protocols, indexes
+
+    def _swap(self, built):
+        signature, protocols, indexes = built
+        self._signature = signature
+        self._last_error = None
+        self.snapshot = (protocols, {protocol.id: protocol for protocol in protocols}, indexes)
+        print(f"[Backend] Loaded {len(protocols)} protocols from {self.directory}")
+
+    async def reload_if_changed(self):
+        loop = asyncio.get_running_loop()
+        try:
+            built = await loop.run_in_executor(None, self._build)
+        except Exception as e:
+            # Keep serving the previous protocols until the files are fixed;
+            # the same error is logged once, not on every poll
+            try:
+                self._signature = protocol_files_signature(self.directory)
+            except OSError:
+                self._signature = None
+            if str(e) != self._last_error:
+                self._last_error = str(e)
+                print(f"[Backend] Error reloading protocols from {self.directory}: {e}")
+            return False
+        if built is None:
+            return False
+        self._swap(built)
+        return True
+
+    def start(self):
+        """Starts watching the protocol directory on the running event loop"""
+        if self.directory and self._task is None:
+            self._task = asyncio.create_task(self._watch())
+        return self
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(PROTOCOL_RELOAD_INTERVAL)
+            try:
+                await self.reload_if_changed()
+            except Exception as e:
+                print(f"[Backend] Error watching protocols in {self.directory}: {e}")
+
+_registry = None
+
+def get_protocol_registry() -> ProtocolRegistry:
+    global _registry
+    if _registry is None:
+        from clients import get_env
+        _registry = ProtocolRegistry(get_env("PROTOCOL_DIR"))
+    return _registry
+
+def get_published_index(protocols: List[Protocol], kind: str):
+    """Returns the index of the given kind built with the registry snapshot holding this list"""
+    if _registry is None:
+        return None
+    snapshot = _registry.snapshot
+    return snapshot[2].get(kind) if snapshot[0] is protocols else None
+
+def get_protocols() -> List[Protocol]:
+    """
+    Returns the current protocol list; keep the returned list for the whole
+    operation to see one consistent set of protocols
+    """
+    return get_protocol_registry().snapshot[0]
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the built-in protocols as JSON files for PROTOCOL_DIR")
+    parser.add_argument("directory")
+    args = parser.parse_args()
+    os.makedirs(args.directory, exist_ok=True)
     for protocol in PROTOCOLS:
-        if protocol.id == protocol_id:
-            return protocol
-    return None 
\ No newline at end of file
+        with open(os.path.join(args.directory, f"{protocol.id}.json"), "w", encoding="utf-8") as f:
+            json.dump(protocol_to_dict(protocol), f, ensure_ascii=False, indent=2)
+            f.write("\n")
+    print(f"Exported {len(PROTOCOLS)} protocols to {args.directory}") 
\ No newline at end of file
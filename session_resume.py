@@ -0,0 +1,169 @@
+"""
+Resumable websocket sessions.
+
+The Deepgram connection, conversation buffer and workers of a session talk to
+the browser through a ClientChannel instead of the websocket itself. When the
+socket drops, the channel detaches: final transcripts are kept for replay and
+the session stays alive for SESSION_RESUME_GRACE seconds. A reconnect with the
+session's resume token attaches a new socket and receives a `catch_up` message.
+A close frame from the client (1000, 1001, or 1005 for a close without a
+code) ends the session immediately, once a running end-of-call summary has
+finished; only an abnormal drop (1006) keeps it for the grace period.
+"""
+
+import asyncio
+import json
+import secrets
+from collections import deque
+from datetime import datetime
+
+from conversation_buffer import ECD_SUMMARY_PLACEHOLDER
+
+SESSION_RESUME_GRACE = 30.0  # Seconds a detached session is kept alive
+SESSION_MISSED_FINALS = 500  # Final transcripts kept for replay while detached
+NORMAL_CLOSURE = 1000
+GOING_AWAY = 1001
+NO_STATUS_RECEIVED = 1005  # A close frame without a code, e.g. WebSocket.close() in the browser
+FINAL_CLOSE_CODES = {NORMAL_CLOSURE, GOING_AWAY, NO_STATUS_RECEIVED}  # Deliberate closes; end the session at once
+
+
+class ClientChannel:
+    """Websocket stand-in whose underlying socket can be swapped"""
+
+    def __init__(self, websocket=None):
+        self.websocket = None
+        self.missed = deque(maxlen=SESSION_MISSED_FINALS)
+        self.on_detach = None
+        self._attached = asyncio.Event()
+        self._released = None
+        if websocket is not None:
+            self.attach(websocket)
+
+    @property
+    def connected(self):
+        return self.websocket is not None
+
+    def attach(self, websocket) -> asyncio.Event:
+        """Attaches a socket; the returned event is set when it is detached or replaced"""
+        if self._released is not None:
+            self._released.set()
+        self.websocket = websocket
+        self._released = asyncio.Event()
+        self._attached.set()
+        return self._released
+
+    def detach(self, websocket=None, final: bool = False):
+        if self.websocket is None or (websocket is not None and websocket is not self.websocket):
+            return
+        self.websocket = None
+        self._attached.clear()
+        self._released.set()
+        if self.on_detach is not None:
+            self.on_detach(final)
+
+    async def send_text(self, text: str, replay: bool = False):
+        """
+        Sends to the attached socket. Never raises on a dropped socket; with
+        replay=True the message is kept for the catch-up instead.
+        """
+        websocket = self.websocket
+        if websocket is not None:
+            try:
+                await websocket.send_text(text)
+                return
+            except Exception as e:
+                print(f"[Backend] Client socket lost while sending: {e} at {datetime.now().strftime('%H:%M:%S.%f')}")
+                self.detach(websocket)
+        if replay:
+            self.missed.append(text)
+
+    async def receive_text(self) -> str:
+        """Receives from the attached socket, waiting across reconnects"""
+        while True:
+            websocket = self.websocket
+            if websocket is None:
+                await self._attached.wait()
+                continue
+            try:
+                return await websocket.receive_text()
+            except Exception as e:
+                self.detach(websocket, final=getattr(e, 'code', None) in FINAL_CLOSE_CODES)
+
+    def take_missed(self):
+        missed = [json.loads(text) for text in self.missed]
+        self.missed.clear()
+        return missed
+
+
+class ResumableSession:
+    """A live session that can outlive its websocket for the grace period"""
+
+    def __init__(self, channel: ClientChannel):
+        self.token = secrets.token_urlsafe(24)
+        self.channel = channel
+        self.task = None
+        self.session_id = None
+        self.buffer = None
+        self.summary_task = None
+        self._grace_timer = None
+        channel.on_detach = self._start_grace
+
+    def _start_grace(self, final: bool = False):
+        if final:
+            self._expire()
+            return
+        print(f"[Backend] Session {self.session_id} detached, keeping it for {SESSION_RESUME_GRACE}s at {datetime.now().strftime('%H:%M:%S.%f')}")
+        self._grace_timer = asyncio.get_running_loop().call_later(SESSION_RESUME_GRACE, self._expire)
+
+    def _expire(self):
+        if self.channel.connected or self.task is None:
+            return
+        if self.summary_task is not None and not self.summary_task.done():
+            # Cancelling now would abort the end-of-call summary; end the session after it
+            print(f"[Backend] Session {self.session_id} waiting for its summary before closing at {datetime.now().strftime('%H:%M:%S.%f')}")
+            self.summary_task.add_done_callback(lambda task: self._expire())
+        else:
+            print(f"[Backend] Session {self.session_id} closed by the client or not resumed within {SESSION_RESUME_GRACE}s at {datetime.now().strftime('%H:%M:%S.%f')}")
+            self.task.cancel()
+
+    def resume(self, websocket) -> asyncio.Event:
+        if self._grace_timer is not None:
+            self._grace_timer.cancel()
+            self._grace_timer = None
+        print(f"[Backend] Session {self.session_id} resumed at {datetime.now().strftime('%H:%M:%S.%f')}")
+        return self.channel.attach(websocket)
+
+    def catch_up(self):
+        """Missed finals plus the current suggestions, ECD summary and protocol progress"""
+        buffer = self.buffer
+        message = {
+            "type": "catch_up",
+            "session_id": self.session_id,
+            "missed_finals": self.channel.take_missed(),
+            "suggestions": [],
+            "ecd_summary": None,
+            "protocol_progress": [],
+        }
+        if buffer is not None:
+            message["suggestions"] = buffer.suggestions
+            if buffer.ecd_summary != ECD_SUMMARY_PLACEHOLDER:
+                message["ecd_summary"] = buffer.ecd_summary
+            if buffer.protocol_progress is not None:
+                message["protocol_progress"] = [state.event() for state in buffer.protocol_progress.active.values()]
+        return message
+
+
+_sessions = {}
+
+
+def register_session(session: ResumableSession):
+    _sessions[session.token] = session
+
+
+def get_resumable_session(token):
+    return _sessions.get(token) if token else None
+
+
+def remove_session(session: ResumableSession):
+    if _sessions.get(session.token) is session:
+        del _sessions[session.token]
@@ -0,0 +1,346 @@
+"""
+Pluggable session-state backends, so any worker or node can serve a session.
+
+Session state is kept as the same event records the transcript journal uses
+(a timeline of utterances and turn ends, suggestions, summaries), plus ECD summary cache entries keyed by
+patient and dossier version. The default backend keeps everything in process
+memory with the same expiry as the Redis keys; set
+SESSION_STATE_URL=redis://host:port/db to share state through any server that
+speaks the Redis protocol.
+"""
+
+import asyncio
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from clients import get_env
+
+SESSION_STATE_TTL = 24 * 3600  # Seconds a session's state is kept after its last write
+ECD_CACHE_TTL = 7 * 24 * 3600  # Seconds an ECD summary stays cached
+SESSION_STATE_FLUSH_INTERVAL = 0.2  # Seconds between write-behind flushes
+SESSION_STATE_BATCH_SIZE = 128  # Pending commands that trigger an early flush
+SESSION_STATE_SWEEP_INTERVAL = 60.0  # Seconds between expiry sweeps of the in-memory backend
+
+
+class SessionStateBackend(ABC):
+    async def start(self):
+        pass
+
+    @abstractmethod
+    def record_event(self, session_id: str, kind: str, data: Dict[str, Any]):
+        """Stores a session event; must not block the caller"""
+
+    @abstractmethod
+    async def load_session(self, session_id: str) -> List[Dict[str, Any]]:
+        """Returns the session's events in journal record format"""
+
+    @abstractmethod
+    def set_ecd_summary(self, patient_id: str, version, summary: str):
+        ...
+
+    @abstractmethod
+    async def get_ecd_summary(self, patient_id: str, version) -> Optional[str]:
+        ...
+
+    async def flush(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class InMemorySessionState(SessionStateBackend):
+    """
+    Process-local state; only suitable for a single worker. Sessions expire
+    SESSION_STATE_TTL seconds after their last write and ECD summaries after
+    ECD_CACHE_TTL, like the Redis keys, so a long-running worker stays bounded.
+    """
+
+    def __init__(self):
+        self._timeline = defaultdict(list)  # Utterance and turn records in time order
+        self._suggestions = {}
+        self._summaries = defaultdict(dict)
+        self._ecd_cache = {}  # (patient_id, version) -> (summary, expiry)
+        self._session_expiry = {}  # session_id -> monotonic expiry
+        self._next_sweep = time.monotonic() + SESSION_STATE_SWEEP_INTERVAL
+
+    def _sweep(self, now: float):
+        self._next_sweep = now + SESSION_STATE_SWEEP_INTERVAL
+        for session_id in [s for s, expiry in self._session_expiry.items() if expiry <= now]:
+            self._drop_session(session_id)
+        for key in [k for k, (_, expiry) in self._ecd_cache.items() if expiry <= now]:
+            del self._ecd_cache[key]
+
+    def _drop_session(self, session_id):
+        self._session_expiry.pop(session_id, None)
+        self._timeline.pop(session_id, None)
+        self._suggestions.pop(session_id, None)
+        self._summaries.pop(session_id, None)
+
+    def record_event(self, session_id, kind, data):
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+        self._session_expiry[session_id] = now + SESSION_STATE_TTL
+        if kind in ('utterance', 'turn'):
+            self._timeline[session_id].append(data)
+        elif kind == 'suggestions':
+            self._suggestions[session_id] = data
+        elif kind == 'summary':
+            self._summaries[session_id][data.get('summary_type', 'report')] = data
+
+    async def load_session(self, session_id):
+        expiry = self._session_expiry.get(session_id)
+        if expiry is not None and expiry <= time.monotonic():
+            self._drop_session(session_id)
+        records = list(self._timeline.get(session_id, ()))
+        if session_id in self._suggestions:
+            records.append(self._suggestions[session_id])
+        records.extend(self._summaries.get(session_id, {}).values())
+        return records
+
+    def set_ecd_summary(self, patient_id, version, summary):
+        self._ecd_cache[(patient_id, version)] = (summary, time.monotonic() + ECD_CACHE_TTL)
+
+    async def get_ecd_summary(self, patient_id, version):
+        entry = self._ecd_cache.get((patient_id, version))
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+
+class RespConnection:
+    """Minimal asyncio client for the Redis serialization protocol (RESP2)"""
+
+    def __init__(self, host: str, port: int, db: int = 0, password: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self._reader = None
+        self._writer = None
+        self._lock = asyncio.Lock()
+
+    async def connect(self):
+        async with self._lock:
+            await self._connect()
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            try:
+                await self._send(setup)
+            except BaseException:
+                self._drop()
+                raise
+
+    def _drop(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Session state server closed the connection")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b"+":
+            return payload.decode("utf-8")
+        if prefix == b"-":
+            raise RuntimeError(payload.decode("utf-8"))
+        if prefix == b":":
+            return int(payload)
+        if prefix == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise RuntimeError(f"Unexpected RESP reply: {line!r}")
+
+    async def execute(self, *args):
+        return (await self.pipeline([args]))[0]
+
+    async def pipeline(self, commands):
+        """
+        Sends all commands in one write and reads their replies in order. A
+        dropped connection is re-established by the next call.
+        """
+        async with self._lock:
+            if self._writer is None:
+                await self._connect()
+            try:
+                return await self._send(commands)
+            except (OSError, asyncio.IncompleteReadError):
+                self._drop()
+                raise
+
+    async def _send(self, commands):
+        self._writer.write(b"".join(self._encode(args) for args in commands))
+        await self._writer.drain()
+        replies = []
+        error = None
+        for _ in commands:
+            try:
+                replies.append(await self._read_reply())
+            except RuntimeError as e:
+                # Keep reading so the connection stays in sync
+                error = error or e
+                replies.append(None)
+        if error is not None:
+            raise error
+        return replies
+
+    async def close(self):
+        if self._writer is not None:
+            writer = self._writer
+            self._drop()
+            await writer.wait_closed()
+
+
+class RedisSessionState(SessionStateBackend):
+    """
+    Redis-protocol backend with write-behind batching: writes are queued and
+    sent as one pipeline per flush interval, so the receive loop never waits
+    on the network. All writes are idempotent (utterances go into a sorted set
+    scored by their time), so a batch that failed halfway can be resent.
+    """
+
+    def __init__(self, url: str, flush_interval: float = SESSION_STATE_FLUSH_INTERVAL,
+                 batch_size: int = SESSION_STATE_BATCH_SIZE):
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip("/") or 0)
+        self._conn = RespConnection(parsed.hostname or "localhost", parsed.port or 6379, db, parsed.password)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending = []
+        self._wake = None
+        self._task = None
+        self._closed = False
+
+    async def start(self):
+        if self._task is None:
+            await self._conn.connect()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    @staticmethod
+    def _key(session_id, field):
+        return f"session:{session_id}:{field}"
+
+    def _queue(self, *commands):
+        self._pending.extend(commands)
+        if self._wake is not None and len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    def record_event(self, session_id, kind, data):
+        payload = json.dumps(data, ensure_ascii=False)
+        if kind in ('utterance', 'turn'):
+            # Turn ends share the timeline, so a restore keeps turns apart
+            key = self._key(session_id, "timeline")
+            self._queue(("ZADD", key, data['t'], payload), ("EXPIRE", key, SESSION_STATE_TTL))
+        elif kind == 'suggestions':
+            self._queue(("SET", self._key(session_id, "suggestions"), payload, "EX", SESSION_STATE_TTL))
+        elif kind == 'summary':
+            key = self._key(session_id, "summaries")
+            self._queue(("HSET", key, data.get('summary_type', 'report'), payload), ("EXPIRE", key, SESSION_STATE_TTL))
+
+    async def load_session(self, session_id):
+        # Pending writes for this session may not have reached the server yet
+        await self.flush()
+        timeline, suggestions, summaries = await self._conn.pipeline([
+            ("ZRANGE", self._key(session_id, "timeline"), 0, -1),
+            ("GET", self._key(session_id, "suggestions")),
+            ("HGETALL", self._key(session_id, "summaries")),
+        ])
+        records = [json.loads(item) for item in timeline or ()]
+        if suggestions:
+            records.append(json.loads(suggestions))
+        records.extend(json.loads(value) for value in (summaries or ())[1::2])
+        return records
+
+    def set_ecd_summary(self, patient_id, version, summary):
+        self._queue(("SET", f"ecd:{patient_id}:{version}", summary, "EX", ECD_CACHE_TTL))
+
+    async def get_ecd_summary(self, patient_id, version):
+        value = await self._conn.execute("GET", f"ecd:{patient_id}:{version}")
+        return value.decode("utf-8") if value is not None else None
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"[Backend] Error flushing session state: {e}")
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        try:
+            await self._conn.pipeline(batch)
+        except (OSError, asyncio.IncompleteReadError):
+            # Requeue; the next flush reconnects and resends the whole batch
+            self._pending[:0] = batch
+            raise
+
+    async def close(self):
+        self._closed = True
+        if self._task is not None:
+            self._wake.set()
+            await self._task
+        await self.flush()
+        await self._conn.close()
+
+
+_session_state = None
+_session_state_lock = asyncio.Lock()
+
+
+async def close_session_state():
+    """Flushes and closes the backend at shutdown, if it was started"""
+    global _session_state
+    backend, _session_state = _session_state, None
+    if backend is not None:
+        await backend.close()
+
+
+async def get_session_state() -> SessionStateBackend:
+    """Returns the process-wide session-state backend, started on first use"""
+    global _session_state
+    if _session_state is None:
+        async with _session_state_lock:
+            if _session_state is None:
+                url = get_env("SESSION_STATE_URL")
+                backend = RedisSessionState(url) if url else InMemorySessionState()
+                await backend.start()
+                _session_state = backend
+    return _session_state
@@ -0,0 +1,185 @@
+"""
+Adaptive interval between LLM suggestion requests.
+
+Requests are normally triggered at the end of each speaker turn and are then
+only spaced by turn_interval(). Without turn boundaries the interval follows
+the speech rate, recomputed whenever words are committed: every request should
+cover roughly SUGGESTION_TARGET_WORDS new words, but slow or hesitant speech
+never waits longer than SUGGESTION_SPEECH_MAX_INTERVAL. Both never drop below
+a multiple of the recent request latency (EWMA), so requests do not pile up,
+and back off exponentially while the provider is slow or failing.
+run_suggestion_loop() drives the requests of one session with it.
+"""
+
+import asyncio
+import time
+import weakref
+from collections import deque
+from datetime import datetime
+
+from metrics import percentile
+
+SUGGESTION_INTERVAL = 5.0  # Initial seconds between suggestion updates
+SUGGESTION_MIN_INTERVAL = 2.0
+SUGGESTION_MAX_INTERVAL = 30.0
+SUGGESTION_SPEECH_MAX_INTERVAL = 8.0  # Upper bound of the speech-rate interval, before latency and back-off
+SUGGESTION_TARGET_WORDS = 20  # New words that justify another request
+SUGGESTION_RATE_WINDOW = 30.0  # Seconds of committed speech used for words/sec
+SUGGESTION_LATENCY_ALPHA = 0.3  # EWMA weight of the newest latency sample
+SUGGESTION_LATENCY_FACTOR = 1.5  # Interval is at least this multiple of the latency EWMA
+SUGGESTION_DEGRADED_LATENCY = 4.0  # Seconds; slower requests count as degraded
+SUGGESTION_BACKOFF_FACTOR = 2.0
+SUGGESTION_POLL_INTERVAL = 0.5  # Seconds between checks when no turn boundary arrives
+SUGGESTION_MIN_WAIT = 0.05  # Seconds the loop always sleeps, so a due request cannot busy-wait
+SUGGESTION_TURN_FALLBACK_INTERVAL = 30.0  # Once turn ends arrive, seconds without one before the interval applies
+
+_cadences = weakref.WeakSet()
+
+
+class SuggestionCadence:
+    """Per-session cadence controller for the suggestion worker"""
+
+    def __init__(self):
+        self.latency_ewma = None
+        self.backoff = 1.0
+        self.interval = SUGGESTION_INTERVAL
+        self._words = deque()  # (monotonic time, word count) of committed utterances
+        _cadences.add(self)
+
+    def record_words(self, count: int, now: float = None):
+        now = time.monotonic() if now is None else now
+        self._words.append((now, count))
+        self.next_interval(now)
+
+    def _expire(self, now: float):
+        while self._words and self._words[0][0] < now - SUGGESTION_RATE_WINDOW:
+            self._words.popleft()
+
+    def words_per_second(self, now: float = None) -> float:
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        if not self._words:
+            return 0.0
+        span = max(now - self._words[0][0], SUGGESTION_MIN_INTERVAL)
+        return sum(count for _, count in self._words) / span
+
+    def record_call(self, latency: float, ok: bool = True):
+        """Updates the latency EWMA and the back-off after a suggestion request"""
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += SUGGESTION_LATENCY_ALPHA * (latency - self.latency_ewma)
+
+        if not ok or self.latency_ewma > SUGGESTION_DEGRADED_LATENCY:
+            self.backoff = min(self.backoff * SUGGESTION_BACKOFF_FACTOR, SUGGESTION_MAX_INTERVAL / SUGGESTION_MIN_INTERVAL)
+        else:
+            self.backoff = 1.0
+
+    def next_interval(self, now: float = None) -> float:
+        """Returns the seconds to wait after the previous request"""
+        rate = self.words_per_second(now)
+        if rate:
+            interval = min(SUGGESTION_TARGET_WORDS / rate, SUGGESTION_SPEECH_MAX_INTERVAL)
+        else:
+            interval = SUGGESTION_INTERVAL
+        if self.latency_ewma is not None:
+            interval = max(interval, self.latency_ewma * SUGGESTION_LATENCY_FACTOR)
+        interval *= self.backoff
+        self.interval = min(SUGGESTION_MAX_INTERVAL, max(SUGGESTION_MIN_INTERVAL, interval))
+        return self.interval
+
+    def turn_interval(self) -> float:
+        """Minimum spacing between requests triggered by turn boundaries"""
+        interval = SUGGESTION_MIN_INTERVAL
+        if self.latency_ewma is not None:
+            interval = max(interval, self.latency_ewma * SUGGESTION_LATENCY_FACTOR)
+        return min(SUGGESTION_MAX_INTERVAL, interval * self.backoff)
+
+    def snapshot(self):
+        return {
+            "interval_s": round(self.interval, 2),
+            "latency_ewma_s": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "words_per_second": round(self.words_per_second(), 2),
+            "backoff": self.backoff,
+        }
+
+
+def cadence_snapshot():
+    """Aggregated suggestion cadence over all live sessions, for /metrics"""
+    cadences = list(_cadences)
+    intervals = [cadence.interval for cadence in cadences]
+    latencies = [cadence.latency_ewma for cadence in cadences if cadence.latency_ewma is not None]
+    return {
+        "sessions": len(cadences),
+        "interval_p50_s": round(percentile(intervals, 0.50), 2),
+        "interval_max_s": round(max(intervals, default=0.0), 2),
+        "latency_ewma_p50_s": round(percentile(latencies, 0.50), 3),
+        "backed_off": sum(1 for cadence in cadences if cadence.backoff > 1.0),
+    }
+
+
+async def run_suggestion_loop(conversation_buffer, request, stop_event, turn_event=None):
+    """
+    Calls `await request(conversation_text)` for new conversation content at
+    speaker turn boundaries (turn_event), falling back to the adaptive interval
+    of conversation_buffer.cadence, until stop_event is set. Once turn ends
+    arrive the fallback only covers long turns (SUGGESTION_TURN_FALLBACK_INTERVAL
+    without one), so requests are not started mid-turn. Time is read from
+    the event loop clock (time.monotonic by default), so the loop can run in
+    virtual time.
+    """
+    clock = asyncio.get_running_loop().time
+    cadence = conversation_buffer.cadence
+    last_suggestion_time = clock()
+    # With turn boundaries the call start counts as one; without them only the interval applies
+    last_turn_time = last_suggestion_time if turn_event is not None else None
+    turn_event = turn_event or asyncio.Event()
+    last_revision = 0
+    pending_turn = False
+
+    def remaining(now):
+        """Seconds until a pending turn, or else the interval fallback, is due"""
+        if pending_turn:
+            return cadence.turn_interval() - (now - last_suggestion_time)
+        # The cadence recomputes its interval as words are committed
+        if last_turn_time is None:
+            return cadence.interval - (now - last_suggestion_time)
+        return max(cadence.interval, SUGGESTION_TURN_FALLBACK_INTERVAL) - (now - max(last_suggestion_time, last_turn_time))
+
+    while not stop_event.is_set():
+        try:
+            # Sleep until the next turn boundary, or until a pending turn or the
+            # interval fallback is due
+            try:
+                await asyncio.wait_for(turn_event.wait(), timeout=max(remaining(clock()), SUGGESTION_MIN_WAIT if pending_turn else SUGGESTION_POLL_INTERVAL))
+                turn_event.clear()
+                pending_turn = True
+                last_turn_time = clock()
+            except asyncio.TimeoutError:
+                pass
+
+            current_time = clock()
+            current_revision = conversation_buffer.revision
+
+            # Generate new suggestions if:
+            # 1. We have new content (the buffer changed since the last request)
+            # 2. A turn ended and the minimum spacing passed, or the fallback is due
+            if current_revision > last_revision and remaining(current_time) <= 0:
+                print(f"[Backend] New content detected for suggestions: revision {current_revision} (previous: {last_revision}, turn end: {pending_turn}) at {datetime.now().strftime('%H:%M:%S.%f')}")
+
+                conversation_text = conversation_buffer.format_for_ai()
+                if conversation_text:
+                    await request(conversation_text)
+                    last_suggestion_time = clock()
+                    interval = cadence.next_interval(last_suggestion_time)
+                    print(f"[Backend] Next suggestion interval {interval:.1f}s ({cadence.snapshot()}) at {datetime.now().strftime('%H:%M:%S.%f')}")
+                # Nothing to send is handled like a sent request, otherwise the
+                # same revision stays due and the loop spins
+                last_revision = current_revision
+                pending_turn = False
+            elif current_revision <= last_revision:
+                pending_turn = False
+
+        except Exception as e:
+            print(f"[Backend] Error in suggestion worker: {e} at {datetime.now().strftime('%H:%M:%S.%f')}")
+            await asyncio.sleep(1)  # Sleep before retrying
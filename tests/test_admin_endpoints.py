@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import clients  # noqa: E402
+from local_transcription_server import app  # noqa: E402
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(clients, "_env_loaded", True)
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    return TestClient(app)
+
+
+def test_missing_admin_token_is_unauthorized(client):
+    assert client.get("/admin/llm-usage").status_code == 401
+
+
+def test_wrong_admin_token_is_forbidden(client):
+    response = client.get("/admin/llm-usage", headers={"Authorization": "Bearer wrong"})
+
+    assert response.status_code == 403
+
+
+def test_valid_admin_token_returns_usage(client):
+    response = client.get("/admin/llm-usage", headers={"Authorization": "Bearer secret"})
+
+    assert response.status_code == 200
+    assert "endpoints" in response.json()
+
+
+def test_admin_endpoints_are_off_without_admin_token(client, monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN")
+
+    response = client.get("/admin/llm-usage", headers={"Authorization": "Bearer secret"})
+
+    assert response.status_code == 404
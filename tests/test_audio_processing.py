@@ -0,0 +1,65 @@
+import wave
+
+import numpy as np
+
+from audio_processing import VoiceActivityDetector, deepgram_audio_params, vad_hangover_ms, wav_format
+
+
+def noise(rng, rms, samples=1024):
+    return rng.normal(0, rms, samples).clip(-32768, 32767).astype(np.int16).tobytes()
+
+
+def test_steady_background_noise_is_learned():
+    rng = np.random.default_rng(0)
+    vad = VoiceActivityDetector()
+    speech = [vad._is_speech(noise(rng, 1000)) for _ in range(200)]
+
+    assert speech[0]
+    assert not any(speech[-100:])
+
+
+def test_speech_over_learned_noise_is_detected():
+    rng = np.random.default_rng(1)
+    vad = VoiceActivityDetector()
+    for _ in range(200):
+        vad._is_speech(noise(rng, 1000))
+
+    # Speech with short pauses, as in a real conversation
+    speech = [vad._is_speech(noise(rng, 5000 if i % 20 < 15 else 1000)) for i in range(200)]
+
+    assert sum(speech) == 150
+
+
+def write_wav(path, sample_rate, channels, seconds=0.1):
+    with wave.open(str(path), "wb") as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(b"\x00\x00" * channels * int(sample_rate * seconds))
+    return str(path)
+
+
+def test_wav_format_reads_the_header(tmp_path):
+    assert wav_format(write_wav(tmp_path / "telefoon.wav", 8000, 2)) == (8000, 2)
+
+
+def test_deepgram_audio_params():
+    assert deepgram_audio_params("linear16") == {"encoding": "linear16", "sample_rate": 16000}
+    assert deepgram_audio_params("linear16", 8000, 2) == {"encoding": "linear16", "sample_rate": 8000, "channels": 2}
+    assert deepgram_audio_params("opus", 8000, 2) == {}
+    assert deepgram_audio_params(None) == {}
+
+
+def test_hangover_lets_deepgram_see_the_turn_end_silence():
+    rng = np.random.default_rng(0)
+    vad = VoiceActivityDetector(hangover_ms=vad_hangover_ms(1000))
+    chunk_seconds = 1024 / 16000
+    for _ in range(20):
+        vad.process(noise(rng, 3000))
+
+    sent_silence = 0.0
+    for _ in range(40):
+        if vad.process(noise(rng, 10)):
+            sent_silence += chunk_seconds
+
+    assert sent_silence >= 1.0
@@ -0,0 +1,29 @@
+import wave
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from batch_pipeline import Recording, recording_audio_format  # noqa: E402
+
+
+def write_wav(path, sample_rate, channels):
+    with wave.open(str(path), "wb") as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(b"\x00\x00" * channels * sample_rate // 10)
+    return str(path)
+
+
+def test_wav_recording_is_streamed_with_its_header_format(tmp_path, monkeypatch):
+    monkeypatch.setenv("AUDIO_ENCODING", "linear16")
+    path = write_wav(tmp_path / "telefoon.wav", 8000, 2)
+
+    assert recording_audio_format(Recording(path, "wav", "telefoon")) == ("linear16", 8000, 2)
+
+
+def test_url_recording_leaves_the_format_to_deepgram():
+    recording = Recording("https://example.org/call.wav", "url", "call")
+
+    assert recording_audio_format(recording) == (None, None, None)
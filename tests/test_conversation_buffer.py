@@ -0,0 +1,55 @@
+import time
+
+from conversation_buffer import CONVERSATION_BUFFER_TIME, CONVERSATION_MERGE_MAX_CHARS, ConversationBuffer
+
+
+def test_same_speaker_runs_merge_within_a_turn():
+    buffer = ConversationBuffer()
+    now = time.monotonic()
+    buffer.add_utterance(0, "Ik ben", now)
+    buffer.add_utterance(0, "erg benauwd.", now + 1)
+
+    assert [u.text for u in buffer.utterances] == ["Ik ben erg benauwd."]
+    assert buffer.utterances[0].timestamp == now + 1
+
+
+def test_committed_turn_starts_a_new_utterance():
+    buffer = ConversationBuffer()
+    now = time.monotonic()
+    buffer.add_utterance(0, "Ik ben benauwd.", now)
+    buffer.commit_turn()
+    buffer.add_utterance(0, "En ik heb koorts.", now + 1)
+
+    assert [u.text for u in buffer.utterances] == ["Ik ben benauwd.", "En ik heb koorts."]
+
+
+def test_long_monologue_stays_in_the_time_window():
+    buffer = ConversationBuffer()
+    now = time.monotonic()
+    buffer.add_utterance(None, "Oud begin van het gesprek.", now - CONVERSATION_BUFFER_TIME - 100)
+    for i in range(3):
+        buffer.add_utterance(None, f"Nieuwe uitspraak {i}.", now - 2 + i)
+
+    assert buffer.format_for_ai() == "Unknown: Nieuwe uitspraak 0. Nieuwe uitspraak 1. Nieuwe uitspraak 2."
+
+
+def test_merged_text_is_capped():
+    buffer = ConversationBuffer(max_utterances=None)
+    now = time.monotonic()
+    for i in range(200):
+        buffer.add_utterance(0, "een woord of tien in deze ene finale uitspraak hier", now + i * 0.1)
+
+    assert len(buffer.utterances) > 1
+    assert all(len(u.text) < CONVERSATION_MERGE_MAX_CHARS for u in buffer.utterances)
+
+
+def test_restore_keeps_journalled_turn_boundaries():
+    buffer = ConversationBuffer()
+    t = time.time()
+    buffer.restore_from_journal([
+        {"kind": "utterance", "speaker": 0, "text": "Eerste beurt.", "t": t},
+        {"kind": "turn", "revision": 1, "t": t},
+        {"kind": "utterance", "speaker": 0, "text": "Tweede beurt.", "t": t + 1},
+    ])
+
+    assert [u.text for u in buffer.utterances] == ["Eerste beurt.", "Tweede beurt."]
@@ -0,0 +1,40 @@
+from conversation_buffer import ConversationBuffer
+from deepgram_messages import handle_results_message, is_turn_end
+
+
+def results(transcript, words, is_final=True, speech_final=False, start=0.0):
+    return {
+        "type": "Results",
+        "is_final": is_final,
+        "speech_final": speech_final,
+        "start": start,
+        "duration": 1.0,
+        "channel": {"alternatives": [{"transcript": transcript, "words": words}]},
+    }
+
+
+def word(text, speaker):
+    return {"word": text.lower(), "punctuated_word": text, "speaker": speaker}
+
+
+def test_final_result_is_committed_per_speaker_at_the_given_time():
+    buffer = ConversationBuffer(max_utterances=None)
+    message = handle_results_message(
+        results("Hallo. Goedemorgen.", [word("Hallo.", 0), word("Goedemorgen.", 1)]), buffer, timestamp=12.5)
+
+    assert message["segments"] == [{"speaker": 0, "text": "Hallo."}, {"speaker": 1, "text": "Goedemorgen."}]
+    assert [(u.speaker, u.text, u.timestamp) for u in buffer.utterances] == [(0, "Hallo.", 12.5), (1, "Goedemorgen.", 12.5)]
+
+
+def test_interim_and_empty_results_are_not_committed():
+    buffer = ConversationBuffer()
+
+    assert handle_results_message(results("Hal", [word("Hal", 0)], is_final=False), buffer)["is_final"] is False
+    assert handle_results_message(results(" ", []), buffer) is None
+    assert not buffer.utterances
+
+
+def test_turn_ends():
+    assert is_turn_end({"type": "UtteranceEnd"})
+    assert is_turn_end(results("Ja.", [], speech_final=True))
+    assert not is_turn_end(results("Ja.", [], is_final=False, speech_final=True))
@@ -0,0 +1,32 @@
+import pytest
+
+from dossier_rules import SessionRuleEngine, merge_with_rule_suggestions
+from ecd_references import verify_references
+from patient_dossier import PATIENT_DOSSIER, InMemoryDossierStore, set_dossier_store
+
+
+@pytest.fixture
+def engine():
+    set_dossier_store(InMemoryDossierStore([PATIENT_DOSSIER]))
+    return SessionRuleEngine.for_dossier(PATIENT_DOSSIER)
+
+
+def test_terms_match_whole_words_only(engine):
+    assert engine.process("Ik heb een hypotheek en een hypothese") == []
+    assert [s["text"] for s in engine.process("Ik had vannacht een hypo")] == [
+        "Klacht past bij bekende Type 2 Diabetes Mellitus; behandeling: Metformine 1000mg 2x daags"
+    ]
+
+
+def test_rule_and_llm_citation_of_the_same_line_dedupe(engine):
+    rule_suggestions = engine.process("Ik ben allergisch voor penicilline")
+    llm_suggestions = verify_references([{
+        "type": "warning",
+        "text": "Geen penicilline voorschrijven",
+        "ecdReference": "Anafylactische shock (Hoog)",
+    }], PATIENT_DOSSIER["patient_id"])
+
+    merged = merge_with_rule_suggestions(llm_suggestions, rule_suggestions)
+
+    assert [s["text"] for s in merged] == ["Geen penicilline voorschrijven"]
+    assert merged[0]["ecdReference"] == "Penicilline: Anafylactische shock (Hoog)"
@@ -0,0 +1,62 @@
+import pytest
+
+from ecd_references import ReferenceIndex, verify_references
+from patient_dossier import PATIENT_DOSSIER, InMemoryDossierStore, set_dossier_store
+
+PATIENT_ID = PATIENT_DOSSIER["patient_id"]
+
+
+@pytest.fixture(autouse=True)
+def store():
+    set_dossier_store(InMemoryDossierStore([PATIENT_DOSSIER]))
+
+
+def verify(reference, **fields):
+    suggestion, = verify_references([dict(fields, ecdReference=reference)], PATIENT_ID)
+    return suggestion
+
+
+def test_paraphrase_snaps_to_the_dossier_line():
+    suggestion = verify("Penicilline allergie: anafylactische shock")
+
+    assert suggestion["ecdReference"] == "Penicilline: Anafylactische shock (Hoog)"
+    assert suggestion["ecdReferenceSource"] == f"Patiëntinformatie ECD {PATIENT_ID}"
+    assert suggestion["ecdReferenceVerified"] is True
+
+
+def test_reference_takes_the_date_of_its_line():
+    suggestion = verify("Hypertensie (sinds 2019-11-20): Amlodipine 5mg 1x daags")
+
+    assert suggestion["ecdReferenceDate"] == "2019-11-20"
+
+
+def test_reference_without_a_date_keeps_the_cited_date():
+    suggestion = verify("Dochter woont in de buurt, helpt met boodschappen", ecdReferenceDate="2024-02-01")
+
+    assert suggestion["ecdReference"] == "Ondersteuning: Dochter woont in de buurt, helpt met boodschappen"
+    assert suggestion["ecdReferenceDate"] == "2024-02-01"
+
+
+def test_lines_outside_bullets_are_indexed():
+    suggestion = verify("Geboortedatum: 15-07-1960")
+
+    assert suggestion["ecdReferenceVerified"] is True
+
+
+def test_section_headers_are_not_indexed():
+    index = ReferenceIndex("ALLERGIEËN:\n- Penicilline: Anafylactische shock (Hoog)", PATIENT_ID)
+
+    assert {entry.sentence for entry in index.entries} == {"Penicilline: Anafylactische shock (Hoog)"}
+
+
+def test_unrelated_reference_is_unverified():
+    suggestion = verify("Patiënt rookt twee pakjes per dag en drinkt dagelijks")
+
+    assert suggestion["ecdReference"] == "Patiënt rookt twee pakjes per dag en drinkt dagelijks"
+    assert suggestion["ecdReferenceVerified"] is False
+
+
+def test_without_a_patient_every_reference_is_unverified():
+    suggestion, = verify_references([{"ecdReference": "Penicilline: Anafylactische shock (Hoog)"}], None)
+
+    assert suggestion["ecdReferenceVerified"] is False
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+from llm_usage import UsageTracker
+
+
+def usage(prompt_tokens, completion_tokens, cached_tokens=0):
+    return SimpleNamespace(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+    )
+
+
+def test_snapshot_aggregates_per_prompt_type_and_model():
+    tracker = UsageTracker()
+    tracker.record("suggestions", "gpt-4o", 0.5, usage(100, 20, 64), session_id="a")
+    tracker.record("suggestions", "gpt-4o", 1.5, usage(300, 40), session_id="b")
+    tracker.record("suggestions", "gpt-4o", 2.0, session_id="b", error=True)
+    tracker.record("ecd_summary", "gpt-4o-mini", 1.0, usage(50, 10), session_id="a")
+
+    snapshot = tracker.snapshot()
+    endpoints = {(e["prompt_type"], e["model"]): e for e in snapshot["endpoints"]}
+    suggestions = endpoints[("suggestions", "gpt-4o")]
+    assert snapshot["sessions"] == 2
+    assert suggestions["calls"] == 3
+    assert suggestions["errors"] == 1
+    assert suggestions["prompt_tokens"] == 400
+    assert suggestions["completion_tokens"] == 60
+    assert suggestions["cached_tokens"] == 64
+    assert suggestions["latency_s"] == 4.0
+    assert suggestions["avg_prompt_tokens"] == 200.0
+    assert endpoints[("ecd_summary", "gpt-4o-mini")]["prompt_tokens"] == 50
+
+
+def test_session_usage_totals_prompt_types():
+    tracker = UsageTracker()
+    tracker.record("suggestions", "gpt-4o", 0.25, usage(100, 20), session_id="a")
+    tracker.record("ecd_summary", "gpt-4o-mini", 0.5, usage(50, 10, 32), session_id="a")
+    tracker.record("suggestions", "gpt-4o", 1.0, usage(999, 999), session_id="b")
+
+    session = tracker.session_usage("a")
+
+    assert set(session["by_prompt_type"]) == {"suggestions", "ecd_summary"}
+    assert session["total"]["calls"] == 2
+    assert session["total"]["prompt_tokens"] == 150
+    assert session["total"]["completion_tokens"] == 30
+    assert session["total"]["cached_tokens"] == 32
+    assert session["total"]["latency_s"] == 0.75
+
+
+def test_unknown_session_has_empty_usage():
+    assert UsageTracker().session_usage("missing")["total"]["calls"] == 0
+
+
+def test_oldest_sessions_are_evicted(monkeypatch):
+    monkeypatch.setattr("llm_usage.LLM_USAGE_MAX_SESSIONS", 2)
+    tracker = UsageTracker()
+    for session_id in ("a", "b", "c"):
+        tracker.record("suggestions", "gpt-4o", 0.1, usage(1, 1), session_id=session_id)
+
+    assert tracker.snapshot()["sessions"] == 2
+    assert tracker.session_usage("a")["total"]["calls"] == 0
+    assert tracker.session_usage("c")["total"]["calls"] == 1
@@ -0,0 +1,80 @@
+import copy
+
+import pytest
+
+import clients
+import patient_dossier
+from patient_dossier import (DEFAULT_PATIENT_ID, NO_DOSSIER_CONTEXT, PATIENT_DOSSIER, InMemoryDossierStore,
+                             SQLiteDossierStore, get_dossier_store, get_patient_context, resolve_patient_id,
+                             set_dossier_store)
+
+OTHER_DOSSIER = dict(copy.deepcopy(PATIENT_DOSSIER), patient_id="P654321", naam="Anna de Boer", telefoon="+31600000001")
+
+
+@pytest.fixture
+def environment(monkeypatch):
+    monkeypatch.setattr(clients, "_env_loaded", True)
+    monkeypatch.delenv("DOSSIER_DB_PATH", raising=False)
+    monkeypatch.delenv("DOSSIER_DEMO", raising=False)
+    return monkeypatch
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield InMemoryDossierStore()
+    else:
+        store = SQLiteDossierStore(str(tmp_path / "dossiers.db"))
+        yield store
+        store.close()
+
+
+def test_store_versions_and_phone_lookup(store):
+    assert store.get(DEFAULT_PATIENT_ID) is None
+    assert store.put(PATIENT_DOSSIER) == 1
+    assert store.get(DEFAULT_PATIENT_ID)["naam"] == "Karel Groenendijk"
+    assert store.find_by_phone(PATIENT_DOSSIER["telefoon"]) == DEFAULT_PATIENT_ID
+
+    moved = dict(PATIENT_DOSSIER, telefoon="+31600000002")
+    assert store.put(moved) == 2
+    assert store.get_version(DEFAULT_PATIENT_ID) == 2
+    assert store.find_by_phone("+31600000002") == DEFAULT_PATIENT_ID
+    assert store.find_by_phone(PATIENT_DOSSIER["telefoon"]) is None
+
+
+def test_unknown_patient_or_phone_gets_no_dossier(environment):
+    set_dossier_store(InMemoryDossierStore([PATIENT_DOSSIER, OTHER_DOSSIER]))
+
+    assert resolve_patient_id("P654321") == "P654321"
+    assert resolve_patient_id(phone="+31600000001") == "P654321"
+    assert resolve_patient_id("P000000") is None
+    assert resolve_patient_id(phone="+31699999999") is None
+    assert resolve_patient_id("P000000", "+31600000001") == "P654321"
+
+
+def test_demo_dossier_only_without_identifiers_in_demo_mode(environment, tmp_path):
+    set_dossier_store(InMemoryDossierStore([PATIENT_DOSSIER]))
+    assert resolve_patient_id() == DEFAULT_PATIENT_ID
+
+    environment.setenv("DOSSIER_DB_PATH", str(tmp_path / "dossiers.db"))
+    assert resolve_patient_id() is None
+
+
+def test_database_is_seeded_in_demo_mode_only(environment, tmp_path):
+    environment.setattr(patient_dossier, "_dossier_store", None)
+    environment.setenv("DOSSIER_DB_PATH", str(tmp_path / "production.db"))
+    assert get_dossier_store().get(DEFAULT_PATIENT_ID) is None
+
+    environment.setattr(patient_dossier, "_dossier_store", None)
+    environment.setenv("DOSSIER_DB_PATH", str(tmp_path / "demo.db"))
+    environment.setenv("DOSSIER_DEMO", "true")
+    assert get_dossier_store().get(DEFAULT_PATIENT_ID) is not None
+
+
+def test_context_without_dossier(environment):
+    set_dossier_store(InMemoryDossierStore([PATIENT_DOSSIER]))
+
+    assert get_patient_context(None) == NO_DOSSIER_CONTEXT
+    assert "Karel Groenendijk" in get_patient_context(DEFAULT_PATIENT_ID)
+    with pytest.raises(KeyError):
+        get_patient_context("P000000")
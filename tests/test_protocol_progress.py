@@ -0,0 +1,33 @@
+import pytest
+
+from protocol_progress import ProtocolProgressTracker
+from protocols import PROTOCOLS
+
+EXAMPLE_QUESTIONS = [
+    (protocol.id, step_index, question)
+    for protocol in PROTOCOLS
+    for step_index, step in enumerate(protocol.steps)
+    for question in step.get('example_questions', [])
+]
+
+
+def completed_steps(protocol_id, text):
+    tracker = ProtocolProgressTracker(PROTOCOLS)
+    tracker.activate(protocol_id)
+    return [event["completed_step"] for event in tracker.process(text) if event["completed_step"] is not None]
+
+
+@pytest.mark.parametrize("protocol_id,step_index,question", EXAMPLE_QUESTIONS)
+def test_example_question_completes_only_its_own_step(protocol_id, step_index, question):
+    assert completed_steps(protocol_id, question) == [step_index]
+
+
+def test_unrelated_utterance_completes_nothing():
+    assert completed_steps("life_threatening_1", "Ik bel over de rekening van vorige maand") == []
+
+
+def test_keyword_activates_protocol():
+    tracker = ProtocolProgressTracker(PROTOCOLS)
+    events = tracker.process("Mijn vader is bewusteloos")
+
+    assert "life_threatening_1" in [event["protocol_id"] for event in events]
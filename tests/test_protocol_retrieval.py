@@ -0,0 +1,33 @@
+import numpy as np
+
+from protocol_retrieval import ProtocolVectorIndex, search_protocols, split_utterances
+from protocols import PROTOCOLS
+
+
+def protocol_ids(conversation_text):
+    return [protocol.id for protocol in search_protocols(conversation_text, PROTOCOLS)]
+
+
+def test_paraphrase_without_keywords_finds_protocol():
+    assert protocol_ids("Speaker 0: hij krijgt geen lucht") == ["life_threatening_1"]
+
+
+def test_empty_conversation_finds_nothing():
+    assert protocol_ids("") == []
+
+
+def test_small_talk_finds_nothing():
+    assert protocol_ids("Speaker 0: Goedemorgen, met wie spreek ik?\nSpeaker 1: Ik bel over de rekening van vorige maand") == []
+
+
+def test_query_without_known_ngrams_scores_zero():
+    index = ProtocolVectorIndex(PROTOCOLS)
+
+    scores = index.score(["ok", "xyzzy qwrtp"])
+
+    assert scores.shape == (2, len(PROTOCOLS))
+    assert not np.any(scores)
+
+
+def test_split_utterances_strips_speaker_labels():
+    assert split_utterances("Speaker 0: hallo\n\nUnknown: ja") == ["hallo", "ja"]
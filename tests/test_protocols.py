@@ -0,0 +1,82 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+import clients
+from protocols import PROTOCOLS, ProtocolRegistry, protocol_to_dict
+
+
+@pytest.fixture(autouse=True)
+def environment(monkeypatch):
+    monkeypatch.setattr(clients, "_env_loaded", True)
+    monkeypatch.delenv("PROTOCOL_RETRIEVAL", raising=False)
+
+
+def write_protocol(path, data, mtime_offset=0):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    # Filesystems with coarse timestamps would otherwise hide the rewrite
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset))
+
+
+@pytest.fixture
+def protocol_file(tmp_path):
+    path = tmp_path / "protocol.json"
+    write_protocol(path, protocol_to_dict(PROTOCOLS[0]))
+    return path
+
+
+def test_registry_loads_directory(protocol_file):
+    registry = ProtocolRegistry(str(protocol_file.parent))
+
+    protocols, by_id, indexes = registry.snapshot
+    assert [protocol.id for protocol in protocols] == [PROTOCOLS[0].id]
+    assert by_id[PROTOCOLS[0].id] is protocols[0]
+    assert "phrase" in indexes
+
+
+def test_unchanged_directory_keeps_snapshot(protocol_file):
+    registry = ProtocolRegistry(str(protocol_file.parent))
+    snapshot = registry.snapshot
+
+    assert asyncio.run(registry.reload_if_changed()) is False
+    assert registry.snapshot is snapshot
+
+
+def test_mtime_change_swaps_snapshot(protocol_file):
+    registry = ProtocolRegistry(str(protocol_file.parent))
+    snapshot = registry.snapshot
+    data = protocol_to_dict(PROTOCOLS[0])
+    data["title"] = "Nieuwe titel"
+    write_protocol(protocol_file, data, mtime_offset=1_000_000_000)
+
+    assert asyncio.run(registry.reload_if_changed()) is True
+    assert registry.snapshot is not snapshot
+    assert registry.snapshot[0][0].title == "Nieuwe titel"
+    assert registry.snapshot[2]["phrase"] is not snapshot[2]["phrase"]
+
+
+def test_malformed_file_keeps_previous_snapshot(protocol_file):
+    registry = ProtocolRegistry(str(protocol_file.parent))
+    snapshot = registry.snapshot
+    data = protocol_to_dict(PROTOCOLS[0])
+    del data["steps"]
+    write_protocol(protocol_file, data, mtime_offset=1_000_000_000)
+
+    assert asyncio.run(registry.reload_if_changed()) is False
+    assert registry.snapshot is snapshot
+    # The broken files are not retried until they change again
+    assert asyncio.run(registry.reload_if_changed()) is False
+
+    write_protocol(protocol_file, protocol_to_dict(PROTOCOLS[0]), mtime_offset=2_000_000_000)
+    assert asyncio.run(registry.reload_if_changed()) is True
+
+
+def test_malformed_directory_is_rejected_on_start(tmp_path):
+    (tmp_path / "broken.json").write_text("{not json", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        ProtocolRegistry(str(tmp_path))
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from session_resume import NO_STATUS_RECEIVED, NORMAL_CLOSURE, ClientChannel, ResumableSession
+
+
+class ClosedSocket(Exception):
+    def __init__(self, code):
+        super().__init__(f"closed with {code}")
+        self.code = code
+
+
+class FakeWebSocket:
+    def __init__(self, close_code):
+        self.close_code = close_code
+
+    async def receive_text(self):
+        raise ClosedSocket(self.close_code)
+
+    async def send_text(self, text):
+        pass
+
+
+def test_normal_close_waits_for_running_summary():
+    async def scenario():
+        summary_done = asyncio.Event()
+        session = ResumableSession(ClientChannel(FakeWebSocket(NORMAL_CLOSURE)))
+        session.task = asyncio.create_task(asyncio.sleep(10))
+        session.summary_task = asyncio.create_task(summary_done.wait())
+
+        receiver = asyncio.create_task(session.channel.receive_text())
+        await asyncio.sleep(0.01)
+        assert not session.channel.connected
+        assert not session.task.cancelled()
+
+        summary_done.set()
+        await asyncio.sleep(0.01)
+        receiver.cancel()
+        return session.task.cancelled()
+
+    assert asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("code", [NORMAL_CLOSURE, NO_STATUS_RECEIVED])
+def test_client_close_without_summary_ends_session(code):
+    async def scenario():
+        session = ResumableSession(ClientChannel(FakeWebSocket(code)))
+        session.task = asyncio.create_task(asyncio.sleep(10))
+        receiver = asyncio.create_task(session.channel.receive_text())
+        await asyncio.sleep(0.01)
+        receiver.cancel()
+        return session.task.cancelled()
+
+    assert asyncio.run(scenario())
+
+
+def test_abnormal_drop_keeps_session_for_grace_period():
+    async def scenario():
+        session = ResumableSession(ClientChannel(FakeWebSocket(1006)))
+        session.task = asyncio.create_task(asyncio.sleep(10))
+        receiver = asyncio.create_task(session.channel.receive_text())
+        await asyncio.sleep(0.01)
+        receiver.cancel()
+        cancelled = session.task.cancelled()
+        session._grace_timer.cancel()
+        session.task.cancel()
+        return cancelled
+
+    assert not asyncio.run(scenario())
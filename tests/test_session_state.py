@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from conversation_buffer import ConversationBuffer
+from session_state import InMemorySessionState, RedisSessionState
+
+
+def test_in_memory_sessions_expire():
+    state = InMemorySessionState()
+    state.record_event("s1", "utterance", {"kind": "utterance", "text": "hallo", "t": 1.0})
+    state._session_expiry["s1"] = 0.0
+
+    assert asyncio.run(state.load_session("s1")) == []
+    assert "s1" not in state._timeline
+
+
+async def _fake_resp_server(store, drops):
+    """Sorted-set subset of the Redis protocol that drops the connection after the first ZADD"""
+
+    async def handle(reader, writer):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:-2])):
+                length = int((await reader.readline())[1:-2])
+                args.append((await reader.readexactly(length + 2))[:-2].decode())
+            if args[0] == "ZADD":
+                store.setdefault(args[1], {})[args[3]] = float(args[2])
+                if drops:
+                    drops.pop()
+                    writer.close()
+                    return
+                writer.write(b":1\r\n")
+            elif args[0] == "ZRANGE":
+                members = sorted(store.get(args[1], {}).items(), key=lambda item: item[1])
+                writer.write(b"*%d\r\n" % len(members) + b"".join(
+                    b"$%d\r\n%s\r\n" % (len(member.encode()), member.encode()) for member, _ in members))
+            elif args[0] == "GET":
+                writer.write(b"$-1\r\n")
+            elif args[0] == "HGETALL":
+                writer.write(b"*0\r\n")
+            else:
+                writer.write(b":1\r\n")
+            await writer.drain()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+def test_redis_batch_is_resent_after_a_dropped_connection_without_duplicates():
+    async def run():
+        server = await _fake_resp_server({}, [True])
+        port = server.sockets[0].getsockname()[1]
+        state = RedisSessionState(f"redis://127.0.0.1:{port}/0", flush_interval=0.01)
+        await state.start()
+        for i in range(3):
+            state.record_event("s1", "utterance", {"kind": "utterance", "text": f"u{i}", "t": 1000.0 + i})
+        with_error = False
+        try:
+            await state.flush()
+        except OSError:
+            with_error = True
+        records = await state.load_session("s1")
+        await state.close()
+        server.close()
+        return with_error, [record["text"] for record in records]
+
+    assert asyncio.run(run()) == (True, ["u0", "u1", "u2"])
+
+
+async def _restore_turns(state):
+    buffer = ConversationBuffer()
+    buffer.session_id = "s1"
+    buffer.state = state
+    for text in ("Eerste beurt.", "Tweede beurt."):
+        buffer.add_utterance(0, text)
+        buffer.log_event('utterance', speaker=0, text=text)
+        buffer.commit_turn()
+
+    restored = ConversationBuffer()
+    restored.restore_from_journal(await state.load_session("s1"))
+    return [u.text for u in restored.utterances]
+
+
+def test_in_memory_restore_keeps_turns_apart():
+    assert asyncio.run(_restore_turns(InMemorySessionState())) == ["Eerste beurt.", "Tweede beurt."]
+
+
+def test_redis_restore_keeps_turns_apart():
+    async def run():
+        server = await _fake_resp_server({}, [])
+        port = server.sockets[0].getsockname()[1]
+        state = RedisSessionState(f"redis://127.0.0.1:{port}/0", flush_interval=0.01)
+        await state.start()
+        try:
+            return await _restore_turns(state)
+        finally:
+            await state.close()
+            server.close()
+
+    assert asyncio.run(run()) == ["Eerste beurt.", "Tweede beurt."]
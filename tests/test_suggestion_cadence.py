@@ -0,0 +1,107 @@
+import asyncio
+
+from suggestion_cadence import (SUGGESTION_INTERVAL, SUGGESTION_MAX_INTERVAL, SUGGESTION_SPEECH_MAX_INTERVAL,
+                                SuggestionCadence, run_suggestion_loop)
+
+
+def test_no_speech_keeps_the_default_interval():
+    cadence = SuggestionCadence()
+
+    assert cadence.next_interval(now=100.0) == SUGGESTION_INTERVAL
+
+
+def test_slow_speech_is_clamped():
+    cadence = SuggestionCadence()
+    for i in range(10):
+        cadence.record_words(1, now=100.0 + i * 3)
+
+    assert cadence.next_interval(now=130.0) == SUGGESTION_SPEECH_MAX_INTERVAL
+
+
+def test_interval_follows_new_words_without_a_request():
+    cadence = SuggestionCadence()
+    for i in range(10):
+        cadence.record_words(10, now=100.0 + i)
+
+    assert cadence.interval < SUGGESTION_INTERVAL
+
+
+def test_failing_provider_still_backs_off_to_the_maximum():
+    cadence = SuggestionCadence()
+    for _ in range(10):
+        cadence.record_call(1.0, ok=False)
+
+    assert cadence.next_interval(now=100.0) == SUGGESTION_MAX_INTERVAL
+
+
+class FakeBuffer:
+    def __init__(self, text):
+        self.cadence = SuggestionCadence()
+        self.revision = 1
+        self.text = text
+        self.formatted = 0
+
+    def format_for_ai(self):
+        self.formatted += 1
+        return self.text
+
+
+async def run_turn(buffer, seconds=0.3):
+    requests = []
+    stop_event, turn_event = asyncio.Event(), asyncio.Event()
+
+    async def request(conversation_text):
+        requests.append(conversation_text)
+
+    buffer.cadence.latency_ewma = 0.0  # Turn spacing is the minimum interval
+    loop_task = asyncio.create_task(run_suggestion_loop(buffer, request, stop_event, turn_event))
+    turn_event.set()
+    await asyncio.sleep(seconds)
+    stop_event.set()
+    turn_event.set()
+    await asyncio.wait_for(loop_task, timeout=1.0)
+    return requests
+
+
+def test_turn_end_without_text_does_not_spin(monkeypatch):
+    monkeypatch.setattr("suggestion_cadence.SUGGESTION_MIN_INTERVAL", 0.0)
+    buffer = FakeBuffer("")
+
+    assert asyncio.run(run_turn(buffer)) == []
+    assert buffer.formatted == 1
+
+
+def test_turn_end_requests_suggestions(monkeypatch):
+    monkeypatch.setattr("suggestion_cadence.SUGGESTION_MIN_INTERVAL", 0.0)
+    buffer = FakeBuffer("Arts: goedemorgen")
+
+    assert asyncio.run(run_turn(buffer)) == ["Arts: goedemorgen"]
+
+
+def test_without_turn_end_the_interval_waits_for_a_long_turn(monkeypatch):
+    monkeypatch.setattr("suggestion_cadence.SUGGESTION_POLL_INTERVAL", 0.02)
+    monkeypatch.setattr("suggestion_cadence.SUGGESTION_TURN_FALLBACK_INTERVAL", 0.3)
+    buffer = FakeBuffer("Arts: goedemorgen")
+    buffer.cadence.interval = 0.05
+
+    async def run():
+        requests = []
+        stop_event = asyncio.Event()
+
+        async def request(conversation_text):
+            requests.append(asyncio.get_running_loop().time())
+
+        turn_event = asyncio.Event()
+        start = asyncio.get_running_loop().time()
+        loop_task = asyncio.create_task(run_suggestion_loop(buffer, request, stop_event, turn_event))
+        await asyncio.sleep(0.15)
+        mid_turn = list(requests)
+        await asyncio.sleep(0.35)
+        stop_event.set()
+        turn_event.set()
+        await asyncio.wait_for(loop_task, timeout=1.0)
+        return mid_turn, [t - start for t in requests]
+
+    mid_turn, requests = asyncio.run(run())
+    assert mid_turn == []
+    assert len(requests) == 1 and requests[0] >= 0.3
@@ -0,0 +1,27 @@
+import asyncio
+import json
+
+from transcript_journal import TranscriptJournal, journal_path, read_journal
+
+
+def test_read_journal_skips_garbled_lines(tmp_path):
+    path = journal_path("s1", str(tmp_path))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"a": 1}\n{"a": 2, "te\n{"a": 3}\n')
+
+    assert read_journal("s1", str(tmp_path)) == [{"a": 1}, {"a": 3}]
+
+
+def test_append_after_crash_starts_on_a_new_line(tmp_path):
+    path = journal_path("s2", str(tmp_path))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"kind": "utterance", "text": "eerste"}) + "\n" + '{"kind": "utter')
+
+    async def append():
+        journal = TranscriptJournal("s2", str(tmp_path), fsync_policy="never").start()
+        journal.append("utterance", text="tweede")
+        await journal.close()
+
+    asyncio.run(append())
+
+    assert [record["text"] for record in read_journal("s2", str(tmp_path))] == ["eerste", "tweede"]
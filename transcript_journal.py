@@ -0,0 +1,170 @@
+"""
+Append-only per-session journal of final utterances, suggestions and summaries.
+
+Records are written as JSON Lines. Appending only queues the record in memory;
+a background task serialises and writes batches in a worker thread, so the
+event loop never blocks on disk I/O.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+from clients import get_env
+
+JOURNAL_DIR = "journals"
+JOURNAL_FLUSH_INTERVAL = 1.0  # Seconds between batched writes
+JOURNAL_BATCH_SIZE = 64  # Pending records that trigger an early flush
+
+# fsync policies:
+#   "batch"    - fsync after every written batch (safest)
+#   "interval" - fsync at most once per JOURNAL_FSYNC_INTERVAL seconds
+#   "never"    - leave it to the OS
+JOURNAL_FSYNC = "interval"
+JOURNAL_FSYNC_INTERVAL = 5.0
+
+
+def journal_path(session_id: str, directory: str = None) -> str:
+    directory = directory or get_env("JOURNAL_DIR") or JOURNAL_DIR
+    safe_id = "".join(c for c in session_id if c.isalnum() or c in "-_")
+    return os.path.join(directory, f"{safe_id}.jsonl")
+
+
+class TranscriptJournal:
+    def __init__(self, session_id: str, directory: str = None, flush_interval: float = None,
+                 batch_size: int = None, fsync_policy: str = None):
+        self.session_id = session_id
+        self.path = journal_path(session_id, directory)
+        self.flush_interval = flush_interval or JOURNAL_FLUSH_INTERVAL
+        self.batch_size = batch_size or JOURNAL_BATCH_SIZE
+        self.fsync_policy = fsync_policy or get_env("JOURNAL_FSYNC") or JOURNAL_FSYNC
+        if self.fsync_policy not in ("batch", "interval", "never"):
+            raise ValueError(f"Unknown journal fsync policy: {self.fsync_policy}")
+
+        self._pending = []
+        self._file = None
+        self._last_fsync = 0.0
+        self._wake = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._task = None
+        self._closed = False
+
+    def start(self):
+        """Starts the background flusher on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    def append(self, kind: str, **data):
+        """Queues a record; cheap enough to call from the receive loop"""
+        data["kind"] = kind
+        data["t"] = time.time()
+        self.append_record(data)
+
+    def append_record(self, record: Dict[str, Any]):
+        """Queues a record that already carries its 'kind' and 't' fields"""
+        if self._closed:
+            return
+        self._pending.append(record)
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"[Backend] Error writing journal {self.path}: {e}")
+
+    async def flush(self):
+        if not self._pending:
+            return
+        async with self._write_lock:
+            batch, self._pending = self._pending, []
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._write_batch, batch)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            truncate_partial_line(self.path)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in batch))
+        self._file.flush()
+        now = time.monotonic()
+        if self.fsync_policy == "batch" or (
+                self.fsync_policy == "interval" and now - self._last_fsync >= JOURNAL_FSYNC_INTERVAL):
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+    async def close(self):
+        """Flushes outstanding records, fsyncs and closes the journal"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        if self._task is not None:
+            try:
+                await self._task
+            except Exception as e:
+                print(f"[Backend] Error stopping journal flusher: {e}")
+        await self.flush()
+        if self._file is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._close_file)
+
+    def _close_file(self):
+        if self.fsync_policy != "never":
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+
+
+def truncate_partial_line(path: str):
+    """
+    Cuts a journal back to its last complete line, so records appended after
+    a crash in the middle of a write do not end up on the truncated line.
+    """
+    try:
+        f = open(path, "r+b")
+    except FileNotFoundError:
+        return
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - 4096)
+            f.seek(start)
+            chunk = f.read(position - start)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+        if position != end:
+            f.truncate(position)
+
+
+def read_journal(session_id: str, directory: str = None) -> List[Dict[str, Any]]:
+    """
+    Reads all records of a session journal. Undecodable lines, such as a line
+    truncated by a crash in the middle of a write, are skipped.
+    """
+    path = journal_path(session_id, directory)
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records